@@ -0,0 +1,120 @@
+"""
+Who is making a request and what they may manage.
+
+AccessMiddleware sets ``request.access``, an Access built from request.user the
+first time a view or template uses it. The user row is loaded by
+accounts.backends.UserBackend with its hospital joined in, so the role and
+hospital checks below never query. Templates get the same object as
+``access`` (see accounts.context_processors).
+
+Querysets of hospital data derive from HospitalScopedQuerySet, whose
+for_user() and managed_by() apply the same role rules (see managed_hospital)
+to rows.
+"""
+from dataclasses import dataclass
+
+from django.db import models
+from django.utils.functional import SimpleLazyObject
+
+ADMIN_ROLE = 'admin'
+HOSPITAL_ADMIN_ROLE = 'hospital_admin'
+STAFF_ROLE = 'staff'
+PATIENT_ROLE = 'patient'
+HOSPITAL_ROLES = [HOSPITAL_ADMIN_ROLE, STAFF_ROLE]
+
+# managed_hospital() of system admins
+ALL_HOSPITALS = 'all'
+
+
+def managed_hospital(user):
+    """
+    What ``user`` manages: ALL_HOSPITALS for system admins, the id of their
+    hospital for hospital admins and staff assigned to one, None otherwise.
+    """
+    if user is None or not user.is_authenticated:
+        return None
+    if user.role == ADMIN_ROLE:
+        return ALL_HOSPITALS
+    if user.role in HOSPITAL_ROLES and user.hospital_id:
+        return user.hospital_id
+    return None
+
+
+def hospital_limit(user):
+    """The one hospital ``user`` is limited to, or None if they are not limited to one"""
+    hospital_id = managed_hospital(user)
+    return None if hospital_id == ALL_HOSPITALS else hospital_id
+
+
+class HospitalScopedQuerySet(models.QuerySet):
+    """
+    for_user() narrows a queryset to the rows a dashboard user sees:
+    managed_by() for system admins, hospital admins and staff, for_patient()
+    for anyone else. managed_by() is what they may change: all rows for
+    system admins, their hospital's for hospital admins and staff, none
+    otherwise. for_listing() (per model) adds the joins, columns and order the
+    dashboard list pages render.
+    """
+    hospital_lookup = 'hospital_id'
+
+    def for_user(self, user):
+        if managed_hospital(user) is None:
+            return self.for_patient(user)
+        return self.managed_by(user)
+
+    def managed_by(self, user):
+        hospital_id = managed_hospital(user)
+        if hospital_id is None:
+            return self.none()
+        if hospital_id == ALL_HOSPITALS:
+            return self.all()
+        return self.filter(**{self.hospital_lookup: hospital_id})
+
+    def for_patient(self, user):
+        return self.none()
+
+
+@dataclass(frozen=True)
+class Access:
+    user: object
+    role: str = None
+    hospital: object = None
+
+    @classmethod
+    def for_user(cls, user):
+        if not user.is_authenticated:
+            return cls(user)
+        return cls(user, user.role, user.hospital)
+
+    @property
+    def hospital_id(self):
+        return self.hospital.id if self.hospital is not None else None
+
+    @property
+    def is_admin(self):
+        return self.role == ADMIN_ROLE
+
+    @property
+    def is_manager(self):
+        """System admin, hospital admin or staff"""
+        return self.is_admin or self.role in HOSPITAL_ROLES
+
+    @property
+    def is_hospital_member(self):
+        """Hospital admin or staff assigned to a hospital"""
+        return self.role in HOSPITAL_ROLES and self.hospital is not None
+
+    def can_manage(self, hospital_id):
+        """Whether the user may manage appointments, doctors or slots of ``hospital_id``"""
+        return self.is_admin or (self.is_hospital_member and hospital_id == self.hospital_id)
+
+
+class AccessMiddleware:
+    """Attach request.access; goes after AuthenticationMiddleware"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.access = SimpleLazyObject(lambda: Access.for_user(request.user))
+        return self.get_response(request)
@@ -0,0 +1,71 @@
+"""
+Authentication backend loading the logged-in user together with their hospital.
+
+AuthenticationMiddleware calls get_user() on every request. Joining the
+hospital in that one query means request.user.hospital (and request.access)
+cost nothing more. With settings.REQUEST_USER_CACHE_TIMEOUT the row is also
+cached per user; dashboard.signals drops a user's entry when they are saved
+or deleted, and the entries of a hospital's users when it changes. Only
+enable it with a shared CACHE_URL, otherwise other processes keep the old row
+until it expires.
+
+ModelBackend stays listed after this one in AUTHENTICATION_BACKENDS: sessions
+record the backend that logged them in, and Django logs out sessions whose
+backend is no longer listed.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
+
+UserModel = get_user_model()
+
+
+def _cache_key(user_id):
+    return f'request-user:{user_id}'
+
+
+def forget_users(user_ids):
+    """Drop the cached rows of ``user_ids`` once the current transaction commits"""
+    if not settings.REQUEST_USER_CACHE_TIMEOUT:
+        return
+    keys = [_cache_key(user_id) for user_id in user_ids]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def forget_hospital_users(hospital_id):
+    """Drop the cached rows of the users assigned to ``hospital_id``"""
+    if not settings.REQUEST_USER_CACHE_TIMEOUT:
+        return
+    forget_users(UserModel._default_manager.filter(hospital_id=hospital_id).values_list('id', flat=True))
+
+
+class UserBackend(ModelBackend):
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        user = super().authenticate(request, username=username, password=password, **kwargs)
+        if user is None and password is not None:
+            # Stop here: ModelBackend would only hash the same password again
+            raise PermissionDenied
+        return user
+
+    def get_user(self, user_id):
+        timeout = settings.REQUEST_USER_CACHE_TIMEOUT
+        if not timeout:
+            return self._load_user(user_id)
+        key = _cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = self._load_user(user_id)
+            if user is not None:
+                cache.set(key, user, timeout)
+        return user
+
+    def _load_user(self, user_id):
+        try:
+            user = UserModel._default_manager.select_related('hospital').get(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,3 @@
+def access(request):
+    """The request's accounts.access.Access as ``access``; stays lazy until a template uses it"""
+    return {'access': getattr(request, 'access', None)}
@@ -0,0 +1,74 @@
+"""
+Count the queries dashboard requests make with each session store.
+
+Usage:
+    python manage.py bench_sessions --rounds 50
+    python manage.py bench_sessions --username admin
+
+Logs a staff user in with each SESSION_STORE (see settings) and replays a
+dashboard round: open the dashboard, post a status change, follow the redirect
+to the bookings page where the flash message is shown. The status change
+targets an appointment that does not exist, so nothing is modified; it still
+goes through the messages framework. The first row uses Django's defaults
+(database sessions, messages falling back to the session) for comparison.
+Everything runs in a transaction that is rolled back.
+"""
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.access import ADMIN_ROLE, HOSPITAL_ROLES
+from hospital_appoitment.env import SESSION_ENGINES
+
+COOKIE_MESSAGES = 'django.contrib.messages.storage.cookie.CookieStorage'
+FALLBACK_MESSAGES = 'django.contrib.messages.storage.fallback.FallbackStorage'
+
+
+class Command(BaseCommand):
+    help = 'Compare queries per dashboard request across session stores'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rounds', type=int, default=50, help='Dashboard rounds (3 requests each) per store')
+        parser.add_argument('--username', help='Staff user to log in as; defaults to the first admin')
+
+    def handle(self, *args, **options):
+        users = get_user_model().objects.filter(role__in=[ADMIN_ROLE, *HOSPITAL_ROLES])
+        if options['username']:
+            users = users.filter(username=options['username'])
+        user = users.order_by('id').first()
+        if user is None:
+            raise CommandError('No admin or staff user found')
+
+        configurations = [('db (Django defaults)', SESSION_ENGINES['db'], FALLBACK_MESSAGES)]
+        configurations += [(name, engine, COOKIE_MESSAGES) for name, engine in SESSION_ENGINES.items()]
+
+        self.stdout.write(f"{'store':<24}{'queries/req':>12}{'session q/req':>15}{'ms/req':>9}")
+        for name, engine, message_storage in configurations:
+            with override_settings(ALLOWED_HOSTS=['testserver'], SESSION_ENGINE=engine, MESSAGE_STORAGE=message_storage):
+                requests, queries, session_queries, elapsed = self._run(user, options['rounds'])
+            self.stdout.write(
+                f'{name:<24}{queries / requests:>12.1f}{session_queries / requests:>15.2f}'
+                f'{elapsed / requests * 1000:>9.1f}'
+            )
+
+    def _run(self, user, rounds):
+        client = Client()
+        dashboard, bookings = reverse('dashboard'), reverse('manage_bookings')
+        with transaction.atomic():
+            client.force_login(user)
+            # Warm up caches and templates
+            client.get(dashboard)
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                for _ in range(rounds):
+                    client.get(dashboard)
+                    client.post(bookings, {'action': 'confirm', 'appointment_id': 0}, follow=True)
+                elapsed = time.perf_counter() - started
+            transaction.set_rollback(True)
+        session_queries = sum(1 for query in captured.captured_queries if 'django_session' in query['sql'])
+        return rounds * 3, len(captured.captured_queries), session_queries, elapsed
@@ -0,0 +1,39 @@
+"""
+Delete expired sessions from django_session in batches.
+
+Usage:
+    python manage.py purge_sessions
+    python manage.py purge_sessions --batch-size 5000
+    python manage.py purge_sessions --dry-run       # only count
+
+Replaces clearsessions for the db and cached_db session stores (see
+accounts.sessions); run it daily from cron. The cache and signed_cookies
+stores expire sessions by themselves and need no cleanup.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from accounts.sessions import BATCH_SIZE, expired_sessions, purge_expired_sessions, uses_database_sessions
+
+
+class Command(BaseCommand):
+    help = 'Delete expired sessions in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many sessions have expired')
+
+    def handle(self, *args, **options):
+        if not uses_database_sessions():
+            self.stdout.write(f'{settings.SESSION_ENGINE} does not store sessions in the database; nothing to do')
+            return
+
+        if options['dry_run']:
+            self.stdout.write(f'Would delete {expired_sessions().count()} expired sessions')
+            return
+
+        total = 0
+        for deleted in purge_expired_sessions(options['batch_size']):
+            total += deleted
+            self.stdout.write(f'Deleted {total} sessions')
+        self.stdout.write(self.style.SUCCESS(f'Deleted {total} expired sessions'))
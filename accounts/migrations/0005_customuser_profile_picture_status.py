@@ -0,0 +1,23 @@
+# Generated by Django 4.2.23 on 2026-10-19 09:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_alter_customuser_role'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='profile_picture_derivatives',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='profile_picture_status',
+            field=models.CharField(blank=True, choices=[('', 'No Image'), ('pending', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], default='', max_length=10),
+        ),
+    ]
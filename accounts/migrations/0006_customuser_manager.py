@@ -0,0 +1,20 @@
+# Generated by Django 4.2.23 on 2026-10-19 09:39
+
+import accounts.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_customuser_profile_picture_status'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='customuser',
+            managers=[
+                ('objects', accounts.models.CustomUserManager()),
+            ],
+        ),
+    ]
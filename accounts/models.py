@@ -1,28 +1,64 @@
 from django.db import models
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager
+
+from dashboard.images import IMAGE_STATUS_CHOICES
+from .access import (
+    ADMIN_ROLE, HOSPITAL_ADMIN_ROLE, HOSPITAL_ROLES, PATIENT_ROLE, STAFF_ROLE, HospitalScopedQuerySet, hospital_limit,
+)
+
+
+class CustomUserQuerySet(HospitalScopedQuerySet):
+    def manageable_by(self, user):
+        """
+        Users ``user`` may manage on the users page: everyone else for system
+        admins; their hospital's users and unassigned staff and patients for
+        hospital admins; nobody otherwise.
+        """
+        if user.role not in [ADMIN_ROLE, HOSPITAL_ADMIN_ROLE]:
+            return self.none()
+        users = self.managed_by(user)
+        if hospital_limit(user) is not None:
+            users = users | self.filter(hospital__isnull=True, role__in=[STAFF_ROLE, PATIENT_ROLE])
+        return users.exclude(id=user.id)
+
+    def for_listing(self):
+        return (
+            self.select_related('hospital')
+            .only('id', 'username', 'email', 'first_name', 'last_name', 'role', 'hospital', 'hospital__name')
+            .order_by('username')
+        )
+
+
+class CustomUserManager(UserManager.from_queryset(CustomUserQuerySet)):
+    pass
 
 
 class CustomUser(AbstractUser):
     ROLE_CHOICES = [
-        ('admin', 'System Admin'),           # Full access
-        ('hospital_admin', 'Hospital Admin'), # Manages one hospital
-        ('staff', 'Hospital Staff'),         # Limited access (e.g., reception)              # Regular user
+        (ADMIN_ROLE, 'System Admin'),           # Full access
+        (HOSPITAL_ADMIN_ROLE, 'Hospital Admin'), # Manages one hospital
+        (STAFF_ROLE, 'Hospital Staff'),         # Limited access (e.g., reception)              # Regular user
     ]
     
-    role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='patient')
+    role = models.CharField(max_length=20, choices=ROLE_CHOICES, default=PATIENT_ROLE)
     phone = models.CharField(max_length=15, blank=True, null=True)
     profile_picture = models.ImageField(upload_to='profiles/', blank=True, null=True)
+    # Resized versions, filled in by the process_image_jobs worker
+    profile_picture_status = models.CharField(max_length=10, choices=IMAGE_STATUS_CHOICES, blank=True, default='')
+    profile_picture_derivatives = models.JSONField(default=dict, blank=True, editable=False)
     
     # Link to hospital (only for hospital_admin, staff; null for system admin/patient)
     hospital = models.ForeignKey('dashboard.Hospital', on_delete=models.SET_NULL, null=True, blank=True)
+
+    objects = CustomUserManager()
     
     def __str__(self):
         return f"{self.username} ({self.get_role_display()})"
 
     @property
     def is_hospital_admin(self):
-        return self.role == 'hospital_admin'
+        return self.role == HOSPITAL_ADMIN_ROLE
 
     @property
     def is_staff_or_admin(self):
-        return self.role in ['hospital_admin', 'staff']
\ No newline at end of file
+        return self.role in HOSPITAL_ROLES
\ No newline at end of file
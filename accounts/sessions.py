@@ -0,0 +1,35 @@
+"""
+Cleanup of expired database sessions.
+
+Django's clearsessions deletes every expired row in one statement. On a large
+django_session table that holds the SQLite write lock (or one long transaction
+on PostgreSQL) for as long as it runs, blocking logins and bookings.
+purge_expired_sessions() deletes them in batches by key instead, each batch a
+short statement of its own. Used by the purge_sessions command.
+"""
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.utils import timezone
+
+BATCH_SIZE = 1000
+# Engines that keep sessions in django_session
+DATABASE_ENGINES = ['django.contrib.sessions.backends.db', 'django.contrib.sessions.backends.cached_db']
+
+
+def uses_database_sessions():
+    return settings.SESSION_ENGINE in DATABASE_ENGINES
+
+
+def expired_sessions(now=None):
+    return Session.objects.filter(expire_date__lt=now or timezone.now())
+
+
+def purge_expired_sessions(batch_size=BATCH_SIZE):
+    """Delete expired sessions; yields the number deleted per batch"""
+    now = timezone.now()
+    while True:
+        keys = list(expired_sessions(now).order_by().values_list('session_key', flat=True)[:batch_size])
+        if not keys:
+            return
+        deleted, _ = Session.objects.filter(session_key__in=keys).delete()
+        yield deleted
@@ -1,3 +1,102 @@
-from django.test import TestCase
+import io
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from dashboard.models import Hospital
+from hospital_appoitment.env import parse_session_store
+from .backends import UserBackend
+from .models import CustomUser
+
+
+class UserBackendTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.hospital = Hospital.objects.create(name='General', address='1 Main Street')
+        cls.user = CustomUser.objects.create_user('staff', 'staff@example.com', 'pass', role='staff', hospital=cls.hospital)
+        cls.other = CustomUser.objects.create_user('other', 'other@example.com', 'pass', role='staff')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_sessions_logged_in_through_model_backend_stay_valid(self):
+        session = self.client.session
+        session[SESSION_KEY] = str(self.user.pk)
+        session[BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+        session[HASH_SESSION_KEY] = self.user.get_session_auth_hash()
+        session.save()
+        self.client.cookies['sessionid'] = session.session_key
+        response = self.client.get('/dashboard/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_wrong_password_is_checked_once(self):
+        with mock.patch.object(CustomUser, 'check_password', autospec=True, return_value=False) as check_password:
+            self.assertFalse(self.client.login(username='staff', password='wrong'))
+        self.assertEqual(check_password.call_count, 1)
+        self.assertTrue(self.client.login(username='staff', password='pass'))
+
+    @override_settings(REQUEST_USER_CACHE_TIMEOUT=60)
+    def test_cached_user_is_dropped_only_when_it_changes(self):
+        backend = UserBackend()
+        backend.get_user(self.user.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.other.save()
+        with self.assertNumQueries(0):
+            backend.get_user(self.user.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            CustomUser.objects.get(pk=self.user.pk).save(update_fields=['last_name'])
+        with self.assertNumQueries(1):
+            backend.get_user(self.user.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Hospital.objects.filter(pk=self.hospital.pk).get().save()
+        with self.assertNumQueries(1):
+            self.assertEqual(backend.get_user(self.user.pk).hospital, self.hospital)
+
+
+@override_settings(SESSION_ENGINE='django.contrib.sessions.backends.db')
+class PurgeSessionsTests(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        for number in range(5):
+            Session.objects.create(session_key=f'expired{number}', session_data='', expire_date=now - timedelta(days=1))
+        for number in range(2):
+            Session.objects.create(session_key=f'live{number}', session_data='', expire_date=now + timedelta(days=1))
+
+    def purge(self, *args):
+        out = io.StringIO()
+        call_command('purge_sessions', *args, stdout=out)
+        return out.getvalue().splitlines()
+
+    def test_expired_sessions_are_deleted_in_batches(self):
+        self.assertEqual(self.purge('--batch-size', '2'), [
+            'Deleted 2 sessions', 'Deleted 4 sessions', 'Deleted 5 sessions', 'Deleted 5 expired sessions',
+        ])
+        self.assertEqual(sorted(Session.objects.values_list('session_key', flat=True)), ['live0', 'live1'])
+
+    def test_dry_run_deletes_nothing(self):
+        self.assertEqual(self.purge('--dry-run'), ['Would delete 5 expired sessions'])
+        self.assertEqual(Session.objects.count(), 7)
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cache')
+    def test_other_stores_have_nothing_to_purge(self):
+        self.purge()
+        self.assertEqual(Session.objects.count(), 7)
+
+
+class SessionStoreSettingTests(SimpleTestCase):
+    def test_known_stores(self):
+        self.assertEqual(parse_session_store('cached_db'), 'django.contrib.sessions.backends.cached_db')
+        self.assertEqual(parse_session_store('signed_cookies'), 'django.contrib.sessions.backends.signed_cookies')
+
+    def test_unknown_store_is_rejected(self):
+        for name in ['redis', 'django.contrib.sessions.backends.db', '']:
+            with self.subTest(name=name), self.assertRaisesMessage(ValueError, f'Unsupported session store: {name}'):
+                parse_session_store(name)
@@ -0,0 +1,113 @@
+"""
+Live slot availability for the booking form.
+
+The slot_events view streams server-sent events for one doctor's day: a
+``slots`` snapshot of the times that cannot be booked, then ``taken`` and
+``freed`` events as they change, so the form updates its time list without
+polling /api/booked-times/.
+
+Streams subscribe here, in process, keyed by (doctor, date). Writes call
+slots_changed(): dashboard.signals for saves and deletes, the bulk paths and
+waitlist holds directly. Once the transaction commits every matching stream
+is woken and diffs a fresh booked_times() against what it last sent. Several wake-ups
+before a stream gets to run collapse into one query. Writes made by another
+process (other server workers, management commands) do not reach this one;
+streams also recheck every settings.AVAILABILITY_STREAM_RECHECK seconds to
+pick those up.
+"""
+import asyncio
+import threading
+
+from django.db import models, transaction
+from django.utils import timezone
+
+from dashboard.models import Appointment, BlockedTimeSlot, WaitlistEntry
+
+# (doctor id, ISO date) -> {asyncio.Queue: (event loop, hospital id)}
+_subscribers = {}
+_lock = threading.Lock()
+
+
+def _key(doctor_id, date):
+    # Ids arrive as strings from request data; dates as strings or date objects
+    return int(doctor_id), str(date)
+
+
+def held_times(doctor_id, date):
+    """Times on a doctor's day currently held for waitlisted patients"""
+    return WaitlistEntry.objects.filter(
+        doctor_id=doctor_id,
+        date=date,
+        status='offered',
+        offer_expires_at__gt=timezone.now(),
+    ).order_by().values_list('offered_time', flat=True)
+
+
+async def booked_times(doctor_id, hospital_id, date):
+    """Times on a doctor's day taken by appointments, waitlist holds or blocked slots"""
+    booked = Appointment.objects.filter(
+        doctor_id=doctor_id,
+        date=date,
+    ).exclude(status='cancelled').order_by().values_list('time', flat=True)
+    times = {slot_time async for slot_time in booked}
+    # Slots freed by a cancellation but held for a waitlisted patient
+    times.update([slot_time async for slot_time in held_times(doctor_id, date)])
+
+    if hospital_id is not None:
+        blocked_slots = BlockedTimeSlot.objects.filter(
+            hospital_id=hospital_id,
+            date=date,
+            is_active=True,
+        ).filter(
+            models.Q(doctor_id=doctor_id) | models.Q(doctor__isnull=True)  # Doctor-specific or all-doctor blocks
+        ).only('date', 'start_time', 'end_time')
+        async for blocked_slot in blocked_slots:
+            times.update(blocked_slot.get_time_slots())
+    return times
+
+
+def subscribe(doctor_id, hospital_id, date):
+    """Queue that receives a wake-up whenever the doctor's day may have changed"""
+    queue = asyncio.Queue(maxsize=1)
+    with _lock:
+        _subscribers.setdefault(_key(doctor_id, date), {})[queue] = (asyncio.get_running_loop(), int(hospital_id))
+    return queue
+
+
+def unsubscribe(doctor_id, date, queue):
+    key = _key(doctor_id, date)
+    with _lock:
+        queues = _subscribers.get(key, {})
+        queues.pop(queue, None)
+        if not queues:
+            _subscribers.pop(key, None)
+
+
+def _wake(queue):
+    # Runs on the stream's event loop; one pending wake-up is enough
+    if queue.empty():
+        queue.put_nowait(None)
+
+
+def publish(date, doctor_id=None, hospital_id=None):
+    """Wake the streams of one doctor's day, or of every doctor of a hospital that day"""
+    date = str(date)
+    with _lock:
+        if doctor_id is not None:
+            targets = list(_subscribers.get(_key(doctor_id, date), {}).items())
+        else:
+            targets = [
+                (queue, subscriber)
+                for (_, day), queues in _subscribers.items() if day == date
+                for queue, subscriber in queues.items() if subscriber[1] == int(hospital_id)
+            ]
+    for queue, (loop, _) in targets:
+        loop.call_soon_threadsafe(_wake, queue)
+
+
+def slots_changed(date, doctor_id=None, hospital_id=None):
+    """Wake the affected streams once the current transaction commits (see publish)"""
+    if not _subscribers:
+        # Nobody is listening in this process
+        return
+    transaction.on_commit(lambda: publish(date, doctor_id=doctor_id, hospital_id=hospital_id))
@@ -0,0 +1,201 @@
+"""
+Booking rules and batch booking.
+
+book_appointments() books many patients at once (vaccination drives, call
+centres) with a fixed number of queries whatever the batch size: one query
+each for the doctors and services referenced, one for the eligibility rules of
+every patient in the batch, one each for the booked and held slots, then one
+bulk INSERT each of appointments, status events and confirmation SMS, all in
+one transaction. Items that fail validation are reported and skipped; the rest
+are booked.
+"""
+from datetime import date as date_cls, timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from accounts.access import hospital_limit
+from dashboard.fragment_cache import APPOINTMENTS, bump_version
+from dashboard.models import Appointment, AppointmentEvent, Doctor, Service, WaitlistEntry, appointment_start
+from .availability import slots_changed
+from .notifications import queue_appointment_confirmations
+
+PENDING_MESSAGE = "You have a pending appointment that has not been approved yet. Please wait for approval before booking another appointment."
+COOLDOWN_MESSAGE = "You have had an approved appointment within the last month. Please wait 30 days from your last appointment before booking a new one."
+SLOT_TAKEN_MESSAGE = "This time slot is already booked. Please select a different time."
+COOLDOWN = timedelta(days=30)
+MAX_BATCH_SIZE = 200
+REQUIRED_FIELDS = ['full_name', 'email', 'phone', 'hospital_id', 'doctor_id', 'service_id', 'date', 'time']
+# Attempts when a concurrent booking takes a slot between the check and the insert
+INSERT_ATTEMPTS = 3
+
+
+def ineligible_contacts(emails, phones):
+    """
+    Apply the booking rules to many patients with one query.
+
+    Returns:
+        tuple: (pending, cooldown) - sets of the emails and phones that have a
+        pending appointment, or an approved one booked in the last 30 days
+    """
+    pending, cooldown = set(), set()
+    if not emails and not phones:
+        return pending, cooldown
+    rows = Appointment.objects.filter(
+        Q(email__in=emails) | Q(phone__in=phones),
+    ).filter(
+        Q(status='pending') | Q(status__in=['confirmed', 'completed'], created_at__gte=timezone.now() - COOLDOWN),
+    ).order_by().values_list('email', 'phone', 'status')
+    for email, phone, status in rows:
+        target = pending if status == 'pending' else cooldown
+        target.update([email, phone])
+    return pending, cooldown
+
+
+def taken_slots(doctor_ids, dates):
+    """(doctor_id, date, time) of every booked or held slot on the given doctors' days"""
+    booked = Appointment.objects.filter(
+        doctor_id__in=doctor_ids, date__in=dates,
+    ).exclude(status='cancelled').order_by().values_list('doctor_id', 'date', 'time')
+    held = WaitlistEntry.objects.filter(
+        doctor_id__in=doctor_ids,
+        date__in=dates,
+        status='offered',
+        offer_expires_at__gt=timezone.now(),
+    ).order_by().values_list('doctor_id', 'date', 'offered_time')
+    return set(booked) | set(held)
+
+
+def _clean_item(item, doctors, services, hospital_id):
+    """Check one batch item; returns (values, error)"""
+    if not isinstance(item, dict):
+        return None, 'Each booking must be an object'
+    missing = [field for field in REQUIRED_FIELDS if not item.get(field)]
+    if missing:
+        return None, f"Missing fields: {', '.join(missing)}"
+    try:
+        values = {
+            'full_name': str(item['full_name']),
+            'email': str(item['email']).strip(),
+            'phone': str(item['phone']).strip(),
+            'hospital_id': int(item['hospital_id']),
+            'doctor_id': int(item['doctor_id']),
+            'service_id': int(item['service_id']),
+            'date': date_cls.fromisoformat(str(item['date'])),
+            'time': str(item['time']),
+            'reason': str(item.get('reason', '')),
+        }
+    except ValueError:
+        return None, 'Invalid ids or date (dates are YYYY-MM-DD)'
+
+    if hospital_id is not None and values['hospital_id'] != hospital_id:
+        return None, 'You can only book appointments at your hospital'
+    doctor = doctors.get(values['doctor_id'])
+    if doctor is None or doctor.hospital_id != values['hospital_id']:
+        return None, 'Doctor not found at this hospital'
+    service = services.get(values['service_id'])
+    if service is None or service.hospital_id != values['hospital_id']:
+        return None, 'Service not found at this hospital'
+    values['doctor'] = doctor
+    values['hospital'] = doctor.hospital
+    values['service'] = service
+    return values, None
+
+
+def _insert(candidates, actor):
+    """Book the candidates whose slot is still free; returns (appointments, taken indexes)"""
+    with transaction.atomic():
+        taken = taken_slots({values['doctor_id'] for _, values in candidates}, {values['date'] for _, values in candidates})
+        appointments, taken_indexes = [], []
+        for index, values in candidates:
+            slot = (values['doctor_id'], values['date'], values['time'])
+            if slot in taken:
+                taken_indexes.append(index)
+                continue
+            taken.add(slot)
+            values = {key: value for key, value in values.items() if not key.endswith('_id')}
+            appointments.append((index, Appointment(starts_at=appointment_start(values['date'], values['time']), **values)))
+
+        Appointment.objects.bulk_create([appointment for _, appointment in appointments])
+        now = timezone.now()
+        AppointmentEvent.objects.bulk_create([
+            AppointmentEvent(
+                appointment_id=appointment.id,
+                hospital_id=appointment.hospital_id,
+                actor=actor,
+                to_status=AppointmentEvent.STATUS_CODES['pending'],
+                timestamp=now,
+            )
+            for _, appointment in appointments
+        ])
+        queue_appointment_confirmations([appointment for _, appointment in appointments])
+        # bulk_create sends no post_save
+        bump_version(APPOINTMENTS, hospital_ids={appointment.hospital_id for _, appointment in appointments})
+        for doctor_id, date in {(appointment.doctor_id, appointment.date) for _, appointment in appointments}:
+            slots_changed(date, doctor_id=doctor_id)
+    return appointments, taken_indexes
+
+
+def book_appointments(items, user=None):
+    """
+    Book a batch of appointments. Staff may only book at their own hospital.
+
+    Returns:
+        list: one result per item, in order - {'index': i, 'success': True,
+        'appointmentId': id} or {'index': i, 'success': False, 'error': msg}
+    """
+    actor = user if user is not None and user.is_authenticated else None
+    hospital_id = hospital_limit(actor)
+
+    def ids(field):
+        found = set()
+        for item in items:
+            try:
+                found.add(int(item.get(field)))
+            except (AttributeError, TypeError, ValueError):
+                pass
+        return found
+
+    doctors = Doctor.objects.select_related('hospital').in_bulk(ids('doctor_id'))
+    services = Service.objects.in_bulk(ids('service_id'))
+
+    results = [None] * len(items)
+    candidates = []
+    for index, item in enumerate(items):
+        values, error = _clean_item(item, doctors, services, hospital_id)
+        if error:
+            results[index] = {'index': index, 'success': False, 'error': error}
+        else:
+            candidates.append((index, values))
+
+    pending, cooldown = ineligible_contacts(
+        {values['email'] for _, values in candidates},
+        {values['phone'] for _, values in candidates},
+    )
+    eligible = []
+    for index, values in candidates:
+        contacts = {values['email'], values['phone']}
+        if contacts & pending:
+            results[index] = {'index': index, 'success': False, 'error': PENDING_MESSAGE}
+        elif contacts & cooldown:
+            results[index] = {'index': index, 'success': False, 'error': COOLDOWN_MESSAGE}
+        else:
+            # The booking makes the patient pending, so a later item for them fails
+            pending.update(contacts)
+            eligible.append((index, values))
+
+    for attempt in range(INSERT_ATTEMPTS):
+        try:
+            booked, taken_indexes = _insert(eligible, actor) if eligible else ([], [])
+            break
+        except IntegrityError:
+            # A concurrent booking took one of the slots; check them again
+            if attempt == INSERT_ATTEMPTS - 1:
+                raise
+
+    for index, appointment in booked:
+        results[index] = {'index': index, 'success': True, 'appointmentId': appointment.id}
+    for index in taken_indexes:
+        results[index] = {'index': index, 'success': False, 'error': SLOT_TAKEN_MESSAGE}
+    return results
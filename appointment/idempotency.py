@@ -0,0 +1,94 @@
+"""
+Idempotency-Key support for POST endpoints that create things.
+
+A client that may retry sends the same ``Idempotency-Key`` header with every
+attempt. Keys are scoped to the client (the logged-in user, otherwise the
+client IP) and the request path, so two clients picking the same key never
+see each other's responses. The first response for a key is stored in the default cache for
+settings.IDEMPOTENCY_KEY_TTL seconds; retries get that response back
+(marked ``Idempotent-Replayed: true``) without running the view, so a retry
+after a lost response neither books twice nor sends a second SMS.
+
+While the first attempt is still running, retries get 409. A key reused with
+a different request body gets 422. Server errors and 429s are not stored, so
+those attempts can be retried for real.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse
+
+from .ratelimit import client_ip
+
+HEADER = 'HTTP_IDEMPOTENCY_KEY'
+MAX_KEY_LENGTH = 255
+# Longest a view is expected to run; a crashed attempt frees its key after this
+LOCK_TIMEOUT = 60
+REPLAYED_HEADERS = ['Content-Type', 'Location', 'Retry-After']
+
+
+def _cache_key(request, key):
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        client = f'user:{user.pk}'
+    else:
+        # Not the session: the first attempt may be what creates it
+        client = f'ip:{client_ip(request)}'
+    scope = '\n'.join([client, request.path, key])
+    return f'idempotency:{hashlib.sha256(scope.encode()).hexdigest()}'
+
+
+def _fingerprint(request):
+    return hashlib.sha256(request.method.encode() + request.path.encode() + request.body).hexdigest()
+
+
+def _store(cache_key, fingerprint, response):
+    cache.set(cache_key, {
+        'fingerprint': fingerprint,
+        'status': response.status_code,
+        'headers': {name: response[name] for name in REPLAYED_HEADERS if response.has_header(name)},
+        'content': response.content,
+    }, settings.IDEMPOTENCY_KEY_TTL)
+
+
+def _replay(stored):
+    response = HttpResponse(stored['content'], status=stored['status'])
+    for name, value in stored['headers'].items():
+        response[name] = value
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(view):
+    """Honour the Idempotency-Key header on ``view``; requests without one are unaffected"""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.META.get(HEADER, '').strip()
+        if request.method != 'POST' or not key:
+            return view(request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return JsonResponse({'success': False, 'error': 'Idempotency-Key is too long'}, status=400)
+
+        cache_key = _cache_key(request, key)
+        fingerprint = _fingerprint(request)
+        stored = cache.get(cache_key)
+        if stored is not None:
+            if stored['fingerprint'] != fingerprint:
+                return JsonResponse({'success': False, 'error': 'Idempotency-Key was used for a different request'}, status=422)
+            return _replay(stored)
+
+        lock_key = f'{cache_key}:lock'
+        if not cache.add(lock_key, fingerprint, LOCK_TIMEOUT):
+            response = JsonResponse({'success': False, 'error': 'A request with this Idempotency-Key is in progress'}, status=409)
+            response['Retry-After'] = '1'
+            return response
+        try:
+            response = view(request, *args, **kwargs)
+            if response.status_code < 500 and response.status_code != 429 and not response.streaming:
+                _store(cache_key, fingerprint, response)
+            return response
+        finally:
+            cache.delete(lock_key)
+    return wrapper
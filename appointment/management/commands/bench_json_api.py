@@ -0,0 +1,108 @@
+"""
+Benchmark JSON encoding of the booking form's read endpoints.
+
+Usage:
+    python manage.py bench_json_api --iterations 500
+    python manage.py bench_json_api --endpoint doctors --hospital 3
+
+For the hospitals, doctors and services endpoints, builds the response body
+from the configured database three ways:
+
+* values+copy   - the previous views: .values() dicts copied into new dicts,
+                  encoded by JsonResponse (json + DjangoJSONEncoder)
+* rows+json     - hospital_appoitment.serializers with the json module
+* rows+orjson   - hospital_appoitment.serializers with orjson (if installed)
+
+and reports responses per second and the peak memory allocated while building
+one response (tracemalloc). The query is included, as it is in the views; use
+a hospital with many doctors (e.g. from seed_load_data) to see the encoding.
+"""
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.http import JsonResponse
+
+from dashboard.models import Doctor, Hospital, Service
+from hospital_appoitment import serializers
+from appointment.views import DOCTOR_FIELDS, SERVICE_FIELDS
+
+
+def _querysets(hospital_id):
+    return {
+        'hospitals': (Hospital.objects.all(), {'id': 'id', 'name': 'name'}),
+        'doctors': (Doctor.objects.filter(hospital_id=hospital_id), DOCTOR_FIELDS),
+        'services': (Service.objects.filter(hospital_id=hospital_id, is_active=True), SERVICE_FIELDS),
+    }
+
+
+def _copy_response(queryset, fields):
+    # What the views did before: one dict from values(), then a renamed copy
+    rows = []
+    for row in queryset.values(*fields.values()):
+        rows.append({key: row[field] for key, field in fields.items()})
+    return JsonResponse(rows, safe=False)
+
+
+def _rows_response(queryset, fields):
+    return serializers.JSONResponse(serializers.records(queryset, fields))
+
+
+@contextmanager
+def _encoder(module):
+    saved = serializers.orjson
+    serializers.orjson = module
+    try:
+        yield
+    finally:
+        serializers.orjson = saved
+
+
+class Command(BaseCommand):
+    help = 'Compare throughput and allocations of the JSON read endpoints per encoder'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=500, help='Responses built per endpoint and variant')
+        parser.add_argument('--endpoint', choices=['hospitals', 'doctors', 'services', 'all'], default='all')
+        parser.add_argument('--hospital', type=int, help='Hospital for doctors/services; defaults to the one with most doctors')
+
+    def handle(self, *args, **options):
+        hospital_id = options['hospital']
+        if hospital_id is None:
+            hospital = Hospital.objects.annotate(doctor_count=Count('doctors')).order_by('-doctor_count').only('id').first()
+            if hospital is None:
+                raise CommandError('No hospitals found. Seed some data first, e.g. python manage.py seed_load_data.')
+            hospital_id = hospital.id
+
+        variants = [('values+copy', _copy_response, None), ('rows+json', _rows_response, None)]
+        if serializers.orjson is not None:
+            variants.append(('rows+orjson', _rows_response, serializers.orjson))
+        else:
+            self.stderr.write('orjson is not installed; skipping rows+orjson')
+
+        self.stdout.write(f"{'endpoint':<11}{'variant':<13}{'rows':>7}{'bytes':>10}{'resp/s':>10}{'peak KiB':>10}")
+        for endpoint, (queryset, fields) in _querysets(hospital_id).items():
+            if options['endpoint'] not in ('all', endpoint):
+                continue
+            for name, build, module in variants:
+                with _encoder(module):
+                    rows, size, rate, peak = self._measure(build, queryset, fields, options['iterations'])
+                self.stdout.write(f'{endpoint:<11}{name:<13}{rows:>7}{size:>10}{rate:>10.0f}{peak / 1024:>10.1f}')
+
+    def _measure(self, build, queryset, fields, iterations):
+        # Warm up (and check the variant produces a body)
+        response = build(queryset.all(), fields)
+        rows = len(serializers.records(queryset.all(), fields))
+
+        tracemalloc.start()
+        build(queryset.all(), fields)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        started = time.perf_counter()
+        for _ in range(iterations):
+            build(queryset.all(), fields)
+        elapsed = time.perf_counter() - started
+        return rows, len(response.content), iterations / elapsed, peak
@@ -0,0 +1,99 @@
+"""
+Compare throughput of the public booking API under the WSGI and ASGI handlers.
+
+Usage:
+    python manage.py loadtest_api --requests 2000 --concurrency 50
+
+Both runs execute in this process against the configured database, so they
+share the same hardware. The WSGI run serves requests from a thread pool the
+size of --concurrency (one thread per in-flight request, like a threaded WSGI
+server); the ASGI run serves them from a single event loop with the same
+number of in-flight requests.
+"""
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+
+from dashboard.models import Appointment, Doctor
+
+
+class Command(BaseCommand):
+    help = 'Load test the booking API endpoints under WSGI (threads) and ASGI (event loop)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='Requests per endpoint and handler')
+        parser.add_argument('--concurrency', type=int, default=50, help='Requests in flight at once')
+        parser.add_argument('--endpoint', choices=['booked-times', 'doctors', 'services', 'hospitals', 'all'], default='all')
+        parser.add_argument('--handler', choices=['wsgi', 'asgi', 'both'], default='both')
+
+    def handle(self, *args, **options):
+        appointment = Appointment.objects.only('doctor_id', 'hospital_id', 'date').order_by('-date').first()
+        doctor = Doctor.objects.only('id', 'hospital_id').first()
+        if appointment is None and doctor is None:
+            raise CommandError('No doctors found. Seed some data first, e.g. python manage.py seed_load_data.')
+        if appointment is not None:
+            doctor_id, hospital_id, date = appointment.doctor_id, appointment.hospital_id, appointment.date
+        else:
+            doctor_id, hospital_id, date = doctor.id, doctor.hospital_id, '2030-01-01'
+
+        endpoints = {
+            'booked-times': f"{reverse('get_booked_times')}?doctorId={doctor_id}&date={date}",
+            'doctors': f"{reverse('get_doctors')}?hospitalId={hospital_id}",
+            'services': f"{reverse('get_services')}?hospitalId={hospital_id}",
+            'hospitals': reverse('get_hospitals'),
+        }
+        if options['endpoint'] != 'all':
+            endpoints = {options['endpoint']: endpoints[options['endpoint']]}
+        handlers = ['wsgi', 'asgi'] if options['handler'] == 'both' else [options['handler']]
+
+        total, concurrency = options['requests'], options['concurrency']
+        self.stdout.write(f'{total} requests per run, {concurrency} in flight\n')
+        self.stdout.write(f"{'endpoint':<14}{'handler':<9}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'errors':>8}")
+
+        # The test clients send Host: testserver
+        with override_settings(ALLOWED_HOSTS=['testserver'], DEBUG=False):
+            for name, url in endpoints.items():
+                for handler in handlers:
+                    if handler == 'wsgi':
+                        elapsed, latencies, errors = self._run_wsgi(url, total, concurrency)
+                    else:
+                        elapsed, latencies, errors = asyncio.run(self._run_asgi(url, total, concurrency))
+                    latencies.sort()
+                    self.stdout.write(
+                        f'{name:<14}{handler:<9}{total / elapsed:>10.1f}'
+                        f'{statistics.median(latencies) * 1000:>10.1f}'
+                        f'{latencies[int(len(latencies) * 0.95) - 1] * 1000:>10.1f}{errors:>8}'
+                    )
+
+    def _run_wsgi(self, url, total, concurrency):
+        # One client per call: django.test.Client is not thread-safe
+        def call(_):
+            started = time.perf_counter()
+            response = Client().get(url)
+            return time.perf_counter() - started, response.status_code
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(call, range(total)))
+        elapsed = time.perf_counter() - started
+        return elapsed, [latency for latency, _ in results], sum(1 for _, status in results if status != 200)
+
+    async def _run_asgi(self, url, total, concurrency):
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def call():
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.get(url)
+                return time.perf_counter() - started, response.status_code
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(call() for _ in range(total)))
+        elapsed = time.perf_counter() - started
+        return elapsed, [latency for latency, _ in results], sum(1 for _, status in results if status != 200)
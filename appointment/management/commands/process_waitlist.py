@@ -0,0 +1,35 @@
+"""
+Worker that expires waitlist offers nobody accepted in time.
+
+Usage:
+    python manage.py process_waitlist            # run until interrupted
+    python manage.py process_waitlist --once     # expire what is due and exit
+
+Each expired offer's slot goes to the next patient waiting for that doctor's
+day (see appointment.waitlist).
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from appointment.waitlist import expire_offers
+
+
+class Command(BaseCommand):
+    help = 'Expire unanswered waitlist offers and pass their slots on'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--sleep', type=float, default=30.0, help='Seconds to wait when nothing is due')
+        parser.add_argument('--once', action='store_true', help='Exit once nothing is due')
+
+    def handle(self, *args, **options):
+        while True:
+            expired = expire_offers(options['batch_size'])
+            if expired:
+                self.stdout.write(f'Expired {expired} waitlist offers')
+                continue
+
+            if options['once']:
+                break
+            time.sleep(options['sleep'])
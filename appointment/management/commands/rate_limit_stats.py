@@ -0,0 +1,31 @@
+"""
+Show how many booking attempts each rate limit allowed and blocked.
+
+Usage:
+    python manage.py rate_limit_stats            # counters since the last reset
+    python manage.py rate_limit_stats --reset    # print, then start counting afresh
+
+The counters live in the default cache, so this only sees the web processes'
+numbers when CACHE_URL points at a shared cache.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from appointment.ratelimit import reset_stats, stats
+
+
+class Command(BaseCommand):
+    help = 'Show allowed and blocked counts per booking rate limit'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset the counters after printing them')
+
+    def handle(self, *args, **options):
+        for scope, counters in stats().items():
+            limit, window = settings.RATE_LIMITS[scope]
+            self.stdout.write(
+                f"{scope:<15} limit {limit}/{window}s  allowed {counters['allowed']:>8}  blocked {counters['blocked']:>8}"
+            )
+        if options['reset']:
+            reset_stats()
+            self.stdout.write('Counters reset')
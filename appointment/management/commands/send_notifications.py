@@ -0,0 +1,39 @@
+"""
+Worker that delivers queued SMS notifications.
+
+Usage:
+    python manage.py send_notifications            # run until interrupted
+    python manage.py send_notifications --once     # drain the queue and exit
+
+Several workers can run side by side: on PostgreSQL each claims its batch
+with SELECT ... FOR UPDATE SKIP LOCKED, so they never wait on each other.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from appointment.notifications import process_notification_batch, release_stale_notifications
+
+
+class Command(BaseCommand):
+    help = 'Send queued SMS notifications in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--sleep', type=float, default=5.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty')
+
+    def handle(self, *args, **options):
+        while True:
+            released = release_stale_notifications()
+            if released:
+                self.stdout.write(f'Requeued {released} stale notifications')
+
+            claimed, sent = process_notification_batch(options['batch_size'])
+            if claimed:
+                self.stdout.write(f'Sent {sent}/{claimed} notifications')
+                continue
+
+            if options['once']:
+                break
+            time.sleep(options['sleep'])
@@ -0,0 +1,45 @@
+"""
+Scheduler that queues appointment reminder SMS.
+
+Usage:
+    python manage.py send_reminders                  # tick every minute until interrupted
+    python manage.py send_reminders --once           # one tick, e.g. from cron
+    python manage.py send_reminders --lead 24 --lead 1
+
+Each tick covers the time since the previous one; on start-up it looks back
+--catch-up minutes so reminders due while it was down still go out. The
+messages are delivered by the send_notifications worker.
+"""
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from appointment.reminders import REMINDER_LEADS, queue_reminders
+
+
+class Command(BaseCommand):
+    help = 'Queue reminder SMS for upcoming appointments'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lead', type=int, action='append', dest='leads', help=f'Hours before the appointment (default: {REMINDER_LEADS})')
+        parser.add_argument('--interval', type=float, default=60.0, help='Seconds between ticks')
+        parser.add_argument('--catch-up', type=int, default=60, help='Minutes to look back on start-up')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--once', action='store_true', help='Run a single tick and exit')
+
+    def handle(self, *args, **options):
+        leads = options['leads'] or REMINDER_LEADS
+        since = timezone.now() - timedelta(minutes=options['catch_up'])
+        while True:
+            until = timezone.now()
+            for lead_hours in leads:
+                queued = queue_reminders(since, until, lead_hours, options['batch_size'])
+                if queued:
+                    self.stdout.write(f'Queued {queued} {lead_hours}h reminders')
+            since = until
+
+            if options['once']:
+                break
+            time.sleep(options['interval'])
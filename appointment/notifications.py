@@ -0,0 +1,186 @@
+"""
+SMS notification queue.
+
+Messages are stored as SmsNotification rows before anything is sent, so a
+crash or a gateway outage never loses them. Rows are delivered either
+straight away from the background event loop (dispatch_notification) or by the
+send_notifications worker, which claims batches with SELECT ... FOR UPDATE
+SKIP LOCKED where the database supports it. A claimed batch goes to the
+gateway's bulk endpoint in one request (see send_notifications).
+"""
+import asyncio
+import logging
+from datetime import timedelta
+
+import httpx
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from dashboard.models import SmsNotification
+from hospital_appoitment.db import claim_batch
+from .utils import async_send_bulk_sms, build_appointment_confirmation_sms, format_phone_number, run_in_background
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 5
+# Rows stuck in 'sending' this long belong to a worker that died
+STALE_AFTER = timedelta(minutes=10)
+
+
+def queue_sms(phone, message, kind='other', appointment=None, send_after=None, dispatch=False):
+    """
+    Store an SMS for delivery by the worker. With ``dispatch`` it is sent from
+    the background event loop as soon as the surrounding transaction commits.
+    """
+    notification = SmsNotification(
+        appointment=appointment,
+        kind=kind,
+        phone=format_phone_number(phone),
+        message=message,
+        send_after=send_after or timezone.now(),
+    )
+    if dispatch:
+        # Claimed by this request; the worker only picks it up again if it goes stale
+        notification.status = 'sending'
+        notification.locked_at = timezone.now()
+    notification.save()
+    if dispatch:
+        transaction.on_commit(lambda: dispatch_notification(notification))
+    return notification
+
+
+def queue_appointment_confirmation(appointment):
+    """Store the confirmation SMS for an appointment and send it straight away"""
+    phone_number, message = build_appointment_confirmation_sms(appointment)
+    return queue_sms(phone_number, message, kind='confirmation', appointment=appointment, dispatch=True)
+
+
+def queue_appointment_confirmations(appointments):
+    """
+    Store the confirmation SMS for many appointments with one INSERT and send
+    them together from the background event loop once the transaction commits
+    """
+    now = timezone.now()
+    notifications = []
+    for appointment in appointments:
+        phone_number, message = build_appointment_confirmation_sms(appointment)
+        notifications.append(SmsNotification(
+            appointment=appointment,
+            kind='confirmation',
+            phone=phone_number,
+            message=message,
+            send_after=now,
+            status='sending',
+            locked_at=now,
+        ))
+    SmsNotification.objects.bulk_create(notifications)
+    if notifications:
+        transaction.on_commit(lambda: run_in_background(_deliver(notifications)))
+    return notifications
+
+
+def dispatch_notification(notification):
+    """Send an already-claimed notification without waiting for the gateway"""
+    return run_in_background(_deliver([notification]))
+
+
+def claim_notifications(limit=100):
+    """Mark up to ``limit`` due notifications as 'sending' and return them"""
+    due = SmsNotification.objects.filter(send_after__lte=timezone.now()).order_by('send_after')
+    return claim_batch(due, limit, 'sending')
+
+
+def release_stale_notifications():
+    """Put notifications abandoned by a dead worker back in the queue"""
+    return SmsNotification.objects.filter(
+        status='sending',
+        locked_at__lt=timezone.now() - STALE_AFTER,
+    ).update(status='queued', locked_at=None)
+
+
+def _bulk_batches(notifications):
+    """
+    Split notifications into bulk requests of at most SMS_BULK_SIZE: the
+    gateway keys recipients by number, so a number repeated in the batch goes
+    into the next request.
+    """
+    batches = []
+    for notification in notifications:
+        for batch in batches:
+            if len(batch) < settings.SMS_BULK_SIZE and notification.phone not in batch:
+                batch[notification.phone] = notification
+                break
+        else:
+            batches.append({notification.phone: notification})
+    return batches
+
+
+async def send_notifications(notifications):
+    """
+    Send notifications with one bulk gateway request per SMS_BULK_SIZE of them
+    (more only when a number repeats).
+
+    Returns:
+        dict: {notification id: gateway response for that message}
+    """
+    async with httpx.AsyncClient(timeout=30) as client:
+        batches = _bulk_batches(notifications)
+        results = await asyncio.gather(*(
+            async_send_bulk_sms(
+                settings.ARKESSEL_API_KEY, settings.ARKESSEL_SENDER_ID,
+                [(phone, notification.message) for phone, notification in batch.items()],
+                client,
+            )
+            for batch in batches
+        ))
+    return {
+        notification.id: result[phone]
+        for batch, result in zip(batches, results)
+        for phone, notification in batch.items()
+    }
+
+
+def record_results(notifications, responses):
+    """
+    Mark sent notifications and schedule retries with exponential backoff.
+    ``responses`` maps notification ids to their gateway response; one
+    without a response is retried.
+    """
+    now = timezone.now()
+    sent_ids = []
+    for notification in notifications:
+        response = responses.get(notification.id, {'status': 'error', 'message': 'No response from the gateway'})
+        if response.get('status') != 'error':
+            sent_ids.append(notification.id)
+            continue
+        notification.attempts += 1
+        notification.last_error = str(response.get('message', ''))[:255]
+        notification.locked_at = None
+        if notification.attempts >= MAX_ATTEMPTS:
+            notification.status = 'failed'
+        else:
+            notification.status = 'queued'
+            notification.send_after = now + timedelta(minutes=2 ** notification.attempts)
+        notification.save(update_fields=['attempts', 'last_error', 'locked_at', 'status', 'send_after'])
+    SmsNotification.objects.filter(id__in=sent_ids).update(status='sent', sent_at=now, locked_at=None)
+    return len(sent_ids)
+
+
+async def _deliver(notifications):
+    try:
+        responses = await send_notifications(notifications)
+        await sync_to_async(record_results)(notifications, responses)
+    except Exception as e:
+        # Left in 'sending'; the worker requeues it once it goes stale
+        logger.error(f"Error sending SMS notifications {[n.id for n in notifications]}: {str(e)}")
+
+
+def process_notification_batch(limit=100):
+    """Claim, send and record one batch. Returns (claimed, sent)."""
+    notifications = claim_notifications(limit)
+    if not notifications:
+        return 0, 0
+    responses = asyncio.run(send_notifications(notifications))
+    return len(notifications), record_results(notifications, responses)
@@ -0,0 +1,118 @@
+"""
+Rate limiting for the public booking endpoint.
+
+Each booking attempt is counted against the client IP, the phone number and
+the email address, with the limits in settings.RATE_LIMITS. Counting uses a
+sliding window: the current fixed window's count plus the previous window's
+count weighted by how much of it still overlaps the last ``window`` seconds.
+That needs two cache keys per identifier and one atomic incr per attempt, so
+it works on any shared cache backend (set CACHE_URL so every process sees
+the same counters; the default memory cache is per process).
+
+The checks run before any database work. Allowed and blocked attempts per
+scope are counted in the cache too; see the rate_limit_stats command.
+"""
+import hashlib
+import logging
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+OUTCOMES = ['allowed', 'blocked']
+
+
+def client_ip(request):
+    """
+    Address of the client. With RATE_LIMIT_PROXY_COUNT trusted proxies in
+    front of the app, it is the entry those proxies appended to
+    X-Forwarded-For; anything further left is client-supplied.
+    """
+    proxies = settings.RATE_LIMIT_PROXY_COUNT
+    forwarded = [ip.strip() for ip in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if ip.strip()]
+    if proxies and len(forwarded) >= proxies:
+        return forwarded[-proxies]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def _incr(key, timeout):
+    # add() is a no-op when the key exists, so concurrent first hits do not reset it
+    cache.add(key, 0, timeout)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Expired between add() and incr()
+        cache.set(key, 1, timeout)
+        return 1
+
+
+def hit(scope, identifier, limit, window):
+    """
+    Count one attempt by ``identifier`` in ``scope``.
+
+    Returns:
+        tuple: (allowed, retry_after) - retry_after is the number of seconds
+        until the attempt would be allowed, 0 when it is
+    """
+    # Hashed so phone numbers and emails do not end up in cache keys
+    digest = hashlib.sha256(str(identifier).lower().encode()).hexdigest()[:32]
+    now = time.time()
+    current = int(now // window)
+    key = f'ratelimit:{scope}:{digest}'
+    count = _incr(f'{key}:{current}', window * 2)
+    previous = cache.get(f'{key}:{current - 1}', 0)
+    elapsed = (now % window) / window
+    if previous * (1 - elapsed) + count <= limit:
+        return True, 0
+    # The previous window's weight fades linearly; at the next window this
+    # window's count becomes the previous one
+    retry_after = (current + 1) * window - now
+    if count <= limit:
+        retry_after = min(retry_after, (previous * (1 - elapsed) + count - limit) / previous * window)
+    return False, max(1, math.ceil(retry_after))
+
+
+def _stats_keys():
+    return {
+        (scope, outcome): f'ratelimit-stats:{scope}:{outcome}'
+        for scope in settings.RATE_LIMITS
+        for outcome in OUTCOMES
+    }
+
+
+def stats():
+    """{scope: {'allowed': n, 'blocked': n}} since the counters were last reset"""
+    keys = _stats_keys()
+    values = cache.get_many(keys.values())
+    counters = {scope: {} for scope in settings.RATE_LIMITS}
+    for (scope, outcome), key in keys.items():
+        counters[scope][outcome] = values.get(key, 0)
+    return counters
+
+
+def reset_stats():
+    cache.delete_many(list(_stats_keys().values()))
+
+
+def check(identifiers):
+    """
+    Count an attempt against every ``{scope: identifier}`` pair that has a
+    limit in settings.RATE_LIMITS; empty identifiers are skipped.
+
+    Returns:
+        int: seconds to wait if any limit is exceeded, otherwise 0
+    """
+    retry_after = 0
+    for scope, identifier in identifiers.items():
+        if not identifier or scope not in settings.RATE_LIMITS:
+            continue
+        limit, window = settings.RATE_LIMITS[scope]
+        allowed, wait = hit(scope, identifier, limit, window)
+        _incr(f'ratelimit-stats:{scope}:{"allowed" if allowed else "blocked"}', None)
+        if not allowed:
+            logger.warning(f"Rate limit {scope} exceeded ({limit} per {window}s)")
+            retry_after = max(retry_after, wait)
+    return retry_after
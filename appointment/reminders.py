@@ -0,0 +1,82 @@
+"""
+Appointment reminders.
+
+Each tick of the send_reminders scheduler asks for the active appointments
+whose start falls in the slice of time that has just come within ``lead``
+hours, i.e. starts_at in (previous tick + lead, this tick + lead]. That is one
+range scan over the appointment_starts_at_idx index, however many
+appointments the table holds.
+
+Reminders are queued as SmsNotification rows and delivered by the
+send_notifications worker. Every row carries a dedupe key such as
+'reminder:24h:<appointment id>', unique in the database, so a scheduler that
+restarts and scans the same slice again never queues a second message.
+"""
+from datetime import timedelta
+
+from django.utils import timezone
+
+from dashboard.models import Appointment, SmsNotification
+from .utils import build_appointment_reminder_sms
+
+# Hours before the appointment at which reminders go out
+REMINDER_LEADS = [24, 2]
+REMINDER_STATUSES = ['pending', 'confirmed']
+BATCH_SIZE = 1000
+
+
+def reminder_key(appointment_id, lead_hours):
+    return f'reminder:{lead_hours}h:{appointment_id}'
+
+
+def upcoming_appointments(start, end):
+    """Active appointments starting in (start, end]"""
+    return (
+        Appointment.objects.filter(status__in=REMINDER_STATUSES, starts_at__gt=start, starts_at__lte=end)
+        .select_related('hospital', 'doctor')
+        .only('id', 'full_name', 'phone', 'date', 'time', 'hospital__name', 'doctor__name')
+        .order_by()
+    )
+
+
+def _queue_batch(appointments, lead_hours):
+    keys = {reminder_key(appointment.id, lead_hours): appointment for appointment in appointments}
+    queued = set(SmsNotification.objects.filter(dedupe_key__in=keys).values_list('dedupe_key', flat=True))
+    now = timezone.now()
+    rows = []
+    for key, appointment in keys.items():
+        if key in queued:
+            continue
+        phone_number, message = build_appointment_reminder_sms(appointment)
+        rows.append(SmsNotification(
+            appointment=appointment,
+            kind='reminder',
+            phone=phone_number,
+            message=message,
+            dedupe_key=key,
+            send_after=now,
+        ))
+    # ignore_conflicts covers a second scheduler racing on the same keys
+    SmsNotification.objects.bulk_create(rows, ignore_conflicts=True)
+    return len(rows)
+
+
+def queue_reminders(since, until, lead_hours, batch_size=BATCH_SIZE):
+    """
+    Queue ``lead_hours`` reminders for appointments that came within
+    ``lead_hours`` between ``since`` and ``until``. Appointments that have
+    already started are skipped. Returns the number of reminders queued.
+    """
+    lead = timedelta(hours=lead_hours)
+    start = max(since + lead, timezone.now())
+    appointments = upcoming_appointments(start, until + lead).iterator(chunk_size=batch_size)
+    queued = 0
+    batch = []
+    for appointment in appointments:
+        batch.append(appointment)
+        if len(batch) == batch_size:
+            queued += _queue_batch(batch, lead_hours)
+            batch = []
+    if batch:
+        queued += _queue_batch(batch, lead_hours)
+    return queued
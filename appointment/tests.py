@@ -1,3 +1,582 @@
-from django.test import TestCase
+import asyncio
+import importlib
+import io
+import json
+import threading
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
 
-# Create your tests here.
+import httpx
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from hospital_appoitment import serializers
+from dashboard.transitions import bulk_transition
+from dashboard.models import (
+    Appointment, AppointmentEvent, BlockedTimeSlot, Doctor, Hospital, Service, SmsNotification, WaitlistEntry,
+)
+from . import availability, ratelimit
+from .notifications import claim_notifications, process_notification_batch, release_stale_notifications
+from .reminders import queue_reminders
+from .utils import async_send_bulk_sms, run_in_background
+from .booking import PENDING_MESSAGE, SLOT_TAKEN_MESSAGE
+from .waitlist import accept_offer, expire_offers, offer_slot
+
+
+class BookingFixtureMixin:
+    @classmethod
+    def setUpTestData(cls):
+        cls.hospital = Hospital.objects.create(name='General', address='1 Main Street')
+        cls.doctor = Doctor.objects.create(name='Ama Mensah', specialty='Pediatrics', hospital=cls.hospital)
+        cls.service = Service.objects.create(name='Consultation', hospital=cls.hospital)
+        cls.day = date.today() + timedelta(days=7)
+
+    def setUp(self):
+        # Rate limit counters and idempotency records live in the cache
+        cache.clear()
+        # SMS stay queued instead of going to the gateway
+        for target, side_effect in [
+            ('appointment.notifications.dispatch_notification', None),
+            ('appointment.notifications.run_in_background', lambda coroutine: coroutine.close()),
+        ]:
+            patcher = mock.patch(target, side_effect=side_effect)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def booking(self, **values):
+        return {
+            'full_name': 'Kofi Owusu',
+            'email': 'kofi@example.com',
+            'phone': '0241234567',
+            'hospital_id': str(self.hospital.id),
+            'doctor_id': str(self.doctor.id),
+            'service_id': str(self.service.id),
+            'date': self.day.isoformat(),
+            'time': '09:00',
+            'reason': 'Check-up',
+            **values,
+        }
+
+    def post_booking(self, **values):
+        return self.client.post('/api/appointments/', json.dumps(self.booking(**values)), content_type='application/json')
+
+
+class HospitalPageCacheTests(BookingFixtureMixin, TestCase):
+    def rename_doctor_elsewhere(self, name):
+        # A save in another process: no signal bumps this process's counters
+        Doctor.objects.filter(pk=self.doctor.pk).update(name=name)
+        return self.client.get(f'/hospital/{self.hospital.id}/')
+
+    @override_settings(FRAGMENT_CACHE_TIMEOUT=600)
+    def test_fragment_is_cached_with_a_timeout(self):
+        self.assertContains(self.client.get(f'/hospital/{self.hospital.id}/'), 'Ama Mensah')
+        self.assertContains(self.rename_doctor_elsewhere('Efua Boateng'), 'Ama Mensah')
+
+    @override_settings(FRAGMENT_CACHE_TIMEOUT=0)
+    def test_timeout_zero_turns_fragment_caching_off(self):
+        self.assertContains(self.client.get(f'/hospital/{self.hospital.id}/'), 'Ama Mensah')
+        self.assertContains(self.rename_doctor_elsewhere('Efua Boateng'), 'Efua Boateng')
+
+
+class AsyncReadViewTests(BookingFixtureMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        Service.objects.create(name='Retired', hospital=cls.hospital, is_active=False)
+        slot = dict(hospital=cls.hospital, doctor=cls.doctor, service=cls.service, date=cls.day, phone='0241234567')
+        Appointment.objects.create(full_name='Kofi Owusu', email='kofi@example.com', time='09:00', **slot)
+        Appointment.objects.create(full_name='Ama Boateng', email='ama@example.com', time='09:30', status='cancelled', **slot)
+        # Applies to every doctor of the hospital
+        BlockedTimeSlot.objects.create(hospital=cls.hospital, date=cls.day, start_time='14:00', end_time='15:00', block_type='training')
+
+    async def test_services_are_the_active_ones(self):
+        response = await self.async_client.get('/api/services/', {'hospitalId': self.hospital.id})
+        self.assertEqual([service['name'] for service in json.loads(response.content)], ['Consultation'])
+        response = await self.async_client.get('/api/services/')
+        self.assertEqual(json.loads(response.content), [])
+
+    async def test_booked_times(self):
+        response = await self.async_client.get('/api/booked-times/', {'doctorId': self.doctor.id, 'date': self.day.isoformat()})
+        self.assertEqual(sorted(json.loads(response.content)), ['09:00', '14:00', '14:30'])
+
+    async def test_booked_times_of_an_unknown_doctor(self):
+        response = await self.async_client.get('/api/booked-times/', {'doctorId': 999, 'date': self.day.isoformat()})
+        self.assertEqual(json.loads(response.content), [])
+
+
+class RunInBackgroundTests(SimpleTestCase):
+    def test_coroutine_runs_on_the_dispatch_thread(self):
+        async def current_thread():
+            await asyncio.sleep(0)
+            return threading.current_thread().name
+
+        future = run_in_background(current_thread())
+        self.assertEqual(future.result(timeout=5), 'sms-dispatch')
+        # The same loop serves later calls
+        self.assertEqual(run_in_background(current_thread()).result(timeout=5), 'sms-dispatch')
+
+    def test_errors_stay_on_the_future(self):
+        async def fail():
+            raise httpx.ConnectError('gateway down')
+
+        with self.assertRaises(httpx.ConnectError):
+            run_in_background(fail()).result(timeout=5)
+
+
+class JSONParityTests(BookingFixtureMixin, TestCase):
+    """The API returns the same bytes with orjson and with the json module"""
+
+    def get_both(self, url):
+        with_orjson = self.client.get(url)
+        with mock.patch.object(serializers, 'orjson', None):
+            without_orjson = self.client.get(url)
+        self.assertEqual(with_orjson['Content-Type'], without_orjson['Content-Type'])
+        self.assertEqual(with_orjson.content, without_orjson.content)
+        return json.loads(with_orjson.content)
+
+    def test_hospitals(self):
+        clinic = Hospital.objects.create(name='Clinique Sainte-Thérèse', address='3 Beach Road')
+        self.assertEqual(self.get_both('/api/hospitals/'), [
+            {'id': clinic.id, 'name': 'Clinique Sainte-Thérèse'},
+            {'id': self.hospital.id, 'name': 'General'},
+        ])
+
+    def test_doctors(self):
+        Doctor.objects.filter(pk=self.doctor.pk).update(availability_data={'Monday': ['09:00', '09:30']})
+        self.assertEqual(self.get_both(f'/api/doctors/?hospitalId={self.hospital.id}'), [{
+            'id': self.doctor.id, 'name': 'Ama Mensah', 'specialty': 'Pediatrics', 'availability': {'Monday': ['09:00', '09:30']},
+        }])
+        self.assertEqual(self.get_both('/api/doctors/'), [])
+
+    def test_booked_times(self):
+        self.assertEqual(self.post_booking().status_code, 200)
+        url = f'/api/booked-times/?doctorId={self.doctor.id}&date={self.day.isoformat()}'
+        self.assertEqual(self.get_both(url), ['09:00'])
+
+    def test_dates_decimals_and_none(self):
+        data = {
+            'date': date(2026, 1, 5),
+            'time': time(9, 30, 0, 123456),
+            'starts_at': datetime(2026, 1, 5, 9, 30, 0, 123456, tzinfo=timezone.utc),
+            'fee': Decimal('12.50'),
+            'reason': None,
+        }
+        encoded = serializers.dumps(data)
+        with mock.patch.object(serializers, 'orjson', None):
+            self.assertEqual(serializers.dumps(data), encoded)
+        self.assertEqual(json.loads(encoded), {
+            'date': '2026-01-05', 'time': '09:30:00.123', 'starts_at': '2026-01-05T09:30:00.123Z', 'fee': '12.50', 'reason': None,
+        })
+
+
+class SlotEventsTests(BookingFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.loop = asyncio.new_event_loop()
+        self.queue = self.loop.run_until_complete(self._subscribe())
+
+    def tearDown(self):
+        availability.unsubscribe(self.doctor.id, self.day, self.queue)
+        self.loop.close()
+
+    async def _subscribe(self):
+        return availability.subscribe(self.doctor.id, self.hospital.id, self.day)
+
+    def assertWoken(self):
+        # Let the loop run the wake-up publish() scheduled from this thread
+        self.loop.run_until_complete(asyncio.wait_for(self.queue.get(), 1))
+
+    def test_booking_through_the_view_wakes_the_stream(self):
+        # The view saves the ids as they arrive, i.e. as strings
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post_booking()
+        self.assertTrue(response.json()['success'])
+        self.assertWoken()
+
+    def test_waitlist_hold_wakes_the_stream(self):
+        WaitlistEntry.objects.create(
+            full_name='Efua Addo', email='efua@example.com', phone='0240000000',
+            hospital=self.hospital, doctor=self.doctor, service=self.service, date=self.day,
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            entry = offer_slot(self.doctor.id, self.day, '10:00')
+        self.assertIsNotNone(entry)
+        self.assertWoken()
+
+    def test_other_days_do_not_wake_the_stream(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post_booking(date=(self.day + timedelta(days=1)).isoformat())
+        self.assertTrue(self.queue.empty())
+        self.assertEqual(Appointment.objects.count(), 1)
+
+
+class BatchBookingTests(BookingFixtureMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.other_hospital = Hospital.objects.create(name='Ridge', address='2 Ridge Road')
+        cls.staff = CustomUser.objects.create_user('staff', 'staff@example.com', 'pass', role='staff', hospital=cls.hospital)
+
+    def post_batch(self, items):
+        return self.client.post(
+            '/api/appointments/batch/', json.dumps({'appointments': items}), content_type='application/json',
+        )
+
+    def test_failed_items_are_reported_and_the_rest_booked(self):
+        self.client.force_login(self.staff)
+        items = [
+            self.booking(),
+            self.booking(email='ama@example.com', phone='0200000001'),                 # same slot
+            self.booking(time='10:00'),                                                 # same patient
+            self.booking(email='yaw@example.com', phone='0200000002', hospital_id=str(self.other_hospital.id)),
+            self.booking(email='esi@example.com', phone='0200000003', time=''),
+            self.booking(email='abena@example.com', phone='0200000004', time='11:00'),
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post_batch(items)
+
+        body = response.json()
+        self.assertEqual((body['booked'], body['failed']), (2, 4))
+        results = body['results']
+        self.assertEqual([result['index'] for result in results], list(range(len(items))))
+        self.assertEqual([result['success'] for result in results], [True, False, False, False, False, True])
+        self.assertEqual(results[1]['error'], SLOT_TAKEN_MESSAGE)
+        self.assertEqual(results[2]['error'], PENDING_MESSAGE)
+        self.assertEqual(results[3]['error'], 'You can only book appointments at your hospital')
+        self.assertEqual(results[4]['error'], 'Missing fields: time')
+
+        booked = Appointment.objects.order_by('time')
+        self.assertEqual([appointment.id for appointment in booked], [results[0]['appointmentId'], results[5]['appointmentId']])
+        self.assertEqual(list(booked.values_list('time', flat=True)), ['09:00', '11:00'])
+        self.assertEqual(AppointmentEvent.objects.filter(actor=self.staff).count(), 2)
+
+    def test_staff_without_a_hospital_cannot_book(self):
+        self.client.force_login(CustomUser.objects.create_user('new', 'new@example.com', 'pass', role='staff'))
+        response = self.post_batch([self.booking()])
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Appointment.objects.exists())
+
+
+class RateLimitTests(BookingFixtureMixin, TestCase):
+    def hit_at(self, now, limit=2, window=60):
+        with mock.patch('appointment.ratelimit.time.time', return_value=now):
+            return ratelimit.hit('test', 'client', limit, window)
+
+    def test_previous_window_fades_out(self):
+        self.assertEqual(self.hit_at(6000), (True, 0))
+        self.assertEqual(self.hit_at(6010), (True, 0))
+        self.assertEqual(self.hit_at(6020), (False, 40))
+        # Next window, 3/4 through: the 3 earlier attempts still count as 0.75
+        self.assertEqual(self.hit_at(6105), (True, 0))
+        self.assertEqual(self.hit_at(6106), (False, 14))
+        # Two windows on, nothing is left of them
+        self.assertEqual(self.hit_at(6240), (True, 0))
+        self.assertEqual(self.hit_at(6241), (True, 0))
+
+    @override_settings(RATE_LIMITS={'booking_ip': (2, 3600)})
+    def test_booking_attempts_are_limited_per_ip(self):
+        for index, time in enumerate(['09:00', '09:30']):
+            response = self.post_booking(email=f'patient{index}@example.com', phone=f'020000000{index}', time=time)
+            self.assertTrue(response.json()['success'])
+
+        with self.assertLogs('appointment.ratelimit', 'WARNING'):
+            response = self.post_booking(email='patient2@example.com', phone='0200000002', time='10:00')
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+        self.assertEqual(Appointment.objects.count(), 2)
+
+        response = self.client.post(
+            '/api/appointments/', json.dumps(self.booking(email='patient3@example.com', phone='0200000003', time='10:30')),
+            content_type='application/json', REMOTE_ADDR='10.0.0.2',
+        )
+        self.assertTrue(response.json()['success'])
+        self.assertEqual(ratelimit.stats()['booking_ip'], {'allowed': 3, 'blocked': 1})
+
+
+class IdempotencyTests(BookingFixtureMixin, TestCase):
+    def post(self, path, body, key='retry-1', **extra):
+        return self.client.post(path, json.dumps(body), content_type='application/json', HTTP_IDEMPOTENCY_KEY=key, **extra)
+
+    def test_retry_replays_the_first_response(self):
+        first = self.post('/api/appointments/', self.booking())
+        retry = self.post('/api/appointments/', self.booking())
+
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.content, first.content)
+        self.assertEqual(Appointment.objects.count(), 1)
+        self.assertEqual(SmsNotification.objects.count(), 1)
+
+        reused = self.post('/api/appointments/', self.booking(time='10:00'))
+        self.assertEqual(reused.status_code, 422)
+
+    def test_keys_are_scoped_to_the_client(self):
+        self.post('/api/appointments/', self.booking())
+        other = self.post('/api/appointments/', self.booking(email='ama@example.com', phone='0200000001', time='10:00'),
+                          REMOTE_ADDR='10.0.0.2')
+        self.assertFalse(other.has_header('Idempotent-Replayed'))
+        self.assertTrue(other.json()['success'])
+        self.assertEqual(Appointment.objects.count(), 2)
+
+    def test_keys_are_scoped_to_the_path(self):
+        self.client.force_login(CustomUser.objects.create_user(
+            'staff', 'staff@example.com', 'pass', role='staff', hospital=self.hospital,
+        ))
+        self.post('/api/appointments/', self.booking())
+        batch = self.post('/api/appointments/batch/', {'appointments': [self.booking(email='ama@example.com', phone='0200000001', time='10:00')]})
+        self.assertFalse(batch.has_header('Idempotent-Replayed'))
+        self.assertEqual(batch.json()['booked'], 1)
+
+
+class ReminderTests(BookingFixtureMixin, TestCase):
+    def appointment_at(self, starts_at, **values):
+        starts_at = timezone.localtime(starts_at)
+        return Appointment.objects.create(**{
+            'full_name': 'Kofi Owusu', 'email': 'kofi@example.com', 'phone': '0241234567',
+            'hospital': self.hospital, 'doctor': self.doctor, 'service': self.service,
+            'date': starts_at.date(), 'time': starts_at.strftime('%H:%M'),
+            **values,
+        })
+
+    def test_only_appointments_coming_within_the_lead_are_queued_once(self):
+        # A tick covering one hour, a day out, with 24h reminders: appointments starting in (base, base + 1h]
+        base = timezone.localtime().replace(minute=0, second=0, microsecond=0) + timedelta(days=2)
+        since, until = base - timedelta(hours=24), base - timedelta(hours=23)
+        inside = [self.appointment_at(base + timedelta(minutes=30)), self.appointment_at(base + timedelta(hours=1))]
+        self.appointment_at(base)                                               # came within 24h last tick
+        self.appointment_at(base + timedelta(hours=2))                          # next tick's
+        self.appointment_at(base + timedelta(minutes=15), status='cancelled')
+
+        self.assertEqual(queue_reminders(since, until, 24, batch_size=1), 2)
+        self.assertEqual(
+            set(SmsNotification.objects.filter(kind='reminder').values_list('appointment_id', flat=True)),
+            {appointment.id for appointment in inside},
+        )
+        # A restarted scheduler scanning the same tick again
+        self.assertEqual(queue_reminders(since, until, 24), 0)
+        self.assertEqual(SmsNotification.objects.filter(kind='reminder').count(), 2)
+
+
+class BulkSmsTests(TestCase):
+    def send(self, messages, handler):
+        async def run():
+            async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+                return await async_send_bulk_sms('key', 'HospitalApp', messages, client)
+        return asyncio.run(run())
+
+    def test_results_are_mapped_back_per_recipient(self):
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            return httpx.Response(200, json={'status': 'success', 'data': [
+                {'recipient': '233241111111', 'id': 'a'}, {'recipient': '233242222222', 'id': 'b'},
+            ]})
+
+        results = self.send(
+            [('+233241111111', 'Hello Ama'), ('+233242222222', 'Hello Yaw'), ('+233243333333', 'Hello Esi')], handler,
+        )
+        self.assertEqual(len(requests), 1)
+        payload = json.loads(requests[0].content)
+        self.assertEqual(requests[0].headers['api-key'], 'key')
+        self.assertEqual(payload['recipients']['233242222222'], {'sms': 'Hello Yaw'})
+        self.assertEqual(results['+233241111111']['id'], 'a')
+        self.assertEqual(results['+233242222222']['status'], 'success')
+        self.assertEqual(results['+233243333333']['status'], 'error')
+
+    def test_a_failed_request_fails_every_message(self):
+        with self.assertLogs('appointment.utils', 'ERROR'):
+            results = self.send(
+                [('+233241111111', 'Hello'), ('+233242222222', 'Hello')],
+                lambda request: httpx.Response(401, json={'status': 'error', 'message': 'Invalid API key'}),
+            )
+        self.assertEqual({result['message'] for result in results.values()}, {'Invalid API key'})
+
+
+class NotificationBatchTests(TestCase):
+    def queue(self, *phones):
+        for phone in phones:
+            SmsNotification.objects.create(phone=phone, message=f'Hello {phone}')
+
+    def test_one_gateway_call_per_claimed_batch(self):
+        self.queue('+233241111111', '+233242222222', '+233243333333', '+233241111111')
+        calls = []
+
+        async def send(api_key, sender_id, messages, client):
+            calls.append(messages)
+            return {phone: {'status': 'error' if phone.endswith('3') else 'success'} for phone, _ in messages}
+
+        with mock.patch('appointment.notifications.async_send_bulk_sms', send):
+            self.assertEqual(process_notification_batch(10), (4, 3))
+
+        # The repeated number goes in a second request
+        self.assertEqual([len(messages) for messages in calls], [3, 1])
+        self.assertEqual(
+            sorted(SmsNotification.objects.values_list('phone', 'status')),
+            [('+233241111111', 'sent'), ('+233241111111', 'sent'), ('+233242222222', 'sent'), ('+233243333333', 'queued')],
+        )
+
+
+class SmsQueueTests(TestCase):
+    def queue(self, phone, minutes=0, **values):
+        return SmsNotification.objects.create(
+            phone=phone, message='Hello', send_after=timezone.now() + timedelta(minutes=minutes), **values,
+        )
+
+    def test_due_notifications_are_claimed_oldest_first(self):
+        newer = self.queue('+233241111111', minutes=-1)
+        older = self.queue('+233242222222', minutes=-5)
+        self.queue('+233243333333', minutes=30)
+        self.queue('+233244444444', minutes=-10, status='sent')
+
+        claimed = claim_notifications(limit=1)
+        self.assertEqual([(notification.id, notification.status) for notification in claimed], [(older.id, 'sending')])
+        self.assertIsNotNone(claimed[0].locked_at)
+        # Claimed rows are not handed out again
+        self.assertEqual([notification.id for notification in claim_notifications()], [newer.id])
+        self.assertEqual(claim_notifications(), [])
+
+    def test_stale_claims_go_back_to_the_queue(self):
+        stale = self.queue('+233241111111', status='sending', locked_at=timezone.now() - timedelta(minutes=11))
+        busy = self.queue('+233242222222', status='sending', locked_at=timezone.now() - timedelta(minutes=1))
+        self.assertEqual(release_stale_notifications(), 1)
+        stale.refresh_from_db()
+        self.assertEqual((stale.status, stale.locked_at), ('queued', None))
+        self.assertEqual(SmsNotification.objects.get(id=busy.id).status, 'sending')
+        self.assertEqual([notification.id for notification in claim_notifications()], [stale.id])
+
+
+class SlotConstraintTests(BookingFixtureMixin, TestCase):
+    def test_cancelling_frees_the_slot_for_one_booking(self):
+        first = self.post_booking().json()
+        self.assertTrue(first['success'])
+        Appointment.objects.filter(id=first['appointmentId']).update(status='cancelled')
+
+        rebooked = self.post_booking(email='ama@example.com', phone='0200000001').json()
+        self.assertTrue(rebooked['success'])
+        taken = self.post_booking(email='yaw@example.com', phone='0200000002').json()
+        self.assertEqual(taken, {'success': False, 'error': SLOT_TAKEN_MESSAGE})
+
+        # Past the view's check the database still refuses a second active booking
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Appointment.objects.create(
+                full_name='Yaw Osei', email='yaw@example.com', phone='0200000002', hospital=self.hospital,
+                doctor=self.doctor, service=self.service, date=self.day, time='09:00',
+            )
+        self.assertEqual(Appointment.objects.exclude(status='cancelled').count(), 1)
+
+
+class DuplicateSlotMigrationTests(TransactionTestCase):
+    """Migration 0005 cancels duplicate active bookings before adding the constraint"""
+    before = [('dashboard', '0004_smsnotification')]
+    slot = ('doctor', 'date', 'time')
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def setUp(self):
+        self.apps = self.migrate(self.before)
+        self.Appointment = self.apps.get_model('dashboard', 'Appointment')
+        # unique_together still covers cancelled rows at 0004; duplicates come from outside Django
+        with connection.schema_editor() as editor:
+            editor.alter_unique_together(self.Appointment, {self.slot}, set())
+
+    def tearDown(self):
+        self.Appointment.objects.all().delete()
+        with connection.schema_editor() as editor:
+            editor.alter_unique_together(self.Appointment, set(), {self.slot})
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_duplicates_are_cancelled_keeping_the_earliest(self):
+        hospital = self.apps.get_model('dashboard', 'Hospital').objects.create(name='General', address='1 Main Street')
+        doctor = self.apps.get_model('dashboard', 'Doctor').objects.create(name='Ama Mensah', specialty='Pediatrics', hospital=hospital)
+        service = self.apps.get_model('dashboard', 'Service').objects.create(name='Consultation', hospital=hospital)
+
+        def book(time, status='pending'):
+            return self.Appointment.objects.create(
+                full_name='Kofi Owusu', email='kofi@example.com', phone='0241234567', hospital=hospital,
+                doctor=doctor, service=service, date=date(2026, 1, 5), time=time, status=status,
+            ).id
+
+        already_cancelled = book('09:00', 'cancelled')
+        kept = book('09:00', 'confirmed')
+        duplicates = [book('09:00'), book('09:00')]
+        other_slot = book('10:00')
+
+        migration = importlib.import_module('dashboard.migrations.0005_appointment_active_slot_constraint')
+        migration.cancel_duplicate_active_appointments(self.apps, None)
+
+        statuses = dict(self.Appointment.objects.values_list('id', 'status'))
+        self.assertEqual(statuses[kept], 'confirmed')
+        self.assertEqual([statuses[appointment_id] for appointment_id in duplicates], ['cancelled', 'cancelled'])
+        self.assertEqual(statuses[already_cancelled], 'cancelled')
+        self.assertEqual(statuses[other_slot], 'pending')
+
+
+class WaitlistTests(BookingFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.appointment = Appointment.objects.create(
+            full_name='Kofi Owusu', email='kofi@example.com', phone='0241234567', hospital=self.hospital,
+            doctor=self.doctor, service=self.service, date=self.day, time='09:00',
+        )
+        now = timezone.now()
+        self.first, self.second = [
+            WaitlistEntry.objects.create(
+                full_name=name, email=f'{name.split()[0].lower()}@example.com', phone=phone,
+                hospital=self.hospital, doctor=self.doctor, service=self.service, date=self.day,
+            )
+            for name, phone in [('Efua Addo', '0240000001'), ('Kwesi Appiah', '0240000002')]
+        ]
+        # Joined the other way round: the second entry is the older one
+        WaitlistEntry.objects.filter(id=self.second.id).update(created_at=now - timedelta(hours=2))
+        WaitlistEntry.objects.filter(id=self.first.id).update(created_at=now - timedelta(hours=1))
+
+    def cancel(self):
+        admin = CustomUser.objects.create_user('admin', 'admin@example.com', 'pass', role='admin')
+        with self.captureOnCommitCallbacks() as callbacks:
+            bulk_transition(admin, [self.appointment.id], 'cancelled')
+        # Nothing is offered until the cancellation commits
+        self.assertFalse(WaitlistEntry.objects.filter(status='offered').exists())
+        for callback in callbacks:
+            callback()
+
+    def test_cancellation_offers_the_slot_to_the_oldest_entry(self):
+        self.cancel()
+        self.second.refresh_from_db()
+        self.assertEqual((self.second.status, self.second.offered_time), ('offered', '09:00'))
+        self.assertEqual(WaitlistEntry.objects.get(id=self.first.id).status, 'waiting')
+        self.assertTrue(SmsNotification.objects.filter(kind='waitlist_offer', phone='+233240000002').exists())
+
+    def test_held_slot_cannot_be_booked_directly(self):
+        self.cancel()
+        response = self.post_booking(email='ama@example.com', phone='0200000001')
+        self.assertEqual(response.json(), {'success': False, 'error': SLOT_TAKEN_MESSAGE})
+
+    def test_accepting_the_offer_books_the_slot(self):
+        self.cancel()
+        appointment = accept_offer(WaitlistEntry.objects.get(id=self.second.id))
+        self.assertEqual((appointment.email, appointment.time, appointment.status), (self.second.email, '09:00', 'pending'))
+        self.second.refresh_from_db()
+        self.assertEqual((self.second.status, self.second.appointment_id), ('booked', appointment.id))
+        # A second acceptance finds no open offer
+        self.assertIsNone(accept_offer(self.second))
+
+    def test_expired_hold_passes_to_the_next_entry(self):
+        self.cancel()
+        WaitlistEntry.objects.filter(id=self.second.id).update(offer_expires_at=timezone.now() - timedelta(minutes=1))
+        call_command('process_waitlist', '--once', stdout=io.StringIO())
+
+        self.assertEqual(WaitlistEntry.objects.get(id=self.second.id).status, 'expired')
+        self.first.refresh_from_db()
+        self.assertEqual((self.first.status, self.first.offered_time), ('offered', '09:00'))
+        self.assertIsNone(accept_offer(WaitlistEntry.objects.get(id=self.second.id)))
+        self.assertEqual(expire_offers(), 0)
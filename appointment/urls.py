@@ -8,11 +8,15 @@ urlpatterns = [
     path('doctor/<int:doctor_id>/', views.doctor_profile, name='doctor_profile'),
     path('book-appointment/', views.book_appointment, name='book_appointment'),
     path('appointment-success/<int:appointment_id>/', views.appointment_success, name='appointment_success'),
+    path('waitlist/<str:token>/', views.waitlist_offer, name='waitlist_offer'),
 
     # API endpoints
     path('api/hospitals/', views.get_hospitals, name='get_hospitals'),
     path('api/doctors/', views.get_doctors, name='get_doctors'),
     path('api/services/', views.get_services, name='get_services'),
     path('api/booked-times/', views.get_booked_times, name='get_booked_times'),
+    path('api/slot-events/', views.slot_events, name='slot_events'),
     path('api/appointments/', views.create_appointment, name='create_appointment'),
+    path('api/appointments/batch/', views.create_appointments_batch, name='create_appointments_batch'),
+    path('api/waitlist/', views.join_waitlist, name='join_waitlist'),
 ]
\ No newline at end of file
@@ -1,9 +1,35 @@
+import asyncio
+import threading
 import requests
+import httpx
 import logging
 from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
+SMS_API_URL = "https://sms.arkesel.com/sms/api"
+# v2 template endpoint: one request carries many recipients, each with their own placeholder values
+SMS_BULK_API_URL = "https://sms.arkesel.com/api/v2/sms/template/send"
+SMS_BULK_PLACEHOLDER = 'sms'
+
+
+def _sms_params(api_key, message, sender_id, phone_number):
+    """Query parameters for the Arkesel send-sms endpoint"""
+    params = {
+        'action': 'send-sms',
+        'api_key': api_key,
+        'from': sender_id,
+        'to': phone_number,
+        'sms': message,
+    }
+
+    # Add use_case for Nigerian contacts as per API documentation
+    if phone_number.startswith('+234') or phone_number.startswith('234'):
+        params['use_case'] = 'transactional'
+
+    return params
+
+
 def send_sms(api_key, message, sender_id, phone_number):
     """
     Send SMS using Arkesel API
@@ -17,15 +43,39 @@ def send_sms(api_key, message, sender_id, phone_number):
     Returns:
         dict: API response containing status and details
     """
-    base_url = f"https://sms.arkesel.com/sms/api?action=send-sms&api_key={api_key}&from={sender_id}"
-    sms_url = base_url + f"&to={phone_number}&sms={message}"
+    try:
+        response = requests.get(SMS_API_URL, params=_sms_params(api_key, message, sender_id, phone_number), timeout=30)
+        response_json = response.json()
 
-    # Add use_case for Nigerian contacts as per API documentation
-    if phone_number.startswith('+234') or phone_number.startswith('234'):
-        sms_url += "&use_case=transactional"
+        if response.status_code == 200:
+            logger.info(f"SMS sent successfully to {phone_number}: {response_json}")
+        else:
+            logger.error(f"SMS failed to {phone_number}. Status: {response.status_code}, Response: {response_json}")
+
+        return response_json
+
+    except requests.exceptions.RequestException as e:
+        logger.error(f"SMS request failed to {phone_number}: {str(e)}")
+        return {'status': 'error', 'message': str(e)}
+    except ValueError as e:
+        logger.error(f"Invalid JSON response from SMS API for {phone_number}: {str(e)}")
+        return {'status': 'error', 'message': 'Invalid API response'}
 
+
+async def async_send_sms(api_key, message, sender_id, phone_number, client=None):
+    """
+    Send SMS using the Arkesel API without blocking the event loop.
+
+    Same arguments and return value as send_sms. Pass an httpx.AsyncClient
+    as ``client`` to reuse its connection pool across several messages.
+    """
+    params = _sms_params(api_key, message, sender_id, phone_number)
     try:
-        response = requests.get(sms_url, timeout=30)
+        if client is None:
+            async with httpx.AsyncClient(timeout=30) as own_client:
+                response = await own_client.get(SMS_API_URL, params=params)
+        else:
+            response = await client.get(SMS_API_URL, params=params)
         response_json = response.json()
 
         if response.status_code == 200:
@@ -35,7 +85,7 @@ def send_sms(api_key, message, sender_id, phone_number):
 
         return response_json
 
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         logger.error(f"SMS request failed to {phone_number}: {str(e)}")
         return {'status': 'error', 'message': str(e)}
     except ValueError as e:
@@ -43,36 +93,164 @@ def send_sms(api_key, message, sender_id, phone_number):
         return {'status': 'error', 'message': 'Invalid API response'}
 
 
-def send_appointment_confirmation_sms(appointment):
+def _bulk_payload(sender_id, messages):
     """
-    Send appointment confirmation SMS to the patient
+    JSON body for the v2 template endpoint. The template is a single
+    placeholder that each recipient fills with their whole message, so one
+    request carries different texts. Recipients are keyed by number, so
+    ``messages`` must not repeat one.
+    """
+    recipients = {phone_number.lstrip('+'): {SMS_BULK_PLACEHOLDER: message} for phone_number, message in messages}
+    payload = {
+        'sender': sender_id,
+        'message': f'<%{SMS_BULK_PLACEHOLDER}%>',
+        'recipients': recipients,
+    }
+    # Add use_case for Nigerian contacts as per API documentation
+    if any(number.startswith('234') for number in recipients):
+        payload['use_case'] = 'transactional'
+    return payload
+
+
+async def async_send_bulk_sms(api_key, sender_id, messages, client):
+    """
+    Send many SMS with one request to the Arkesel v2 template endpoint.
 
     Args:
-        appointment: Appointment model instance
+        api_key (str): Arkesel API key
+        sender_id (str): Sender ID
+        messages (list): (phone_number, message) pairs, one per number
+        client (httpx.AsyncClient): client whose connection pool is used
 
     Returns:
-        dict: SMS API response
+        dict: {phone_number: response} for every number in ``messages``,
+        each response shaped like send_sms's ({'status': 'error', ...} on failure)
     """
-    api_key = settings.ARKESSEL_API_KEY
-    sender_id = settings.ARKESSEL_SENDER_ID
+    try:
+        response = await client.post(
+            SMS_BULK_API_URL, json=_bulk_payload(sender_id, messages), headers={'api-key': api_key},
+        )
+        response_json = response.json()
+    except httpx.HTTPError as e:
+        logger.error(f"Bulk SMS request for {len(messages)} recipients failed: {str(e)}")
+        return {phone_number: {'status': 'error', 'message': str(e)} for phone_number, _ in messages}
+    except ValueError as e:
+        logger.error(f"Invalid JSON response from bulk SMS API: {str(e)}")
+        return {phone_number: {'status': 'error', 'message': 'Invalid API response'} for phone_number, _ in messages}
+
+    if response.status_code != 200 or response_json.get('status') != 'success':
+        logger.error(f"Bulk SMS failed. Status: {response.status_code}, Response: {response_json}")
+        error = {'status': 'error', 'message': response_json.get('message', 'Bulk send failed')}
+        return {phone_number: error for phone_number, _ in messages}
+
+    # The gateway lists the numbers it accepted; anything missing was rejected
+    accepted = {str(entry.get('recipient', '')).lstrip('+'): entry for entry in response_json.get('data') or []}
+    results = {}
+    for phone_number, _ in messages:
+        entry = accepted.get(phone_number.lstrip('+'))
+        if entry is None:
+            results[phone_number] = {'status': 'error', 'message': 'Recipient rejected by the gateway'}
+        else:
+            results[phone_number] = {'status': 'success', **entry}
+    logger.info(f"Bulk SMS accepted for {len(accepted)}/{len(messages)} recipients")
+    return results
 
-    # Format the message
-    message = (
-        f"Hello {appointment.full_name}, your appointment at {appointment.hospital.name} "
-        f"with Dr. {appointment.doctor.name} is confirmed for {appointment.date} at {appointment.time}. "
-        f"Please arrive 15 minutes early. Stay safe!"
-    )
 
-    # Ensure phone number has country code
-    phone_number = appointment.phone
+def format_phone_number(phone_number):
+    """Ensure a phone number has a country code"""
     if not phone_number.startswith('+'):
         # Assume Ghanaian numbers if no country code (since timezone is Africa/Accra)
         if phone_number.startswith('0'):
             phone_number = '+233' + phone_number[1:]
         else:
             phone_number = '+233' + phone_number
+    return phone_number
+
+
+def build_appointment_confirmation_sms(appointment):
+    """
+    Build the confirmation SMS for an appointment.
+
+    Returns:
+        tuple: (phone_number, message)
+    """
+    message = (
+        f"Hello {appointment.full_name}, your appointment at {appointment.hospital.name} "
+        f"with Dr. {appointment.doctor.name} is confirmed for {appointment.date} at {appointment.time}. "
+        f"Please arrive 15 minutes early. Stay safe!"
+    )
+    return format_phone_number(appointment.phone), message
+
+
+def build_appointment_reminder_sms(appointment):
+    """
+    Build the reminder SMS for an upcoming appointment.
+
+    Returns:
+        tuple: (phone_number, message)
+    """
+    message = (
+        f"Reminder: Hello {appointment.full_name}, you have an appointment at {appointment.hospital.name} "
+        f"with Dr. {appointment.doctor.name} on {appointment.date} at {appointment.time}. "
+        f"Please arrive 15 minutes early."
+    )
+    return format_phone_number(appointment.phone), message
+
+
+def build_appointment_status_sms(appointment):
+    """
+    Build the SMS telling a patient that staff confirmed or cancelled their
+    appointment.
+
+    Returns:
+        tuple: (phone_number, message)
+    """
+    if appointment.status == 'cancelled':
+        outcome = "has been cancelled. Please contact the hospital or book a new slot"
+    else:
+        outcome = "has been confirmed by the hospital. Please arrive 15 minutes early"
+    message = (
+        f"Hello {appointment.full_name}, your appointment at {appointment.hospital.name} "
+        f"with Dr. {appointment.doctor.name} on {appointment.date} at {appointment.time} {outcome}."
+    )
+    return format_phone_number(appointment.phone), message
+
+
+def send_appointment_confirmation_sms(appointment):
+    """
+    Send appointment confirmation SMS to the patient
+
+    Args:
+        appointment: Appointment model instance
 
-    return send_sms(api_key, message, sender_id, phone_number)
+    Returns:
+        dict: SMS API response
+    """
+    phone_number, message = build_appointment_confirmation_sms(appointment)
+    return send_sms(settings.ARKESSEL_API_KEY, message, settings.ARKESSEL_SENDER_ID, phone_number)
+
+
+# Background event loop for SMS dispatch, started on first use
+_sms_loop = None
+_sms_loop_lock = threading.Lock()
+
+
+def _get_sms_loop():
+    global _sms_loop
+    with _sms_loop_lock:
+        if _sms_loop is None:
+            _sms_loop = asyncio.new_event_loop()
+            threading.Thread(target=_sms_loop.run_forever, name='sms-dispatch', daemon=True).start()
+    return _sms_loop
+
+
+def run_in_background(coroutine):
+    """
+    Run a coroutine on the background SMS event loop and return immediately.
+
+    Returns a concurrent.futures.Future for the coroutine's result.
+    """
+    return asyncio.run_coroutine_threadsafe(coroutine, _get_sms_loop())
 
 
 # Test function for SMS functionality
@@ -1,18 +1,38 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import JsonResponse
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from django.contrib import messages
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from django.db.models import Q
-from django.db import models
+from django.db import transaction, IntegrityError
+import asyncio
 import json
 import logging
 from datetime import datetime, timedelta
-from dashboard.models import Hospital, Doctor, Appointment, Service
-from .utils import send_appointment_confirmation_sms
+from dashboard.models import Hospital, Doctor, Appointment, Service, WaitlistEntry
+from dashboard.events import record_event
+from dashboard.fragment_cache import DIRECTORY, fragment_cache_context
+from dashboard.images import derivative_url, srcset
+from hospital_appoitment.serializers import JSONResponse, arecords, dumps
+from . import ratelimit
+from .availability import booked_times, subscribe, unsubscribe
+from .booking import COOLDOWN, COOLDOWN_MESSAGE, MAX_BATCH_SIZE, PENDING_MESSAGE, SLOT_TAKEN_MESSAGE, book_appointments
+from .idempotency import idempotent
+from .notifications import queue_appointment_confirmation
+from .waitlist import accept_offer, slot_is_free, waitlist_position
 
 logger = logging.getLogger(__name__)
 
+# Output key -> model field for the booking form's JSON endpoints
+DOCTOR_FIELDS = {'id': 'id', 'name': 'name', 'specialty': 'specialty', 'availability': 'availability_data'}
+SERVICE_FIELDS = {'id': 'id', 'name': 'name', 'description': 'description', 'duration': 'duration'}
+# Milliseconds the browser waits before reconnecting to slot_events
+SSE_RETRY_MS = 5000
+
 # Helper functions for appointment validation
 def check_pending_appointments(email, phone):
     """
@@ -30,7 +50,7 @@ def check_approved_appointment_cooldown(email, phone):
     Check if a patient has had an approved appointment within the last month.
     Returns True if they need to wait, False if they can book.
     """
-    one_month_ago = timezone.now() - timedelta(days=30)
+    one_month_ago = timezone.now() - COOLDOWN
     recent_approved = Appointment.objects.filter(
         Q(email=email) | Q(phone=phone),
         status__in=['confirmed', 'completed'],
@@ -45,11 +65,11 @@ def validate_appointment_booking(email, phone):
     """
     # Check for pending appointments first
     if check_pending_appointments(email, phone):
-        return False, "You have a pending appointment that has not been approved yet. Please wait for approval before booking another appointment."
+        return False, PENDING_MESSAGE
     
     # Check for recent approved appointments (1-month cooldown)
     if check_approved_appointment_cooldown(email, phone):
-        return False, "You have had an approved appointment within the last month. Please wait 30 days from your last appointment before booking a new one."
+        return False, COOLDOWN_MESSAGE
     
     return True, None
 
@@ -57,16 +77,16 @@ def index(request):
     """Render the homepage"""
     # Get random featured hospitals (3 random hospitals)
     import random
-    all_hospitals = list(Hospital.objects.all())
-    if len(all_hospitals) >= 3:
-        featured_hospitals = random.sample(all_hospitals, 3)
-    else:
-        featured_hospitals = all_hospitals
+    # Sample ids so only the three chosen cards are loaded
+    hospital_ids = list(Hospital.objects.values_list('id', flat=True))
+    if len(hospital_ids) >= 3:
+        hospital_ids = random.sample(hospital_ids, 3)
+    featured_hospitals = Hospital.objects.for_cards().filter(id__in=hospital_ids)
     return render(request, 'index.html', {'featured_hospitals': featured_hospitals})
 
 def hospitals(request):
     """Render the hospitals listing page"""
-    hospitals = Hospital.objects.all()
+    hospitals = Hospital.objects.for_cards()
     # Convert hospitals to JSON for JavaScript filtering
     hospitals_json = []
     for hospital in hospitals:
@@ -74,25 +94,28 @@ def hospitals(request):
             'id': hospital.id,
             'name': hospital.name,
             'location': hospital.location,
-            'description': hospital.description,
+            'description': hospital.description_preview,
             'phone_number': hospital.phone_number,
-            'image': hospital.image.url if hospital.image else None
+            # Placeholder until the image worker has produced derivatives
+            'image': derivative_url(hospital.image, 'card') if hospital.image_status == 'ready' else None,
+            'image_srcset': srcset(hospital.image) if hospital.image_status == 'ready' else '',
         })
     return render(request, 'hospitals.html', {
         'hospitals': hospitals,
-        'hospitals_json': json.dumps(hospitals_json)
+        'hospitals_json': dumps(hospitals_json).decode()
     })
 
 def hospital_detail(request, hospital_id):
     """Render the hospital detail page"""
     hospital = get_object_or_404(Hospital, id=hospital_id)
-    doctors = Doctor.objects.filter(hospital=hospital)
+    doctors = Doctor.objects.for_cards().filter(hospital=hospital)
     services = Service.objects.filter(hospital=hospital, is_active=True)
 
     return render(request, 'hospital-detail.html', {
         'hospital': hospital,
         'doctors': doctors,
-        'services': services
+        'services': services,
+        **fragment_cache_context(DIRECTORY, hospital_id=hospital.id),
     })
 
 def doctor_profile(request, doctor_id):
@@ -116,93 +139,121 @@ def appointment_success(request, appointment_id):
     })
 
 # API Views for AJAX requests
-def get_hospitals(request):
+# The read-only endpoints are async so a burst of requests does not hold a
+# worker thread each while waiting on the database under ASGI.
+async def get_hospitals(request):
     """API endpoint to get all hospitals"""
-    hospitals = Hospital.objects.all().values('id', 'name')
-    return JsonResponse(list(hospitals), safe=False)
+    return JSONResponse(await arecords(Hospital.objects.all(), {'id': 'id', 'name': 'name'}))
 
-def get_doctors(request):
+async def get_doctors(request):
     """API endpoint to get doctors for a specific hospital"""
     hospital_id = request.GET.get('hospitalId')
     if hospital_id:
-        doctors = Doctor.objects.filter(hospital_id=hospital_id).values('id', 'name', 'specialty', 'availability_data')
-        doctors_list = []
-        for doctor in doctors:
-            doctors_list.append({
-                'id': doctor['id'],
-                'name': doctor['name'],
-                'specialty': doctor['specialty'],
-                'availability': doctor['availability_data']
-            })
-        return JsonResponse(doctors_list, safe=False)
-    return JsonResponse([], safe=False)
+        doctors = await arecords(Doctor.objects.filter(hospital_id=hospital_id), DOCTOR_FIELDS)
+        return JSONResponse(doctors)
+    return JSONResponse([])
 
-def get_services(request):
+async def get_services(request):
     """API endpoint to get services for a specific hospital"""
     hospital_id = request.GET.get('hospitalId')
     if hospital_id:
-        services = Service.objects.filter(hospital_id=hospital_id, is_active=True).values('id', 'name', 'description', 'duration')
-        services_list = []
-        for service in services:
-            services_list.append({
-                'id': service['id'],
-                'name': service['name'],
-                'description': service['description'],
-                'duration': service['duration']
-            })
-        return JsonResponse(services_list, safe=False)
-    return JsonResponse([], safe=False)
+        services = await arecords(Service.objects.filter(hospital_id=hospital_id, is_active=True), SERVICE_FIELDS)
+        return JSONResponse(services)
+    return JSONResponse([])
 
-def get_booked_times(request):
+async def get_booked_times(request):
     """API endpoint to get booked times for a specific doctor and date"""
     doctor_id = request.GET.get('doctorId')
     date = request.GET.get('date')
     
     if doctor_id and date:
-        from dashboard.models import BlockedTimeSlot
-        from datetime import datetime
-        
-        # Get all non-cancelled appointments for this doctor and date
-        booked_appointments = Appointment.objects.filter(
-            doctor_id=doctor_id,
-            date=date
-        ).exclude(status='cancelled').values_list('time', flat=True)
-        
-        booked_times = list(booked_appointments)
-        
-        # Get doctor and hospital info
-        try:
-            doctor = Doctor.objects.select_related('hospital').get(id=doctor_id)
-            hospital = doctor.hospital
-            
-            # Get blocked time slots for this doctor and date
-            blocked_slots = BlockedTimeSlot.objects.filter(
-                hospital=hospital,
-                date=date,
-                is_active=True
-            ).filter(
-                models.Q(doctor=doctor) | models.Q(doctor__isnull=True)  # Doctor-specific or all-doctor blocks
-            )
-            
-            # Convert blocked time ranges to individual time slots
-            for blocked_slot in blocked_slots:
-                blocked_times = blocked_slot.get_time_slots()
-                booked_times.extend(blocked_times)
-            
-        except Doctor.DoesNotExist:
-            pass  # If doctor not found, just return appointment-based booked times
-        
-        # Remove duplicates and return
-        unique_booked_times = list(set(booked_times))
-        
-        return JsonResponse(unique_booked_times, safe=False)
+        # Blocked slots need the doctor's hospital; an unknown doctor still gets the appointment-based times
+        doctor = await Doctor.objects.only('id', 'hospital_id').filter(id=doctor_id).afirst()
+        hospital_id = doctor.hospital_id if doctor else None
+        return JsonResponse(list(await booked_times(doctor_id, hospital_id, date)), safe=False)
     
     return JsonResponse([], safe=False)
 
+def _sse(event, data):
+    return f'event: {event}\ndata: {dumps(data).decode()}\n\n'
+
+def _sse_snapshot(booked):
+    return f'retry: {SSE_RETRY_MS}\n\n' + _sse('slots', {'booked': sorted(booked)})
+
+async def _slot_stream(doctor, date):
+    # Subscribe before the snapshot so no change falls in between
+    queue = subscribe(doctor.id, doctor.hospital_id, date)
+    try:
+        sent = await booked_times(doctor.id, doctor.hospital_id, date)
+        yield _sse_snapshot(sent)
+        loop = asyncio.get_running_loop()
+        # Django 4.2 does not notice a client going away mid-stream; closing
+        # after a while bounds that, and EventSource simply reconnects
+        deadline = loop.time() + settings.AVAILABILITY_STREAM_SECONDS
+        while loop.time() < deadline:
+            try:
+                await asyncio.wait_for(queue.get(), settings.AVAILABILITY_STREAM_RECHECK)
+            except asyncio.TimeoutError:
+                pass
+            booked = await booked_times(doctor.id, doctor.hospital_id, date)
+            taken, freed = booked - sent, sent - booked
+            if taken:
+                yield _sse('taken', {'times': sorted(taken)})
+            if freed:
+                yield _sse('freed', {'times': sorted(freed)})
+            if not taken and not freed:
+                yield ': keepalive\n\n'
+            sent = booked
+    finally:
+        unsubscribe(doctor.id, date, queue)
+
+async def slot_events(request):
+    """
+    Server-sent events for one doctor's day (?doctorId=&date=): a ``slots``
+    snapshot of the times that cannot be booked, then ``taken`` and ``freed``
+    events as that changes (see appointment.availability). Under WSGI only
+    the snapshot is sent and the browser reconnects every SSE_RETRY_MS.
+    """
+    try:
+        doctor_id = int(request.GET.get('doctorId', ''))
+        date = parse_date(request.GET.get('date', ''))
+    except ValueError:
+        date = None
+    if date is None:
+        return JsonResponse({'error': 'doctorId and date (YYYY-MM-DD) are required'}, status=400)
+    doctor = await Doctor.objects.only('id', 'hospital_id').filter(id=doctor_id).afirst()
+    if doctor is None:
+        return JsonResponse({'error': 'Doctor not found'}, status=404)
+
+    if isinstance(request, ASGIRequest):
+        response = StreamingHttpResponse(_slot_stream(doctor, date), content_type='text/event-stream')
+    else:
+        # A WSGI worker would be held for the whole stream
+        booked = await booked_times(doctor.id, doctor.hospital_id, date)
+        response = HttpResponse(_sse_snapshot(booked), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+def _rate_limited(request, retry_after):
+    error_msg = 'Too many booking attempts. Please try again later.'
+    if request.content_type == 'application/json' or 'application/json' in request.META.get('HTTP_CONTENT_TYPE', ''):
+        response = JsonResponse({'success': False, 'error': error_msg}, status=429)
+        response['Retry-After'] = str(retry_after)
+        return response
+    messages.error(request, error_msg)
+    return redirect('book_appointment')
+
 @csrf_exempt
+@idempotent
 def create_appointment(request):
     """Create a new appointment - handles both AJAX and form submissions"""
     if request.method == 'POST':
+        # Throttle floods before any database work
+        retry_after = ratelimit.check({'booking_ip': ratelimit.client_ip(request)})
+        if retry_after:
+            return _rate_limited(request, retry_after)
         try:
             # Check if this is an AJAX request or form submission
             if request.content_type == 'application/json' or 'application/json' in request.META.get('HTTP_CONTENT_TYPE', ''):
@@ -215,6 +266,10 @@ def create_appointment(request):
             # Extract email and phone for validation
             email = data['email']
             phone = data['phone']
+
+            retry_after = ratelimit.check({'booking_phone': phone, 'booking_email': email})
+            if retry_after:
+                return _rate_limited(request, retry_after)
             
             # Validate appointment booking based on business rules
             can_book, error_message = validate_appointment_booking(email, phone)
@@ -227,15 +282,9 @@ def create_appointment(request):
                     messages.error(request, error_message)
                     return redirect('book_appointment')
 
-            # Check if the time slot is already booked
-            existing_appointment = Appointment.objects.filter(
-                doctor_id=data['doctor_id'],
-                date=data['date'],
-                time=data['time']
-            ).exclude(status='cancelled').first()
-            
-            if existing_appointment:
-                error_msg = f"This time slot is already booked. Please select a different time."
+            # Check if the time slot is already booked or held for the waitlist
+            if not slot_is_free(data['doctor_id'], data['date'], data['time']):
+                error_msg = SLOT_TAKEN_MESSAGE
                 if request.content_type == 'application/json' or 'application/json' in request.META.get('HTTP_CONTENT_TYPE', ''):
                     return JsonResponse({'success': False, 'error': error_msg})
                 else:
@@ -253,15 +302,21 @@ def create_appointment(request):
                 time=data['time'],
                 reason=data['reason']
             )
-            appointment.save()
-
-            # Send SMS confirmation after successful appointment creation
             try:
-                sms_response = send_appointment_confirmation_sms(appointment)
-                if sms_response.get('status') == 'error':
-                    logger.warning(f"Failed to send SMS confirmation for appointment {appointment.id}: {sms_response.get('message')}")
+                with transaction.atomic():
+                    appointment.save()
+                    record_event(appointment, 'pending', actor=request.user)
+            except IntegrityError:
+                # Another request took the slot between the check and the insert
+                if request.content_type == 'application/json' or 'application/json' in request.META.get('HTTP_CONTENT_TYPE', ''):
+                    return JsonResponse({'success': False, 'error': SLOT_TAKEN_MESSAGE})
                 else:
-                    logger.info(f"SMS confirmation sent successfully for appointment {appointment.id}")
+                    messages.error(request, SLOT_TAKEN_MESSAGE)
+                    return redirect('book_appointment')
+
+            # Queue the SMS confirmation; it is sent in the background so the response does not wait on the gateway
+            try:
+                queue_appointment_confirmation(appointment)
             except Exception as sms_error:
                 logger.error(f"Error sending SMS for appointment {appointment.id}: {str(sms_error)}")
                 # Don't fail the appointment creation if SMS fails
@@ -282,6 +337,83 @@ def create_appointment(request):
                 return redirect('book_appointment')
     return JsonResponse({'success': False, 'error': 'Invalid request method'})
 
+@require_POST
+@idempotent
+def create_appointments_batch(request):
+    """
+    API endpoint booking many appointments in one request, for hospital staff.
+    Body: {"appointments": [{<same fields as create_appointment>}, ...]}
+    """
+    user = request.user
+    access = request.access
+    if not access.is_manager:
+        return JsonResponse({'success': False, 'error': 'Permission denied'}, status=403)
+    if not access.is_admin and not access.is_hospital_member:
+        return JsonResponse({'success': False, 'error': 'Your account is not linked to a hospital'}, status=403)
+    try:
+        items = json.loads(request.body)['appointments']
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'success': False, 'error': 'Expected {"appointments": [...]}'}, status=400)
+    if not isinstance(items, list) or not items:
+        return JsonResponse({'success': False, 'error': 'No appointments given'}, status=400)
+    if len(items) > MAX_BATCH_SIZE:
+        return JsonResponse({'success': False, 'error': f'At most {MAX_BATCH_SIZE} appointments per request'}, status=400)
+
+    results = book_appointments(items, user)
+    booked = sum(1 for result in results if result['success'])
+    return JsonResponse({'success': True, 'booked': booked, 'failed': len(results) - booked, 'results': results})
+
+@csrf_exempt
+def join_waitlist(request):
+    """API endpoint to join the waitlist for a doctor's day"""
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Invalid request method'})
+    try:
+        if request.content_type == 'application/json':
+            data = json.loads(request.body)
+        else:
+            data = request.POST
+
+        existing = WaitlistEntry.objects.filter(
+            doctor_id=data['doctor_id'],
+            date=data['date'],
+            email=data['email'],
+            status__in=['waiting', 'offered'],
+        ).first()
+        if existing:
+            return JsonResponse({'success': True, 'waitlistId': existing.id, 'position': waitlist_position(existing)})
+
+        entry = WaitlistEntry.objects.create(
+            full_name=data['full_name'],
+            email=data['email'],
+            phone=data['phone'],
+            hospital_id=data['hospital_id'],
+            doctor_id=data['doctor_id'],
+            service_id=data['service_id'],
+            date=data['date'],
+            reason=data.get('reason', ''),
+        )
+        return JsonResponse({'success': True, 'waitlistId': entry.id, 'position': waitlist_position(entry)})
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)})
+
+def waitlist_offer(request, token):
+    """Show a slot offered to a waitlisted patient and book it on POST"""
+    entry = get_object_or_404(WaitlistEntry.objects.select_related('hospital', 'doctor'), offer_token=token)
+    if request.method == 'POST':
+        appointment = accept_offer(entry)
+        if appointment:
+            messages.success(request, 'Your appointment has been booked successfully!')
+            return redirect('appointment_success', appointment_id=appointment.id)
+        messages.error(request, 'Sorry, this offer has expired or the slot is no longer available.')
+        return redirect('waitlist_offer', token=token)
+
+    is_open = entry.status == 'offered' and entry.offer_expires_at > timezone.now()
+    return render(request, 'waitlist_offer.html', {
+        'entry': entry,
+        'is_open': is_open,
+    })
+
 # Test function to validate the implementation works correctly
 def test_appointment_validation():
     """
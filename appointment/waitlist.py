@@ -0,0 +1,153 @@
+"""
+Waitlist backfill.
+
+Patients join the waitlist for a doctor's day when it is fully booked. When an
+appointment is cancelled, offer_slot() hands the freed slot to the earliest
+waiting entry: the slot is held for settings.WAITLIST_HOLD_MINUTES and the
+patient gets an SMS with a link to accept it. Offers nobody accepts are expired
+by the process_waitlist command, which passes the slot on to the next patient.
+
+Every lookup is served by one of WaitlistEntry's indexes, (doctor, date,
+status, created_at) or (status, offer_expires_at), so a wave of cancellations
+costs a few index probes per slot.
+"""
+import secrets
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.urls import reverse
+from django.utils import timezone
+
+from dashboard.events import record_event
+from dashboard.models import Appointment, WaitlistEntry
+from hospital_appoitment.db import skip_locked
+from .availability import held_times, slots_changed
+from .notifications import queue_appointment_confirmation, queue_sms
+
+
+def slot_is_free(doctor_id, date, time):
+    """True if the slot is neither booked nor held for the waitlist"""
+    booked = Appointment.objects.filter(
+        doctor_id=doctor_id, date=date, time=time,
+    ).exclude(status='cancelled').exists()
+    return not booked and not held_times(doctor_id, date).filter(offered_time=time).exists()
+
+
+def waitlist_position(entry):
+    """1-based position of a waiting entry in its doctor's day"""
+    return WaitlistEntry.objects.filter(
+        doctor_id=entry.doctor_id,
+        date=entry.date,
+        status='waiting',
+        created_at__lte=entry.created_at,
+    ).count()
+
+
+def build_waitlist_offer_sms(entry):
+    """
+    Build the SMS offering a freed slot to a waitlisted patient.
+
+    Returns:
+        tuple: (phone_number, message)
+    """
+    url = settings.SITE_URL.rstrip('/') + reverse('waitlist_offer', args=[entry.offer_token])
+    message = (
+        f"Hello {entry.full_name}, a slot with Dr. {entry.doctor.name} at {entry.hospital.name} "
+        f"is now free on {entry.date} at {entry.offered_time}. It is held for you for "
+        f"{settings.WAITLIST_HOLD_MINUTES} minutes. Book it here: {url}"
+    )
+    return entry.phone, message
+
+
+def offer_slot(doctor_id, date, time):
+    """
+    Hold a free slot for the first waiting patient of that doctor's day and
+    text them the offer. Returns the WaitlistEntry, or None if nobody is
+    waiting or the slot is no longer free.
+    """
+    with transaction.atomic():
+        if not slot_is_free(doctor_id, date, time):
+            return None
+        waiting = WaitlistEntry.objects.filter(doctor_id=doctor_id, date=date, status='waiting').order_by('created_at')
+        entry_id = skip_locked(waiting).values_list('id', flat=True).first()
+        if entry_id is None:
+            return None
+        # The status filter keeps two passes from offering the same entry on SQLite
+        offered = WaitlistEntry.objects.filter(id=entry_id, status='waiting').update(
+            status='offered',
+            offered_time=time,
+            offer_expires_at=timezone.now() + timedelta(minutes=settings.WAITLIST_HOLD_MINUTES),
+            offer_token=secrets.token_urlsafe(32),
+        )
+        if not offered:
+            return None
+        # The hold takes the slot; bulk update() sends no post_save
+        slots_changed(date, doctor_id=doctor_id)
+        entry = WaitlistEntry.objects.select_related('doctor', 'hospital').get(id=entry_id)
+        phone_number, message = build_waitlist_offer_sms(entry)
+        queue_sms(phone_number, message, kind='waitlist_offer', dispatch=True)
+    return entry
+
+
+def slot_freed(appointment):
+    """Offer a cancelled appointment's slot to the waitlist once the cancellation commits"""
+    doctor_id, date, time = appointment.doctor_id, appointment.date, appointment.time
+    transaction.on_commit(lambda: offer_slot(doctor_id, date, time))
+
+
+def accept_offer(entry):
+    """
+    Book the slot held for ``entry``. Returns the new Appointment, or None if
+    the offer has expired or the slot was taken after all.
+    """
+    with transaction.atomic():
+        entry = WaitlistEntry.objects.select_for_update().filter(
+            id=entry.id, status='offered', offer_expires_at__gt=timezone.now(),
+        ).first()
+        if entry is None:
+            return None
+        appointment = Appointment(
+            full_name=entry.full_name,
+            email=entry.email,
+            phone=entry.phone,
+            hospital_id=entry.hospital_id,
+            doctor_id=entry.doctor_id,
+            service_id=entry.service_id,
+            date=entry.date,
+            time=entry.offered_time,
+            reason=entry.reason,
+        )
+        try:
+            with transaction.atomic():
+                appointment.save()
+                record_event(appointment, 'pending')
+        except IntegrityError:
+            # Booked around the hold; keep the patient's place in line
+            entry.status = 'waiting'
+            entry.offered_time = ''
+            entry.offer_expires_at = None
+            entry.save(update_fields=['status', 'offered_time', 'offer_expires_at'])
+            return None
+        entry.status = 'booked'
+        entry.appointment = appointment
+        entry.save(update_fields=['status', 'appointment'])
+        queue_appointment_confirmation(appointment)
+    return appointment
+
+
+def expire_offers(limit=100):
+    """
+    Expire offers whose hold has run out and pass each slot on to the next
+    waiting patient. Returns the number of offers expired.
+    """
+    due = WaitlistEntry.objects.filter(
+        status='offered', offer_expires_at__lte=timezone.now(),
+    ).order_by('offer_expires_at').values('id', 'doctor_id', 'date', 'offered_time')[:limit]
+    expired = 0
+    for offer in list(due):
+        if WaitlistEntry.objects.filter(id=offer['id'], status='offered').update(status='expired'):
+            expired += 1
+            slots_changed(offer['date'], doctor_id=offer['doctor_id'])
+            offer_slot(offer['doctor_id'], offer['date'], offer['offered_time'])
+    return expired
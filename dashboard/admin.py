@@ -1,5 +1,11 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
 from .models import *
+from .csv_import import import_uploaded_file
+from .events import record_event
 
 # Register your models here.
 # Register your models here.
@@ -7,11 +13,92 @@ admin.site.site_header = "Hospital Management Admin"
 admin.site.site_title = "Hospital Management Admin Portal"
 admin.site.index_title = "Welcome to Hospital Management Admin Portal"
 
-admin.site.register(Doctor)
-admin.site.register(Appointment)
-admin.site.register(Hospital)
-admin.site.register(Service)
+
+class CsvImportForm(forms.Form):
+    csv_file = forms.FileField(label='CSV file', help_text='UTF-8, with a header row of field names')
+    dry_run = forms.BooleanField(required=False, label='Only validate')
+
+
+class CsvImportAdmin(admin.ModelAdmin):
+    """Adds an "Import CSV" page to the change list (see dashboard.csv_import)"""
+    change_list_template = 'admin/dashboard/csv_import_change_list.html'
+    import_kind = None
+
+    def get_urls(self):
+        info = self.model._meta.app_label, self.model._meta.model_name
+        return [
+            path('import-csv/', self.admin_site.admin_view(self.import_csv_view), name='%s_%s_import_csv' % info),
+        ] + super().get_urls()
+
+    def import_csv_view(self, request):
+        if not self.has_add_permission(request) or not self.has_change_permission(request):
+            return redirect('admin:index')
+        form = CsvImportForm(request.POST or None, request.FILES or None)
+        result = None
+        if request.method == 'POST' and form.is_valid():
+            result = import_uploaded_file(self.import_kind, form.cleaned_data['csv_file'], dry_run=form.cleaned_data['dry_run'])
+            if not form.cleaned_data['dry_run']:
+                messages.success(request, f'{result.created} created, {result.updated} updated, {result.error_count} rows skipped')
+        return TemplateResponse(request, 'admin/dashboard/csv_import.html', {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': f'Import {self.model._meta.verbose_name_plural} from CSV',
+            'form': form,
+            'result': result,
+            'columns': self.import_columns,
+        })
+
+
+class HospitalAdmin(CsvImportAdmin):
+    import_kind = 'hospitals'
+    import_columns = 'name, address, city, state, country, location, description, phone_number, email, website'
+
+
+class DoctorAdmin(CsvImportAdmin):
+    import_kind = 'doctors'
+    import_columns = 'name, hospital (name), specialty, title, gender, bio, education, experience_years, is_active'
+
+
+class ServiceAdmin(CsvImportAdmin):
+    import_kind = 'services'
+    import_columns = 'name, hospital (name), duration, description, is_active'
+
+
+class AppointmentAdmin(admin.ModelAdmin):
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        # Admin edits join the status history like any other transition
+        if not change or 'status' in form.changed_data:
+            previous = form.initial.get('status') if change else None
+            record_event(obj, obj.status, from_status=previous, actor=request.user)
+
+
+class AppointmentEventAdmin(admin.ModelAdmin):
+    """Read-only: the status history is append-only"""
+    list_display = ['appointment_id', 'hospital', 'from_status', 'to_status', 'actor', 'timestamp']
+    list_filter = ['to_status']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+admin.site.register(Doctor, DoctorAdmin)
+admin.site.register(Appointment, AppointmentAdmin)
+admin.site.register(Hospital, HospitalAdmin)
+admin.site.register(Service, ServiceAdmin)
 admin.site.register(Booking)
 admin.site.register(DoctorManagement)
 admin.site.register(HospitalManagement)
-admin.site.register(BlockedTimeSlot)
\ No newline at end of file
+admin.site.register(BlockedTimeSlot)
+admin.site.register(SmsNotification)
+admin.site.register(ImageJob)
+admin.site.register(WaitlistEntry)
+admin.site.register(AppointmentEvent, AppointmentEventAdmin)
+admin.site.register(ArchivedAppointment)
+admin.site.register(ArchivedManagementLog)
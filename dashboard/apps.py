@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class DashboardConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'dashboard'
+
+    def ready(self):
+        from hospital_appoitment.db import configure_sqlite_connection
+        connection_created.connect(configure_sqlite_connection, dispatch_uid='configure_sqlite_connection')
+        from . import signals  # noqa: F401
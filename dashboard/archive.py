@@ -0,0 +1,107 @@
+"""
+Archival of old appointments and management logs.
+
+The archive_records command moves completed and cancelled appointments whose
+date is before a cutoff into ArchivedAppointment, and DoctorManagement /
+HospitalManagement rows older than the cutoff into ArchivedManagementLog.
+Each batch is copied and deleted in its own transaction, so the command can be
+stopped at any point and rerun; a batch that was copied but not deleted is
+simply copied again (inserts ignore rows already archived).
+
+The live tables then only hold recent history, which keeps the newest-first
+dashboard lists fast. AppointmentEvent rows are kept: the status history
+refers to archived appointments by their original id.
+"""
+from django.core import serializers
+from django.db import transaction
+
+from .models import (
+    Appointment, ArchivedAppointment, ArchivedManagementLog, Booking, DoctorManagement, HospitalManagement,
+)
+
+ARCHIVE_STATUSES = ['completed', 'cancelled']
+BATCH_SIZE = 1000
+
+
+def snapshot(instance):
+    """Every concrete field of a model instance as JSON-serialisable data"""
+    return serializers.serialize('python', [instance])[0]['fields']
+
+
+def archivable_appointments(cutoff_date):
+    return Appointment.objects.filter(status__in=ARCHIVE_STATUSES, date__lt=cutoff_date)
+
+
+def archive_appointment_batch(appointment_ids):
+    """Copy the given appointments (with their bookings) to the archive and delete them"""
+    with transaction.atomic():
+        appointments = list(Appointment.objects.filter(id__in=appointment_ids, status__in=ARCHIVE_STATUSES))
+        bookings = {booking.appointment_id: booking for booking in Booking.objects.filter(appointment__in=appointments)}
+        rows = []
+        for appointment in appointments:
+            data = snapshot(appointment)
+            booking = bookings.get(appointment.id)
+            if booking:
+                data['booking'] = {'id': booking.id, **snapshot(booking)}
+            rows.append(ArchivedAppointment(
+                id=appointment.id,
+                hospital_id=appointment.hospital_id,
+                doctor_id=appointment.doctor_id,
+                email=appointment.email,
+                date=appointment.date,
+                time=appointment.time,
+                status=appointment.status,
+                data=data,
+            ))
+        ArchivedAppointment.objects.bulk_create(rows, ignore_conflicts=True)
+        # Bookings cascade; SMS and waitlist rows keep a NULL reference
+        Appointment.objects.filter(id__in=[appointment.id for appointment in appointments]).delete()
+    return len(appointments)
+
+
+def archive_appointments(cutoff_date, batch_size=BATCH_SIZE):
+    """Archive appointments dated before ``cutoff_date`` batch by batch, yielding each batch's size"""
+    last_id = 0
+    while True:
+        ids = list(
+            archivable_appointments(cutoff_date).filter(id__gt=last_id)
+            .order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return
+        yield archive_appointment_batch(ids)
+        last_id = ids[-1]
+
+
+def _archive_log_batch(model, kind, ids):
+    with transaction.atomic():
+        logs = list(model.objects.filter(id__in=ids))
+        ArchivedManagementLog.objects.bulk_create([
+            ArchivedManagementLog(
+                kind=kind,
+                original_id=log.id,
+                object_id=log.object_id,
+                object_name=log.object_name,
+                manager_id=log.manager_id,
+                hospital_id=log.hospital_id,
+                action=log.action,
+                timestamp=log.timestamp,
+                notes=log.notes,
+            )
+            for log in logs
+        ], ignore_conflicts=True)
+        model.objects.filter(id__in=ids).delete()
+    return len(logs)
+
+
+def archive_management_logs(cutoff, batch_size=BATCH_SIZE):
+    """Archive DoctorManagement and HospitalManagement rows older than ``cutoff``, yielding each batch's size"""
+    for model, kind in [(DoctorManagement, 'doctor'), (HospitalManagement, 'hospital')]:
+        while True:
+            ids = list(
+                model.objects.filter(timestamp__lt=cutoff)
+                .order_by('timestamp').values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            yield _archive_log_batch(model, kind, ids)
@@ -0,0 +1,131 @@
+"""
+Doctor and hospital audit log (DoctorManagement / HospitalManagement).
+
+log_action() snapshots the entity's id, name and hospital into the entry, so
+it must be called before a delete and the history survives it. Inside a
+request the entry is only buffered; AuditLogMiddleware writes all of the
+request's entries with one bulk_create per model once the response is ready,
+on a background thread when settings.AUDIT_LOG_ASYNC is set. Outside a request
+(shell, management commands) entries are written straight away.
+
+audit_entries() reads the log newest first with keyset pagination over the
+timestamp indexes.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .models import Doctor, DoctorManagement, Hospital, HospitalManagement
+
+logger = logging.getLogger(__name__)
+
+_buffer = ContextVar('audit_buffer', default=None)
+# One writer thread keeps background flushes in order
+_flush_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='audit-flush')
+
+AUDIT_PAGE_SIZE = 50
+
+
+def build_entry(instance, action, manager=None, notes=''):
+    """Unsaved DoctorManagement/HospitalManagement entry for a Doctor or Hospital"""
+    fields = {
+        'manager': manager if manager is not None and manager.is_authenticated else None,
+        'action': action,
+        'notes': notes,
+        'object_id': instance.pk,
+        'object_name': instance.name,
+    }
+    # A removed entity will be gone by the time the entry is written
+    target = None if action == 'removed' else instance
+    if isinstance(instance, Doctor):
+        return DoctorManagement(doctor=target, hospital_id=instance.hospital_id, **fields)
+    if isinstance(instance, Hospital):
+        return HospitalManagement(hospital=target, **fields)
+    raise TypeError(f'No audit log for {type(instance).__name__}')
+
+
+def log_action(instance, action, manager=None, notes=''):
+    """Record a management action on a Doctor or Hospital. Call before deleting it."""
+    entry = build_entry(instance, action, manager, notes)
+    buffer = _buffer.get()
+    if buffer is None:
+        write_entries([entry])
+    else:
+        buffer.append(entry)
+    return entry
+
+
+def _clear_missing_references(model, entries, field_names):
+    # Rows deleted after an entry was buffered would fail the foreign key check;
+    # the snapshot fields still identify them
+    for field_name in field_names:
+        related = model._meta.get_field(field_name).related_model
+        ids = {getattr(entry, f'{field_name}_id') for entry in entries} - {None}
+        existing = set(related.objects.filter(id__in=ids).values_list('id', flat=True)) if ids else set()
+        for entry in entries:
+            if getattr(entry, f'{field_name}_id') not in existing:
+                setattr(entry, field_name, None)
+
+
+def write_entries(entries):
+    """Insert audit entries with one bulk_create per model"""
+    by_model = {}
+    for entry in entries:
+        by_model.setdefault(type(entry), []).append(entry)
+    for model, rows in by_model.items():
+        foreign_keys = ['manager', 'hospital'] + (['doctor'] if model is DoctorManagement else [])
+        _clear_missing_references(model, rows, foreign_keys)
+        model.objects.bulk_create(rows)
+
+
+def _write_in_background(entries):
+    try:
+        write_entries(entries)
+    except Exception as e:
+        logger.error(f"Error writing {len(entries)} audit log entries: {str(e)}")
+    finally:
+        close_old_connections()
+
+
+def flush(entries):
+    if not entries:
+        return
+    if getattr(settings, 'AUDIT_LOG_ASYNC', False):
+        _flush_executor.submit(_write_in_background, entries)
+    else:
+        write_entries(entries)
+
+
+class AuditLogMiddleware:
+    """Buffer log_action() entries for the duration of a request and flush them together"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _buffer.set([])
+        try:
+            return self.get_response(request)
+        finally:
+            entries = _buffer.get()
+            _buffer.reset(token)
+            flush(entries)
+
+
+def audit_entries(model, hospital_id=None, object_id=None, before=None, limit=AUDIT_PAGE_SIZE):
+    """
+    Up to ``limit`` entries of ``model``, newest first. ``before`` is the
+    (timestamp, id) of the last entry of the previous page.
+    """
+    entries = model.objects.select_related('manager')
+    if object_id is not None:
+        entries = entries.filter(object_id=object_id)
+    if hospital_id is not None:
+        entries = entries.filter(hospital_id=hospital_id)
+    if before is not None:
+        timestamp, last_id = before
+        entries = entries.filter(timestamp__lte=timestamp).exclude(timestamp=timestamp, id__gte=last_id)
+    return list(entries.order_by('-timestamp', '-id')[:limit])
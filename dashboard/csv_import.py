@@ -0,0 +1,246 @@
+"""
+CSV import of hospitals, doctors and services.
+
+Used by the import_csv command and the "Import CSV" admin pages. Rows are
+read one at a time and handled in batches, so memory stays flat however long
+the file is:
+
+* each row is validated with the dashboard ModelForm for its model; the
+  per-row database lookups those forms would make (uniqueness checks, the
+  hospital dropdown) are replaced by one query per batch;
+* hospitals and services are upserted on their natural keys (Hospital.name,
+  Service name + hospital) with bulk_create(update_conflicts=True);
+* doctors have no unique key, so existing ones are matched on hospital + name
+  with one query per batch, then updated with bulk_update and the rest created
+  with bulk_create.
+
+Columns missing from the file leave existing values untouched. Each batch is
+written in its own transaction; rows with errors are skipped and reported by
+line number. Hospitals are referenced by name in the ``hospital`` column.
+"""
+import csv
+import io
+from dataclasses import dataclass, field
+
+from django import forms
+from django.db import transaction
+from django.forms import modelform_factory
+from django.utils import timezone
+
+from .forms import DoctorForm, HospitalForm, ServiceForm
+from .fragment_cache import DIRECTORY, bump_version
+from .models import Doctor, Hospital, Service
+
+BATCH_SIZE = 1000
+# Errors kept for the report; the rest are only counted
+MAX_REPORTED_ERRORS = 1000
+
+
+class HospitalImportForm(HospitalForm):
+    class Meta(HospitalForm.Meta):
+        fields = ['name', 'address', 'city', 'state', 'country', 'location', 'description', 'phone_number', 'email', 'website']
+
+    def validate_unique(self):
+        # Existing names are updated, not rejected
+        pass
+
+
+class DoctorImportForm(DoctorForm):
+    # A hospital name, resolved for the whole batch at once instead of a lookup per row
+    hospital = forms.CharField(max_length=200)
+
+    class Meta(DoctorForm.Meta):
+        fields = ['name', 'specialty', 'title', 'gender', 'bio', 'education', 'experience_years', 'is_active']
+
+
+class ServiceImportForm(ServiceForm):
+    hospital = forms.CharField(max_length=200)
+
+    class Meta(ServiceForm.Meta):
+        fields = ['name', 'description', 'duration', 'is_active']
+
+    def validate_unique(self):
+        pass
+
+
+IMPORT_FORMS = {
+    'hospitals': HospitalImportForm,
+    'doctors': DoctorImportForm,
+    'services': ServiceImportForm,
+}
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    updated: int = 0
+    error_count: int = 0
+    errors: list = field(default_factory=list)  # (line, message), at most MAX_REPORTED_ERRORS
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+
+def _form_errors(form):
+    return '; '.join(
+        f"{name}: {' '.join(messages)}" if name != '__all__' else ' '.join(messages)
+        for name, messages in form.errors.items()
+    )
+
+
+def _resolve_hospitals(rows, result):
+    """Set instance.hospital from the hospital names of a batch; drops rows with unknown hospitals"""
+    hospitals = Hospital.objects.in_bulk({name for _, _, name in rows}, field_name='name')
+    resolved = []
+    for line, instance, name in rows:
+        hospital = hospitals.get(name)
+        if hospital is None:
+            result.add_error(line, f'hospital: No hospital named "{name}"')
+            continue
+        instance.hospital = hospital
+        resolved.append((line, instance))
+    return resolved
+
+
+def _dedupe(rows, key):
+    # A key repeated within one batch would make the upsert touch a row twice; the last row wins
+    return list({key(instance): (line, instance) for line, instance in rows}.values())
+
+
+def _write_hospitals(rows, update_fields, result):
+    rows = _dedupe(rows, lambda hospital: hospital.name)
+    instances = [instance for _, instance in rows]
+    existing = set(Hospital.objects.filter(name__in=[hospital.name for hospital in instances]).values_list('name', flat=True))
+    Hospital.objects.bulk_create(
+        instances,
+        update_conflicts=True,
+        unique_fields=['name'],
+        update_fields=[name for name in update_fields if name != 'name'] + ['updated_at'],
+    )
+    result.updated += len(existing)
+    result.created += len(instances) - len(existing)
+    # Upserted rows do not get their ids back
+    return Hospital.objects.filter(name__in=[hospital.name for hospital in instances]).values_list('id', flat=True)
+
+
+def _write_services(rows, update_fields, result):
+    rows = _dedupe(_resolve_hospitals(rows, result), lambda service: (service.name, service.hospital_id))
+    instances = [instance for _, instance in rows]
+    existing = set(
+        Service.objects.filter(name__in={service.name for service in instances}, hospital__in={service.hospital_id for service in instances})
+        .values_list('name', 'hospital_id')
+    )
+    fields = [name for name in update_fields if name != 'name']
+    if fields:
+        Service.objects.bulk_create(instances, update_conflicts=True, unique_fields=['name', 'hospital'], update_fields=fields)
+    else:
+        # Only names in the file: nothing to update on existing services
+        Service.objects.bulk_create(instances, ignore_conflicts=True)
+    updated = sum(1 for service in instances if (service.name, service.hospital_id) in existing)
+    result.updated += updated
+    result.created += len(instances) - updated
+    return {service.hospital_id for service in instances}
+
+
+def _write_doctors(rows, update_fields, result):
+    rows = _dedupe(_resolve_hospitals(rows, result), lambda doctor: (doctor.name, doctor.hospital_id))
+    instances = [instance for _, instance in rows]
+    existing = {}
+    for doctor_id, name, hospital_id in Doctor.objects.filter(
+        name__in={doctor.name for doctor in instances}, hospital__in={doctor.hospital_id for doctor in instances},
+    ).order_by('id').values_list('id', 'name', 'hospital_id'):
+        existing.setdefault((name, hospital_id), doctor_id)
+
+    to_update, to_create = [], []
+    now = timezone.now()
+    for doctor in instances:
+        doctor.pk = existing.get((doctor.name, doctor.hospital_id))
+        (to_update if doctor.pk else to_create).append(doctor)
+        # bulk_update does not fill in auto_now
+        doctor.updated_at = now
+    fields = [name for name in update_fields if name != 'name']
+    if to_update and fields:
+        Doctor.objects.bulk_update(to_update, fields + ['updated_at'])
+    Doctor.objects.bulk_create(to_create)
+    result.updated += len(to_update)
+    result.created += len(to_create)
+    return {doctor.hospital_id for doctor in instances}
+
+
+WRITERS = {
+    'hospitals': _write_hospitals,
+    'doctors': _write_doctors,
+    'services': _write_services,
+}
+
+
+def _flush(kind, rows, update_fields, result, dry_run):
+    if dry_run:
+        if kind != 'hospitals':
+            # Still report unknown hospitals
+            _resolve_hospitals(rows, result)
+        return
+    with transaction.atomic():
+        hospital_ids = WRITERS[kind](rows, update_fields, result)
+        # bulk writes send no post_save
+        bump_version(DIRECTORY, hospital_ids=hospital_ids)
+
+
+def import_csv(kind, stream, batch_size=BATCH_SIZE, dry_run=False):
+    """
+    Import ``kind`` ('hospitals', 'doctors' or 'services') from a text stream.
+    With ``dry_run`` rows are validated but nothing is written.
+
+    Returns:
+        ImportResult
+    """
+    reader = csv.DictReader(stream)
+    columns = {name.strip() for name in reader.fieldnames or []}
+    result = ImportResult()
+    model = IMPORT_FORMS[kind]._meta.model
+    # Required columns are those the form requires and the model has no default for
+    required = {
+        name for name, form_field in IMPORT_FORMS[kind].base_fields.items()
+        if form_field.required and not (name in IMPORT_FORMS[kind]._meta.fields and model._meta.get_field(name).has_default())
+    }
+    if required - columns:
+        result.add_error(1, f"Missing columns: {', '.join(sorted(required - columns))}")
+        return result
+    # Only the file's columns are validated and written; the rest keep their
+    # current values, or the model defaults for new rows
+    update_fields = [name for name in IMPORT_FORMS[kind]._meta.fields if name in columns]
+    form_class = modelform_factory(model, form=IMPORT_FORMS[kind], fields=update_fields)
+
+    rows = []
+    # reader.line_num is the line a row ends on; multi-line fields make it
+    # differ from the row count, so a row starts after the previous one ended
+    previous_end = reader.line_num
+    for row in reader:
+        line, previous_end = previous_end + 1, reader.line_num
+        data = {key.strip(): (value or '').strip() for key, value in row.items() if key}
+        form = form_class(data)
+        if not form.is_valid():
+            result.add_error(line, _form_errors(form))
+            continue
+        instance = form.save(commit=False)
+        # Doctors and services carry their hospital's name until the batch resolves it
+        rows.append((line, instance) if kind == 'hospitals' else (line, instance, form.cleaned_data['hospital']))
+        if len(rows) >= batch_size:
+            _flush(kind, rows, update_fields, result, dry_run)
+            rows = []
+    if rows:
+        _flush(kind, rows, update_fields, result, dry_run)
+    # Unknown hospitals are only found when a batch is flushed, after that batch's form errors
+    result.errors.sort()
+    return result
+
+
+def import_uploaded_file(kind, uploaded_file, **kwargs):
+    """import_csv() for a Django UploadedFile, decoded as UTF-8 (a BOM from Excel is skipped)"""
+    stream = io.TextIOWrapper(uploaded_file.file, encoding='utf-8-sig', newline='')
+    try:
+        return import_csv(kind, stream, **kwargs)
+    finally:
+        stream.detach()
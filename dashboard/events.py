@@ -0,0 +1,88 @@
+"""
+Appointment status history (AppointmentEvent).
+
+Every status change appends one row in the same transaction as the change:
+bookings (None -> pending), staff actions in dashboard.transitions, waitlist
+bookings and admin edits. Rows are never updated or deleted.
+
+Reads are range scans over the (appointment, timestamp) and
+(hospital, timestamp) indexes: one appointment's history, a hospital's audit
+trail for a period, or every event in a period for rebuilding statistics.
+"""
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+from .models import AppointmentEvent
+
+STATUS_NAMES = {code: status for status, code in AppointmentEvent.STATUS_CODES.items()}
+
+
+def record_event(appointment, to_status, from_status=None, actor=None, timestamp=None):
+    """Append a status change for ``appointment``; call inside the transaction that makes it"""
+    event = AppointmentEvent(
+        appointment_id=appointment.id,
+        hospital_id=appointment.hospital_id,
+        actor=actor if actor is not None and actor.is_authenticated else None,
+        from_status=AppointmentEvent.STATUS_CODES.get(from_status),
+        to_status=AppointmentEvent.STATUS_CODES[to_status],
+    )
+    if timestamp is not None:
+        event.timestamp = timestamp
+    event.save()
+    return event
+
+
+def appointment_history(appointment_id):
+    """Status changes of one appointment, oldest first"""
+    return AppointmentEvent.objects.filter(appointment_id=appointment_id).order_by('timestamp')
+
+
+def hospital_events(hospital_id, start, end):
+    """A hospital's status changes with start <= timestamp < end, oldest first"""
+    return AppointmentEvent.objects.filter(
+        hospital_id=hospital_id,
+        timestamp__gte=start,
+        timestamp__lt=end,
+    ).order_by('timestamp')
+
+
+def iter_events(start, end, hospital_id=None, chunk_size=5000):
+    """
+    Yield events with start <= timestamp < end in timestamp order, reading
+    them in keyset-paginated chunks so large periods stream in bounded memory.
+    """
+    events = AppointmentEvent.objects.filter(timestamp__lt=end)
+    if hospital_id is not None:
+        events = events.filter(hospital_id=hospital_id)
+    last = (start, 0)
+    while True:
+        timestamp, last_id = last
+        chunk = list(
+            events.filter(timestamp__gte=timestamp)
+            .exclude(timestamp=timestamp, id__lte=last_id)
+            .order_by('timestamp', 'id')[:chunk_size]
+        )
+        if not chunk:
+            return
+        yield from chunk
+        last = (chunk[-1].timestamp, chunk[-1].id)
+
+
+def daily_transition_counts(start, end, hospital_id=None):
+    """
+    Number of transitions into each status per day, e.g.
+    {date(2025, 1, 6): {'pending': 40, 'confirmed': 31, 'cancelled': 2}}
+    """
+    events = AppointmentEvent.objects.filter(timestamp__gte=start, timestamp__lt=end)
+    if hospital_id is not None:
+        events = events.filter(hospital_id=hospital_id)
+    rows = (
+        events.annotate(day=TruncDate('timestamp'))
+        .values('day', 'to_status')
+        .annotate(count=Count('id'))
+        .order_by('day')
+    )
+    counts = {}
+    for row in rows:
+        counts.setdefault(row['day'], {})[STATUS_NAMES[row['to_status']]] = row['count']
+    return counts
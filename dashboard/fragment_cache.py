@@ -0,0 +1,108 @@
+"""
+Versioned template fragment caching.
+
+Templates cache their expensive regions with Django's {% cache %} tag, keyed
+by the viewer's scope (role and hospital) and the version of every data group
+the fragment shows:
+
+    {% cache fragment_timeout dashboard_stats fragment_scope fragment_versions.appointments %}
+
+The versions are counters in the default cache, one system-wide per group
+and one per hospital. Model signals (see dashboard.signals) bump both when
+rows change, so the next render misses and stale fragments simply expire.
+Pages about one hospital (its public page, the dashboards of its admins and
+staff) use that hospital's counters, so a booking elsewhere leaves them
+cached; system admins and patients see every hospital and use the
+system-wide ones. Bumps wait for the transaction to commit, otherwise a
+concurrent request could cache the old data under the new version.
+
+Counters in the per-process memory cache are only bumped in the process that
+saved the change, so with several processes the others keep serving the old
+fragments. Fragment caching therefore needs a shared CACHE_URL, like the rate
+limits; settings.FRAGMENT_CACHE_TIMEOUT is 0 (caching off) without one.
+
+Context values that need queries are passed as deferred() callables, which
+the template only calls inside the {% cache %} block that shows them.
+"""
+import functools
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from accounts.access import ADMIN_ROLE, ALL_HOSPITALS, PATIENT_ROLE, hospital_limit, managed_hospital
+
+# Data groups and what they cover
+DIRECTORY = 'directory'         # hospitals, doctors, services
+APPOINTMENTS = 'appointments'
+BLOCKED_SLOTS = 'blocked_slots'
+
+
+def _version_key(group, hospital_id=None):
+    if hospital_id is None:
+        return f'fragment-version:{group}'
+    return f'fragment-version:{group}:{hospital_id}'
+
+
+def _initial_version():
+    # A counter evicted from the cache restarts at a value no cached fragment used
+    return time.time_ns() // 1000
+
+
+def data_version(group, hospital_id=None):
+    """Current version of a data group, system-wide or for one hospital"""
+    key = _version_key(group, hospital_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(*groups, hospital_ids=()):
+    """
+    Invalidate the fragments showing ``groups`` once the current transaction
+    commits: the system-wide ones and those of ``hospital_ids``.
+    """
+    hospitals = {int(hospital_id) for hospital_id in hospital_ids if hospital_id is not None}
+    keys = [_version_key(group, hospital_id) for group in groups for hospital_id in [None, *hospitals]]
+
+    def bump():
+        for key in keys:
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.add(key, _initial_version(), None)
+    transaction.on_commit(bump)
+
+
+def deferred(func):
+    """``func`` as a callable that runs once, the first time a template uses it"""
+    return functools.cache(func)
+
+
+def fragment_scope(user):
+    """Who a fragment was rendered for: everything, one hospital or one patient"""
+    hospital_id = managed_hospital(user)
+    if hospital_id == ALL_HOSPITALS:
+        return ADMIN_ROLE
+    if hospital_id is not None:
+        return f'{user.role}:{hospital_id}'
+    return f'{PATIENT_ROLE}:{user.id}'
+
+
+def fragment_cache_context(*groups, user=None, hospital_id=None):
+    """
+    Template context for the {% cache %} tags of a page showing ``groups``,
+    about ``hospital_id`` or, for hospital admins and staff, their hospital.
+    """
+    if hospital_id is None:
+        hospital_id = hospital_limit(user)
+    context = {
+        'fragment_timeout': settings.FRAGMENT_CACHE_TIMEOUT,
+        'fragment_versions': {group: data_version(group, hospital_id) for group in groups},
+    }
+    if user is not None:
+        context['fragment_scope'] = fragment_scope(user)
+    return context
@@ -0,0 +1,145 @@
+"""
+Background image processing.
+
+Saving a Hospital, Doctor or CustomUser with a new upload marks the image
+'pending' and queues an ImageJob. The process_image_jobs worker claims jobs in
+batches and decodes, strips and resizes the images in a process pool (see
+dashboard.images.process_image), then stores the derivative URLs on the row and
+marks it 'ready'. Templates check ``<field>_status`` and show a placeholder
+until then.
+"""
+import logging
+from datetime import timedelta
+
+from django.apps import apps
+from django.utils import timezone
+
+from hospital_appoitment.db import claim_batch
+from .fragment_cache import DIRECTORY, bump_version
+from .images import process_image
+from .models import ImageJob
+
+logger = logging.getLogger(__name__)
+
+# model label -> image fields with matching <field>_status / <field>_derivatives
+IMAGE_FIELDS = {
+    'dashboard.hospital': ['image'],
+    'dashboard.doctor': ['image'],
+    'accounts.customuser': ['profile_picture'],
+}
+MAX_ATTEMPTS = 3
+# Jobs stuck in 'processing' this long belong to a worker that died
+STALE_AFTER = timedelta(minutes=15)
+
+
+def _set_image_state(instance, field_name, status, derivatives):
+    fields = {f'{field_name}_status': status, f'{field_name}_derivatives': derivatives}
+    # update() rather than save() so post_save does not fire again
+    type(instance)._default_manager.filter(pk=instance.pk).update(**fields)
+    for name, value in fields.items():
+        setattr(instance, name, value)
+
+
+def queue_image(instance, field_name):
+    """Queue processing of the current upload in ``field_name``"""
+    image = getattr(instance, field_name)
+    ImageJob.objects.create(
+        model_label=instance._meta.label_lower,
+        object_id=instance.pk,
+        field_name=field_name,
+        image_name=image.name,
+    )
+    _set_image_state(instance, field_name, 'pending', {'source': image.name})
+
+
+def sync_image_state(instance):
+    """Queue new uploads and reset the state of removed ones (post_save hook)"""
+    for field_name in IMAGE_FIELDS.get(instance._meta.label_lower, []):
+        image = getattr(instance, field_name)
+        derivatives = getattr(instance, f'{field_name}_derivatives') or {}
+        if not image:
+            if getattr(instance, f'{field_name}_status'):
+                _set_image_state(instance, field_name, '', {})
+        elif derivatives.get('source') != image.name:
+            queue_image(instance, field_name)
+
+
+def queue_missing_images():
+    """Queue every image that has neither derivatives nor a pending job"""
+    queued = 0
+    for label, field_names in IMAGE_FIELDS.items():
+        model = apps.get_model(label)
+        for field_name in field_names:
+            rows = (
+                model._default_manager.exclude(**{f'{field_name}__isnull': True})
+                .exclude(**{field_name: ''})
+                .exclude(**{f'{field_name}_status__in': ['pending', 'ready']})
+            )
+            for instance in rows.iterator():
+                queue_image(instance, field_name)
+                queued += 1
+    return queued
+
+
+def claim_image_jobs(limit=20):
+    return claim_batch(ImageJob.objects.order_by('created_at'), limit, 'processing')
+
+
+def release_stale_image_jobs():
+    """Put jobs abandoned by a dead worker back in the queue"""
+    return ImageJob.objects.filter(
+        status='processing',
+        locked_at__lt=timezone.now() - STALE_AFTER,
+    ).update(status='queued', locked_at=None)
+
+
+def process_job_image(model_label, field_name, image_name):
+    """Process pool entry point: no database access, only storage"""
+    storage = apps.get_model(model_label)._meta.get_field(field_name).storage
+    return process_image(storage, image_name)
+
+
+def record_image_result(job, derivatives=None, error=None):
+    """Store a finished job's derivatives on its row, or schedule a retry"""
+    model = apps.get_model(job.model_label)
+    # Matching on the file name ignores results for images replaced meanwhile
+    row = model._default_manager.filter(pk=job.object_id, **{job.field_name: job.image_name})
+    job.locked_at = None
+    if error is None:
+        row.update(**{
+            # Stripping EXIF rewrites the original, possibly under another name
+            job.field_name: derivatives['source'],
+            f'{job.field_name}_status': 'ready',
+            f'{job.field_name}_derivatives': derivatives,
+        })
+        job.status = 'done'
+    else:
+        job.attempts += 1
+        job.last_error = str(error)[:255]
+        if job.attempts >= MAX_ATTEMPTS:
+            job.status = 'failed'
+            row.update(**{f'{job.field_name}_status': 'failed'})
+        else:
+            job.status = 'queued'
+    if job.status != 'queued' and job.model_label in ['dashboard.hospital', 'dashboard.doctor']:
+        # Cached hospital pages still show the placeholder
+        hospital_field = 'id' if job.model_label == 'dashboard.hospital' else 'hospital_id'
+        bump_version(DIRECTORY, hospital_ids=model._default_manager.filter(pk=job.object_id).values_list(hospital_field, flat=True))
+    job.save(update_fields=['status', 'attempts', 'last_error', 'locked_at', 'updated_at'])
+
+
+def run_image_jobs(jobs, executor):
+    """Process claimed jobs on ``executor`` (a process pool). Returns the number done."""
+    futures = [
+        (job, executor.submit(process_job_image, job.model_label, job.field_name, job.image_name))
+        for job in jobs
+    ]
+    done = 0
+    for job, future in futures:
+        try:
+            record_image_result(job, derivatives=future.result())
+            done += 1
+        except Exception as e:
+            logger.warning(f"Image job {job.id} ({job.image_name}) failed: {str(e)}")
+            record_image_result(job, error=e)
+    return done
@@ -0,0 +1,165 @@
+"""
+Resized derivatives of uploaded images (hospital, doctor and profile pictures).
+
+Every original gets a WebP and a JPEG version at each size in
+DERIVATIVE_SIZES. Files are stored next to the uploads under
+derivatives/<content hash>/, so identical uploads share derivatives and a
+replaced image never serves stale ones.
+
+Processing runs in the process_image_jobs worker (see dashboard.image_jobs).
+The result is stored on the owning row in ``<field>_derivatives`` and
+``<field>_status``, so pages read it without touching the original.
+"""
+import hashlib
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+IMAGE_STATUS_CHOICES = [
+    ('', 'No Image'),
+    ('pending', 'Processing'),
+    ('ready', 'Ready'),
+    ('failed', 'Failed'),
+]
+
+# name -> maximum width in pixels; the aspect ratio is kept
+DERIVATIVE_SIZES = {
+    'thumbnail': 160,
+    'card': 480,
+    'hero': 1280,
+}
+DERIVATIVE_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+DERIVATIVES_DIR = 'derivatives'
+
+
+def derivative_name(digest, size, fmt):
+    return f'{DERIVATIVES_DIR}/{digest[:2]}/{digest[:32]}/{size}.{fmt}'
+
+
+def render_derivative(original, width, fmt):
+    """Resize a PIL image to ``width`` (never upscaling) and encode it"""
+    pil_format, options = DERIVATIVE_FORMATS[fmt]
+    resized = original.copy()
+    resized.thumbnail((width, width * 4), Image.LANCZOS)
+    if pil_format == 'JPEG' and resized.mode != 'RGB':
+        resized = resized.convert('RGB')
+    buffer = BytesIO()
+    resized.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+EXIF_ORIENTATION = 0x0112
+
+
+def _jpeg_without_exif(data, orientation):
+    """
+    JPEG bytes with the EXIF segment replaced by one holding only the
+    orientation. The compressed image data is copied as is, not re-encoded.
+    """
+    segments = [data[:2]]
+    if orientation != 1:
+        exif = Image.Exif()
+        exif[EXIF_ORIENTATION] = orientation
+        exif = exif.tobytes()
+        segments.append(b'\xff\xe1' + (len(exif) + 2).to_bytes(2, 'big') + exif)
+    position = 2
+    # Marker segments up to the start of scan: 0xFF, marker, 2-byte length
+    while position + 4 <= len(data) and data[position] == 0xFF and data[position + 1] != 0xDA:
+        end = position + 2 + int.from_bytes(data[position + 2:position + 4], 'big')
+        if not (data[position + 1] == 0xE1 and data[position + 4:position + 10] == b'Exif\x00\x00'):
+            segments.append(data[position:end])
+        position = end
+    segments.append(data[position:])
+    return b''.join(segments)
+
+
+def strip_exif(storage, name, data, original, source_format, orientation=1):
+    """
+    Rewrite an uploaded original without its EXIF block (phone photos carry
+    GPS coordinates). Returns the name it was stored under, which storages
+    may change, and the new file contents.
+
+    The new contents are saved under a temporary name before the original
+    is deleted, so a failed write always leaves one of them.
+    """
+    if source_format == 'JPEG':
+        data = _jpeg_without_exif(data, orientation)
+    else:
+        buffer = BytesIO()
+        original.save(buffer, source_format)
+        data = buffer.getvalue()
+    # Storages have no rename; the temporary copy goes once the original is replaced
+    temp_name = storage.save(f'{name}.tmp', ContentFile(data))
+    storage.delete(name)
+    name = storage.save(name, ContentFile(data))
+    storage.delete(temp_name)
+    return name, data
+
+
+def process_image(storage, name):
+    """
+    Decode an uploaded image, strip its EXIF data and create any missing
+    derivatives. Returns the value stored in ``<field>_derivatives``:
+    {'source': name, 'sizes': {'card': {'width': 480, 'webp': url, 'jpeg': url}, ...}}
+    """
+    with storage.open(name, 'rb') as original_file:
+        data = original_file.read()
+
+    original = Image.open(BytesIO(data))
+    source_format = original.format
+    exif = original.getexif()
+    # Apply the camera orientation before EXIF is dropped
+    original = ImageOps.exif_transpose(original)
+    if original.mode not in ('RGB', 'RGBA'):
+        original = original.convert('RGBA' if 'A' in original.getbands() else 'RGB')
+    if exif:
+        name, data = strip_exif(storage, name, data, original, source_format, exif.get(EXIF_ORIENTATION, 1))
+
+    digest = hashlib.sha256(data).hexdigest()
+    sizes = {}
+    for size, max_width in DERIVATIVE_SIZES.items():
+        width = min(max_width, original.width)
+        sizes[size] = {'width': width}
+        for fmt in DERIVATIVE_FORMATS:
+            derivative = derivative_name(digest, size, fmt)
+            if not storage.exists(derivative):
+                storage.save(derivative, ContentFile(render_derivative(original, width, fmt)))
+            sizes[size][fmt] = storage.url(derivative)
+    return {'source': name, 'sizes': sizes}
+
+
+def get_derivatives(image):
+    """
+    Derivative URLs of an ImageField file, or None until the worker has
+    processed the current upload.
+    """
+    if not image:
+        return None
+    stored = getattr(image.instance, f'{image.field.name}_derivatives', None) or {}
+    if stored.get('source') != image.name:
+        return None
+    return stored.get('sizes')
+
+
+def derivative_url(image, size='card', fmt='jpeg'):
+    """URL of one derivative, falling back to the original"""
+    derivatives = get_derivatives(image)
+    if derivatives:
+        return derivatives[size][fmt]
+    return image.url if image else ''
+
+
+def srcset(image, fmt='webp'):
+    """srcset attribute value listing every derivative width"""
+    derivatives = get_derivatives(image)
+    if not derivatives:
+        return ''
+    entries = {}
+    for derivative in derivatives.values():
+        # Small originals give several derivatives of the same width
+        entries.setdefault(derivative['width'], derivative[fmt])
+    return ', '.join(f'{url} {width}w' for width, url in sorted(entries.items()))
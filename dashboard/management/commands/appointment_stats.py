@@ -0,0 +1,46 @@
+"""
+Rebuild appointment statistics from the status history.
+
+Usage:
+    python manage.py appointment_stats --since 2025-01-01 --until 2025-02-01
+    python manage.py appointment_stats --since 2025-01-01 --hospital 3
+
+Prints, per day, how many appointments moved into each status. The counts
+come from AppointmentEvent range scans, not from the current Appointment rows,
+so they stay correct after appointments change status again or are archived.
+"""
+from datetime import datetime, time, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from dashboard.events import daily_transition_counts
+from dashboard.models import AppointmentEvent
+
+
+class Command(BaseCommand):
+    help = 'Daily appointment status counts rebuilt from the status history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', required=True, help='First day (YYYY-MM-DD)')
+        parser.add_argument('--until', help='Day after the last one (YYYY-MM-DD, default: tomorrow)')
+        parser.add_argument('--hospital', type=int, help='Only this hospital id')
+
+    def _day_start(self, value):
+        day = parse_date(value)
+        if day is None:
+            raise CommandError(f'Invalid date: {value}')
+        return timezone.make_aware(datetime.combine(day, time.min))
+
+    def handle(self, *args, **options):
+        start = self._day_start(options['since'])
+        if options['until']:
+            end = self._day_start(options['until'])
+        else:
+            end = self._day_start((timezone.localdate() + timedelta(days=1)).isoformat())
+
+        statuses = list(AppointmentEvent.STATUS_CODES)
+        self.stdout.write('day         ' + ''.join(f'{status:>11}' for status in statuses))
+        for day, counts in daily_transition_counts(start, end, options['hospital']).items():
+            self.stdout.write(f'{day}  ' + ''.join(f'{counts.get(status, 0):>11}' for status in statuses))
@@ -0,0 +1,52 @@
+"""
+Move old appointments and management logs into the archive tables.
+
+Usage:
+    python manage.py archive_records                 # older than 365 days
+    python manage.py archive_records --days 180 --batch-size 500
+    python manage.py archive_records --dry-run       # only count
+
+Only completed and cancelled appointments are archived. Each batch runs in its
+own transaction, so the command can be interrupted and rerun safely.
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from dashboard.archive import (
+    BATCH_SIZE, archivable_appointments, archive_appointments, archive_management_logs,
+)
+from dashboard.models import DoctorManagement, HospitalManagement
+
+
+class Command(BaseCommand):
+    help = 'Archive completed/cancelled appointments and management logs older than a cutoff'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=365, help='Archive records older than this many days')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many rows would be archived')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        cutoff_date = timezone.localdate(cutoff)
+
+        if options['dry_run']:
+            appointments = archivable_appointments(cutoff_date).count()
+            logs = (
+                DoctorManagement.objects.filter(timestamp__lt=cutoff).count()
+                + HospitalManagement.objects.filter(timestamp__lt=cutoff).count()
+            )
+            self.stdout.write(f'Would archive {appointments} appointments and {logs} management logs before {cutoff_date}')
+            return
+
+        total = 0
+        for archived in archive_appointments(cutoff_date, options['batch_size']):
+            total += archived
+            self.stdout.write(f'Archived {total} appointments')
+
+        logs = sum(archive_management_logs(cutoff, options['batch_size']))
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {total} appointments and {logs} management logs before {cutoff_date}'
+        ))
@@ -0,0 +1,90 @@
+"""
+Measure what the list pages load with and without column trimming.
+
+Usage:
+    python manage.py seed_load_data --text-size 2000
+    python manage.py bench_listing_columns --limit 1000 --rounds 5
+
+For every listing, runs the query the page used to make (all columns) and the
+trimmed one it makes now (the model querysets' for_cards() / for_listing(),
+which leave out or cut hospital descriptions, doctor bios and appointment
+reasons) and reports:
+
+* KB fetched - size of the values the database returned (raw cursor)
+* peak KB    - peak memory allocated while building the model instances
+* ms         - time to run the query and build the instances
+
+Appointment listings are cut to --limit rows.
+"""
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Count
+
+from dashboard.models import Appointment, Doctor, Hospital
+
+
+def _listings(hospital_id, limit):
+    appointments = Appointment.objects.select_related('hospital', 'doctor', 'service').order_by('-created_at')
+    return [
+        ('hospitals page', Hospital.objects.all(), Hospital.objects.for_cards()),
+        ('hospital doctors', Doctor.objects.filter(hospital_id=hospital_id), Doctor.objects.for_cards().filter(hospital_id=hospital_id)),
+        ('manage doctors', Doctor.objects.select_related('hospital').order_by('name'), Doctor.objects.for_listing()),
+        ('appointments', appointments[:limit], Appointment.objects.for_listing()[:limit]),
+    ]
+
+
+def _value_size(value):
+    if value is None:
+        return 0
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    return len(str(value))
+
+
+def _fetched_bytes(queryset):
+    sql, params = queryset.query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(sql, params)
+        return sum(_value_size(value) for row in cursor.fetchall() for value in row)
+
+
+def _measure(queryset, rounds):
+    """(rows, peak bytes, seconds per round) of building the instances"""
+    tracemalloc.start()
+    rows = len(list(queryset.all()))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    for _ in range(rounds):
+        list(queryset.all())
+    return rows, peak, (time.perf_counter() - started) / rounds
+
+
+class Command(BaseCommand):
+    help = 'Compare data fetched and memory used by list queries with all columns vs trimmed columns'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=1000, help='Rows per appointment listing')
+        parser.add_argument('--rounds', type=int, default=5, help='Timed runs per query')
+        parser.add_argument('--hospital', type=int, help='Hospital for the doctor cards; defaults to the one with most doctors')
+
+    def handle(self, *args, **options):
+        hospital_id = options['hospital']
+        if hospital_id is None:
+            hospital = Hospital.objects.annotate(doctor_count=Count('doctors')).order_by('-doctor_count').only('id').first()
+            if hospital is None:
+                raise CommandError('No hospitals found. Seed some data first, e.g. python manage.py seed_load_data --text-size 2000.')
+            hospital_id = hospital.id
+
+        self.stdout.write(f"{'listing':<18}{'columns':<9}{'rows':>8}{'KB fetched':>12}{'peak KB':>10}{'ms':>9}")
+        for name, full, trimmed in _listings(hospital_id, options['limit']):
+            for columns, queryset in [('all', full), ('trimmed', trimmed)]:
+                fetched = _fetched_bytes(queryset)
+                rows, peak, elapsed = _measure(queryset, options['rounds'])
+                self.stdout.write(
+                    f'{name:<18}{columns:<9}{rows:>8}{fetched / 1024:>12.1f}{peak / 1024:>10.1f}{elapsed * 1000:>9.1f}'
+                )
@@ -0,0 +1,145 @@
+"""
+Concurrent booking benchmark for the SQLite database profiles.
+
+Usage:
+    python manage.py bench_sqlite_locking --writers 8 --readers 8 --bookings 200
+
+Runs the same workload against two scratch database files: one opened the way
+Django opens SQLite by default, one with settings.SQLITE_PRODUCTION_PRAGMAS and
+BEGIN IMMEDIATE write transactions (hospital_appoitment.sqlite_backend).
+Writer threads book appointments (slot pre-check then insert, like
+create_appointment) and confirm them (like the dashboard status change);
+reader threads poll booked times (like /api/booked-times/).
+"""
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from hospital_appoitment.db import apply_sqlite_pragmas
+
+SCHEMA = '''
+CREATE TABLE appointment (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    doctor_id INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    time TEXT NOT NULL,
+    full_name TEXT NOT NULL,
+    status TEXT NOT NULL
+);
+CREATE INDEX appointment_doctor_date ON appointment (doctor_id, date);
+'''
+TIME_SLOTS = ['09:00', '09:30', '10:00', '10:30', '11:00', '11:30', '14:00', '14:30', '15:00', '15:30', '16:00', '16:30']
+
+
+class Command(BaseCommand):
+    help = 'Measure lock contention of concurrent bookings with default vs production SQLite settings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=8)
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--bookings', type=int, default=200, help='Bookings per writer thread')
+        parser.add_argument('--doctors', type=int, default=50)
+        parser.add_argument('--timeout', type=float, default=5.0, help='Busy timeout (seconds) of the default profile; Django leaves it at 5')
+
+    def handle(self, *args, **options):
+        profiles = [
+            # (name, pragmas, busy timeout, statement opening a write transaction)
+            ('default', {}, options['timeout'], 'BEGIN'),
+            ('production', settings.SQLITE_PRODUCTION_PRAGMAS, settings.SQLITE_PRODUCTION_PRAGMAS['busy_timeout'] / 1000, 'BEGIN IMMEDIATE'),
+        ]
+        self.stdout.write(f"{'profile':<12}{'bookings/s':>12}{'reads/s':>10}{'locked':>8}{'p95 write ms':>14}")
+        for name, pragmas, timeout, begin in profiles:
+            with tempfile.TemporaryDirectory() as directory:
+                result = self._run(os.path.join(directory, 'bench.sqlite3'), pragmas, timeout, begin, options)
+            self.stdout.write(
+                f"{name:<12}{result['bookings'] / result['elapsed']:>12.1f}{result['reads'] / result['elapsed']:>10.1f}"
+                f"{result['locked']:>8}{result['p95'] * 1000:>14.1f}"
+            )
+
+    def _connect(self, path, pragmas, timeout):
+        # isolation_level=None: explicit BEGIN/COMMIT like Django's autocommit + atomic()
+        connection = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        apply_sqlite_pragmas(connection.cursor(), pragmas)
+        return connection
+
+    def _run(self, path, pragmas, timeout, begin, options):
+        setup = self._connect(path, pragmas, timeout)
+        setup.executescript(SCHEMA)
+        setup.close()
+
+        lock = threading.Lock()
+        stats = {'bookings': 0, 'reads': 0, 'locked': 0, 'latencies': []}
+        writers_done = threading.Event()
+
+        def writer(index):
+            rng = random.Random(index)
+            connection = self._connect(path, pragmas, timeout)
+            for _ in range(options['bookings']):
+                doctor_id = rng.randrange(options['doctors'])
+                date = f'2030-01-{rng.randint(1, 28):02d}'
+                slot = rng.choice(TIME_SLOTS)
+                started = time.perf_counter()
+                try:
+                    connection.execute(begin)
+                    taken = connection.execute(
+                        "SELECT 1 FROM appointment WHERE doctor_id = ? AND date = ? AND time = ? AND status != 'cancelled'",
+                        (doctor_id, date, slot),
+                    ).fetchone()
+                    if not taken:
+                        cursor = connection.execute(
+                            "INSERT INTO appointment (doctor_id, date, time, full_name, status) VALUES (?, ?, ?, ?, 'pending')",
+                            (doctor_id, date, slot, f'Patient {index}'),
+                        )
+                        connection.execute("UPDATE appointment SET status = 'confirmed' WHERE id = ?", (cursor.lastrowid,))
+                    connection.execute('COMMIT')
+                    with lock:
+                        stats['bookings'] += 1
+                        stats['latencies'].append(time.perf_counter() - started)
+                except sqlite3.OperationalError as error:
+                    if connection.in_transaction:
+                        connection.execute('ROLLBACK')
+                    if 'locked' not in str(error):
+                        raise
+                    with lock:
+                        stats['locked'] += 1
+            connection.close()
+
+        def reader(index):
+            rng = random.Random(-index - 1)
+            connection = self._connect(path, pragmas, timeout)
+            while not writers_done.is_set():
+                try:
+                    connection.execute(
+                        "SELECT time FROM appointment WHERE doctor_id = ? AND date = ? AND status != 'cancelled'",
+                        (rng.randrange(options['doctors']), f'2030-01-{rng.randint(1, 28):02d}'),
+                    ).fetchall()
+                    with lock:
+                        stats['reads'] += 1
+                except sqlite3.OperationalError as error:
+                    if 'locked' not in str(error):
+                        raise
+                    with lock:
+                        stats['locked'] += 1
+            connection.close()
+
+        writers = [threading.Thread(target=writer, args=(i,)) for i in range(options['writers'])]
+        readers = [threading.Thread(target=reader, args=(i,)) for i in range(options['readers'])]
+        started = time.perf_counter()
+        for thread in writers + readers:
+            thread.start()
+        for thread in writers:
+            thread.join()
+        writers_done.set()
+        for thread in readers:
+            thread.join()
+
+        latencies = sorted(stats['latencies']) or [0]
+        stats['elapsed'] = time.perf_counter() - started
+        stats['p95'] = latencies[int(len(latencies) * 0.95) - 1]
+        return stats
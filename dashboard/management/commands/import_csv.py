@@ -0,0 +1,46 @@
+"""
+Import hospitals, doctors or services from a CSV file.
+
+Usage:
+    python manage.py import_csv hospitals hospitals.csv
+    python manage.py import_csv doctors doctors.csv --batch-size 500
+    python manage.py import_csv services services.csv --dry-run    # only validate
+
+The header row names the columns, using the model field names; doctors and
+services have a ``hospital`` column with the hospital's name. Existing rows are
+updated: hospitals by name, services by name and hospital, doctors by name and
+hospital. Import hospitals before their doctors and services.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.csv_import import BATCH_SIZE, IMPORT_FORMS, import_csv
+
+
+class Command(BaseCommand):
+    help = 'Import hospitals, doctors or services from a CSV file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(IMPORT_FORMS))
+        parser.add_argument('path', help='CSV file, UTF-8 encoded')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help='Validate the file without writing anything')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as stream:
+                result = import_csv(options['kind'], stream, options['batch_size'], options['dry_run'])
+        except OSError as e:
+            raise CommandError(f"Cannot read {options['path']}: {e}")
+
+        for line, message in result.errors:
+            self.stderr.write(f'Line {line}: {message}')
+        if result.error_count > len(result.errors):
+            self.stderr.write(f'... and {result.error_count - len(result.errors)} more errors')
+
+        if options['dry_run']:
+            self.stdout.write(f"Validated {options['kind']}: {result.error_count} errors")
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"Imported {options['kind']}: {result.created} created, {result.updated} updated, "
+                f"{result.error_count} rows skipped"
+            ))
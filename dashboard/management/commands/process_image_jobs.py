@@ -0,0 +1,54 @@
+"""
+Worker that processes uploaded images in the background.
+
+Usage:
+    python manage.py process_image_jobs --workers 4
+    python manage.py process_image_jobs --enqueue-missing --once
+
+Decoding, EXIF stripping, resizing and encoding run in a process pool; this
+process only claims jobs and records results.
+"""
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from dashboard.image_jobs import claim_image_jobs, queue_missing_images, release_stale_image_jobs, run_image_jobs
+
+
+def _init_worker():
+    # Pool processes never query the database; drop connections inherited on fork
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Resize uploaded hospital, doctor and profile images in a process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help='Image processing processes')
+        parser.add_argument('--batch-size', type=int, default=20)
+        parser.add_argument('--sleep', type=float, default=5.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty')
+        parser.add_argument('--enqueue-missing', action='store_true', help='First queue every image without derivatives')
+
+    def handle(self, *args, **options):
+        if options['enqueue_missing']:
+            self.stdout.write(f'Queued {queue_missing_images()} images')
+
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=_init_worker) as executor:
+            while True:
+                released = release_stale_image_jobs()
+                if released:
+                    self.stdout.write(f'Requeued {released} stale jobs')
+
+                jobs = claim_image_jobs(options['batch_size'])
+                if jobs:
+                    done = run_image_jobs(jobs, executor)
+                    self.stdout.write(f'Processed {done}/{len(jobs)} images')
+                    continue
+
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
@@ -0,0 +1,336 @@
+"""
+Generate a large, deterministic dataset for load testing.
+
+Usage:
+    python manage.py seed_load_data --hospitals 2000 --doctors 20000 --appointments 1000000 --workers 4
+    python manage.py seed_load_data --text-size 2000   # long descriptions, bios and reasons
+
+The same --seed always produces the same rows, independent of --workers and
+--batch-size, because every chunk of appointments and bookings draws from its
+own random generator seeded from (seed, chunk index). --text-size pads the
+text fields without drawing random numbers, so it changes no other column.
+"""
+import math
+import random
+import time
+from datetime import date, timedelta
+from multiprocessing import get_context
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+
+from accounts.models import CustomUser
+from dashboard.fragment_cache import APPOINTMENTS, BLOCKED_SLOTS, DIRECTORY, bump_version
+from dashboard.models import Hospital, Service, Doctor, Appointment, Booking, BlockedTimeSlot, appointment_start
+
+# Same slots the booking page offers (static/script.js)
+TIME_SLOTS = [
+    '09:00', '09:30', '10:00', '10:30', '11:00', '11:30',
+    '14:00', '14:30', '15:00', '15:30', '16:00', '16:30',
+]
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday']
+CITIES = ['Accra', 'Kumasi', 'Tamale', 'Takoradi', 'Cape Coast', 'Sunyani', 'Ho', 'Koforidua', 'Bolgatanga', 'Wa']
+SPECIALTIES = [
+    'General Practice', 'Pediatrics', 'Cardiology', 'Dermatology', 'Gynecology',
+    'Orthopedics', 'Neurology', 'Ophthalmology', 'Dentistry', 'Psychiatry',
+]
+SERVICES = [
+    ('General Consultation', 30), ('Follow-up Visit', 15), ('Vaccination', 15),
+    ('Lab Tests', 20), ('Physiotherapy', 45), ('Antenatal Care', 30),
+    ('Dental Cleaning', 60), ('Eye Examination', 30), ('Minor Surgery', 90),
+    ('Counselling', 60),
+]
+FIRST_NAMES = ['Kwame', 'Ama', 'Kofi', 'Akua', 'Yaw', 'Abena', 'Kojo', 'Efua', 'Kwesi', 'Adwoa', 'John', 'Mary']
+LAST_NAMES = ['Mensah', 'Owusu', 'Boateng', 'Asante', 'Osei', 'Agyeman', 'Appiah', 'Addo', 'Darko', 'Quaye']
+REASONS = ['', 'Routine check-up', 'Headache and fever', 'Follow-up on lab results', 'Back pain', 'Prescription refill']
+FILLER = 'Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor incididunt. '
+STATUS_WEIGHTS = [('pending', 20), ('confirmed', 35), ('completed', 35), ('cancelled', 10)]
+
+# Chunk size that drives the per-chunk random generators. Kept fixed so the
+# output does not depend on --batch-size or --workers.
+CHUNK_SIZE = 10000
+
+
+def _chunk_rng(seed, kind, index):
+    """Independent, reproducible random generator for one chunk of rows"""
+    return random.Random(f'{seed}:{kind}:{index}')
+
+
+def _padded(text, size):
+    """``text`` followed by filler sentences up to ``size`` characters"""
+    if len(text) >= size:
+        return text
+    if text:
+        text += ' '
+    missing = size - len(text)
+    return text + (FILLER * (missing // len(FILLER) + 1))[:missing]
+
+
+_PLAN = None
+
+
+def _worker_init(plan):
+    """Process pool initializer: drop inherited DB connections and keep the shared plan"""
+    import django
+    django.setup()
+    connections.close_all()
+    global _PLAN
+    _PLAN = plan
+
+
+def _worker_init_local(plan):
+    global _PLAN
+    _PLAN = plan
+
+
+def _appointment_rows(plan, chunk_index):
+    """Build the Appointment objects for one chunk of appointment numbers"""
+    rng = _chunk_rng(plan['seed'], 'appointments', chunk_index)
+    doctors = plan['doctors']
+    services = plan['services']
+    start_date = plan['start_date']
+    slots_per_day = len(TIME_SLOTS)
+    statuses, weights = zip(*STATUS_WEIGHTS)
+
+    first = chunk_index * CHUNK_SIZE
+    last = min(first + CHUNK_SIZE, plan['appointments'])
+    rows = []
+    for number in range(first, last):
+        # Walk doctors first, then slots, so (doctor, date, time) never repeats
+        doctor_id, hospital_id = doctors[number % len(doctors)]
+        slot = number // len(doctors)
+        day, slot_index = divmod(slot, slots_per_day)
+        first_name = rng.choice(FIRST_NAMES)
+        last_name = rng.choice(LAST_NAMES)
+        appointment_date = start_date + timedelta(days=day)
+        # bulk_create skips save(), which normally fills starts_at
+        rows.append(Appointment(
+            full_name=f'{first_name} {last_name}',
+            email=f'{first_name.lower()}.{last_name.lower()}.{number}@example.com',
+            phone=f'+23320{number:07d}',
+            hospital_id=hospital_id,
+            doctor_id=doctor_id,
+            service_id=rng.choice(services[hospital_id]),
+            date=appointment_date,
+            time=TIME_SLOTS[slot_index],
+            starts_at=appointment_start(appointment_date, TIME_SLOTS[slot_index]),
+            reason=_padded(rng.choice(REASONS), plan['text_size']),
+            status=rng.choices(statuses, weights)[0],
+        ))
+    return rows
+
+
+def _insert_appointment_chunk(chunk_index):
+    plan = _PLAN
+    rows = _appointment_rows(plan, chunk_index)
+    with transaction.atomic():
+        Appointment.objects.bulk_create(rows, batch_size=plan['batch_size'])
+    return len(rows)
+
+
+def _insert_booking_chunk(chunk_index):
+    plan = _PLAN
+    rng = _chunk_rng(plan['seed'], 'bookings', chunk_index)
+    low = plan['first_appointment_id'] + chunk_index * CHUNK_SIZE
+    appointment_ids = Appointment.objects.filter(
+        id__gte=low, id__lt=low + CHUNK_SIZE,
+        hospital__name__startswith=plan['hospital_prefix'],
+    ).order_by('id').values_list('id', flat=True)
+    patients = plan['patients']
+    rows = [
+        Booking(user_id=rng.choice(patients), appointment_id=appointment_id, status='confirmed')
+        for appointment_id in appointment_ids
+        if rng.random() < plan['booking_ratio']
+    ]
+    with transaction.atomic():
+        Booking.objects.bulk_create(rows, batch_size=plan['batch_size'])
+    return len(rows)
+
+
+class Command(BaseCommand):
+    help = 'Generate a deterministic synthetic dataset (hospitals, doctors, services, appointments, bookings, blocked slots) for load testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=42, help='Random seed; the same seed always produces the same data')
+        parser.add_argument('--prefix', default='LT', help='Prefix for generated hospital names and usernames')
+        parser.add_argument('--hospitals', type=int, default=2000)
+        parser.add_argument('--doctors', type=int, default=20000)
+        parser.add_argument('--services-per-hospital', type=int, default=5)
+        parser.add_argument('--patients', type=int, default=10000)
+        parser.add_argument('--appointments', type=int, default=1000000)
+        parser.add_argument('--booking-ratio', type=float, default=0.3, help='Share of appointments that get a Booking row')
+        parser.add_argument('--blocked-slots', type=int, default=50000)
+        parser.add_argument('--start-date', type=date.fromisoformat, default=None, help='First appointment date (YYYY-MM-DD), defaults to 30 days ago')
+        parser.add_argument('--text-size', type=int, default=0, help='Pad hospital descriptions, doctor bios and appointment reasons to this many characters')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per INSERT statement')
+        parser.add_argument('--workers', type=int, default=1, help='Processes used for appointments and bookings')
+        parser.add_argument('--flush', action='store_true', help='Delete previously generated data with the same prefix first')
+
+    def handle(self, *args, **options):
+        if options['hospitals'] < 1 or options['doctors'] < options['hospitals']:
+            raise CommandError('Need at least one hospital and at least one doctor per hospital.')
+        if not 1 <= options['services_per_hospital'] <= len(SERVICES):
+            raise CommandError(f'--services-per-hospital must be between 1 and {len(SERVICES)}.')
+
+        prefix = options['prefix']
+        hospital_prefix = f'{prefix} Hospital '
+        if options['flush']:
+            self._flush(prefix, hospital_prefix)
+        elif Hospital.objects.filter(name__startswith=hospital_prefix).exists():
+            raise CommandError(f'Data with prefix "{prefix}" already exists. Use --flush or another --prefix.')
+
+        seed = options['seed']
+        batch_size = options['batch_size']
+        text_size = options['text_size']
+        rng = random.Random(seed)
+        started = time.monotonic()
+
+        hospital_ids = self._create_hospitals(rng, hospital_prefix, options['hospitals'], text_size, batch_size)
+        services = self._create_services(rng, hospital_ids, options['services_per_hospital'], batch_size)
+        doctors = self._create_doctors(rng, hospital_ids, options['doctors'], text_size, batch_size)
+        patients = self._create_patients(prefix, options['patients'], batch_size)
+        self.stdout.write(f'Created {len(hospital_ids)} hospitals, {len(doctors)} doctors and {len(patients)} patients')
+
+        start_date = options['start_date'] or date.today() - timedelta(days=30)
+        days = math.ceil(options['appointments'] / (len(doctors) * len(TIME_SLOTS))) if options['appointments'] else 0
+        plan = {
+            'seed': seed,
+            'batch_size': batch_size,
+            'text_size': text_size,
+            'appointments': options['appointments'],
+            'doctors': doctors,
+            'services': services,
+            'start_date': start_date,
+            'hospital_prefix': hospital_prefix,
+            'patients': patients,
+            'booking_ratio': options['booking_ratio'],
+        }
+
+        chunks = math.ceil(options['appointments'] / CHUNK_SIZE)
+        created = self._run_chunks(_insert_appointment_chunk, chunks, plan, options['workers'])
+        self.stdout.write(f'Created {created} appointments over {days} days from {start_date}')
+
+        if patients and options['booking_ratio'] > 0 and created:
+            bounds = Appointment.objects.filter(hospital__name__startswith=hospital_prefix).order_by('id').values_list('id', flat=True)
+            plan['first_appointment_id'] = bounds.first()
+            last_id = bounds.last()
+            chunks = math.ceil((last_id - plan['first_appointment_id'] + 1) / CHUNK_SIZE)
+            created = self._run_chunks(_insert_booking_chunk, chunks, plan, options['workers'])
+            self.stdout.write(f'Created {created} bookings')
+
+        created = self._create_blocked_slots(rng, doctors, start_date, max(days, 1), options['blocked_slots'], batch_size)
+        self.stdout.write(f'Created {created} blocked time slots')
+
+        # bulk_create sends no signals, so cached pages are not invalidated otherwise
+        bump_version(DIRECTORY, APPOINTMENTS, BLOCKED_SLOTS, hospital_ids=hospital_ids)
+
+        self.stdout.write(self.style.SUCCESS(f'Done in {time.monotonic() - started:.1f}s'))
+
+    def _run_chunks(self, func, chunks, plan, workers):
+        """Run func over every chunk index, in-process or across a process pool"""
+        if workers <= 1:
+            _worker_init_local(plan)
+            return sum(func(index) for index in range(chunks))
+
+        # Child processes must open their own connections
+        connections.close_all()
+        with get_context().Pool(workers, initializer=_worker_init, initargs=(plan,)) as pool:
+            total = 0
+            for done, count in enumerate(pool.imap_unordered(func, range(chunks)), start=1):
+                total += count
+                if done % 10 == 0 or done == chunks:
+                    self.stdout.write(f'  {done}/{chunks} chunks')
+            return total
+
+    def _flush(self, prefix, hospital_prefix):
+        # Cascades remove services, doctors, appointments, bookings and blocked slots
+        deleted, _ = Hospital.objects.filter(name__startswith=hospital_prefix).delete()
+        CustomUser.objects.filter(username__startswith=f'{prefix.lower()}_patient_').delete()
+        self.stdout.write(f'Flushed {deleted} rows with prefix "{prefix}"')
+
+    def _create_hospitals(self, rng, hospital_prefix, count, text_size, batch_size):
+        rows = []
+        for i in range(count):
+            city = rng.choice(CITIES)
+            rows.append(Hospital(
+                name=f'{hospital_prefix}{i:05d}',
+                address=f'{rng.randint(1, 999)} Main Street',
+                city=city,
+                state=city,
+                country='Ghana',
+                location=f'{city} Central',
+                description=_padded(f'{city} community hospital serving the surrounding district.', text_size),
+                phone_number=f'+23330{i:07d}',
+            ))
+        Hospital.objects.bulk_create(rows, batch_size=batch_size)
+        return list(Hospital.objects.filter(name__startswith=hospital_prefix).order_by('name').values_list('id', flat=True))
+
+    def _create_services(self, rng, hospital_ids, per_hospital, batch_size):
+        rows = []
+        for hospital_id in hospital_ids:
+            for name, duration in rng.sample(SERVICES, per_hospital):
+                rows.append(Service(name=name, duration=duration, hospital_id=hospital_id))
+        Service.objects.bulk_create(rows, batch_size=batch_size)
+
+        services = {hospital_id: [] for hospital_id in hospital_ids}
+        for service_id, hospital_id in Service.objects.filter(hospital_id__in=hospital_ids).order_by('id').values_list('id', 'hospital_id'):
+            services[hospital_id].append(service_id)
+        return services
+
+    def _create_doctors(self, rng, hospital_ids, count, text_size, batch_size):
+        rows = []
+        for i in range(count):
+            # Round-robin keeps every hospital staffed
+            hospital_id = hospital_ids[i % len(hospital_ids)]
+            days = sorted(rng.sample(range(len(WEEKDAYS)), rng.randint(3, 6)))
+            rows.append(Doctor(
+                name=f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {i:05d}',
+                title='Dr.',
+                specialty=rng.choice(SPECIALTIES),
+                gender=rng.choice(['M', 'F']),
+                hospital_id=hospital_id,
+                experience_years=rng.randint(1, 35),
+                bio=_padded('', text_size),
+                availability_data={WEEKDAYS[d]: TIME_SLOTS for d in days},
+            ))
+        Doctor.objects.bulk_create(rows, batch_size=batch_size)
+        return list(Doctor.objects.filter(hospital_id__in=hospital_ids).order_by('id').values_list('id', 'hospital_id'))
+
+    def _create_patients(self, prefix, count, batch_size):
+        # Hash once; every generated patient shares the same password
+        password = make_password('loadtest')
+        username_prefix = f'{prefix.lower()}_patient_'
+        rows = [
+            CustomUser(
+                username=f'{username_prefix}{i:06d}',
+                email=f'{username_prefix}{i:06d}@example.com',
+                password=password,
+                role='patient',
+            )
+            for i in range(count)
+        ]
+        CustomUser.objects.bulk_create(rows, batch_size=batch_size)
+        return list(CustomUser.objects.filter(username__startswith=username_prefix).order_by('id').values_list('id', flat=True))
+
+    def _create_blocked_slots(self, rng, doctors, start_date, days, count, batch_size):
+        block_types = [choice for choice, _ in BlockedTimeSlot.BLOCK_TYPE_CHOICES]
+        rows = []
+        for _ in range(count):
+            doctor_id, hospital_id = rng.choice(doctors)
+            start = rng.randrange(len(TIME_SLOTS) - 1)
+            end = rng.randint(start + 1, len(TIME_SLOTS) - 1)
+            rows.append(BlockedTimeSlot(
+                hospital_id=hospital_id,
+                # One in five blocks applies to the whole hospital
+                doctor_id=None if rng.random() < 0.2 else doctor_id,
+                date=start_date + timedelta(days=rng.randrange(days)),
+                start_time=TIME_SLOTS[start],
+                end_time=TIME_SLOTS[end],
+                block_type=rng.choice(block_types),
+            ))
+            if len(rows) >= batch_size:
+                BlockedTimeSlot.objects.bulk_create(rows)
+                rows = []
+        BlockedTimeSlot.objects.bulk_create(rows)
+        return count
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.23 on 2026-10-19 09:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0003_blockedtimeslot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SmsNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('confirmation', 'Appointment Confirmation'), ('other', 'Other')], default='other', max_length=20)),
+                ('phone', models.CharField(max_length=20)),
+                ('message', models.TextField()),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('sending', 'Sending'), ('sent', 'Sent'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('send_after', models.DateTimeField(default=django.utils.timezone.now)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('appointment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sms_notifications', to='dashboard.appointment')),
+            ],
+            options={
+                'ordering': ['send_after'],
+                'indexes': [models.Index(fields=['status', 'send_after'], name='dashboard_s_status_d41e6f_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.23 on 2026-10-19 09:04
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def cancel_duplicate_active_appointments(apps, schema_editor):
+    """
+    Keep the earliest active appointment per (doctor, date, time) and cancel
+    the rest, so the partial unique index can be built on databases where
+    duplicates slipped in.
+    """
+    Appointment = apps.get_model('dashboard', 'Appointment')
+    active = Appointment.objects.exclude(status='cancelled')
+    duplicates = (
+        active.values('doctor_id', 'date', 'time')
+        .annotate(count=Count('id'), keep_id=Min('id'))
+        .filter(count__gt=1)
+        .order_by()
+    )
+    for slot in duplicates.iterator():
+        active.filter(
+            doctor_id=slot['doctor_id'], date=slot['date'], time=slot['time'],
+        ).exclude(id=slot['keep_id']).update(status='cancelled')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0004_smsnotification'),
+    ]
+
+    operations = [
+        migrations.RunPython(cancel_duplicate_active_appointments, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='appointment',
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name='appointment',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'cancelled'), _negated=True), fields=('doctor', 'date', 'time'), name='unique_active_appointment_slot'),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 4.2.23 on 2026-10-19 09:07
+
+from django.db import migrations, models
+
+
+def queue_existing_images(apps, schema_editor):
+    """Queue derivative generation for images uploaded before the worker existed"""
+    ImageJob = apps.get_model('dashboard', 'ImageJob')
+    sources = [
+        (apps.get_model('dashboard', 'Hospital'), 'dashboard.hospital', 'image'),
+        (apps.get_model('dashboard', 'Doctor'), 'dashboard.doctor', 'image'),
+        (apps.get_model('accounts', 'CustomUser'), 'accounts.customuser', 'profile_picture'),
+    ]
+    for model, label, field_name in sources:
+        with_image = model.objects.exclude(**{f'{field_name}__isnull': True}).exclude(**{field_name: ''})
+        jobs = [
+            ImageJob(model_label=label, object_id=pk, field_name=field_name, image_name=name)
+            for pk, name in with_image.values_list('pk', field_name).iterator()
+        ]
+        ImageJob.objects.bulk_create(jobs, batch_size=500)
+        with_image.update(**{f'{field_name}_status': 'pending'})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_customuser_profile_picture_status'),
+        ('dashboard', '0005_appointment_active_slot_constraint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='doctor',
+            name='image_derivatives',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='doctor',
+            name='image_status',
+            field=models.CharField(blank=True, choices=[('', 'No Image'), ('pending', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], default='', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='hospital',
+            name='image_derivatives',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='hospital',
+            name='image_status',
+            field=models.CharField(blank=True, choices=[('', 'No Image'), ('pending', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], default='', max_length=10),
+        ),
+        migrations.CreateModel(
+            name='ImageJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_label', models.CharField(help_text='e.g. dashboard.hospital', max_length=100)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('field_name', models.CharField(max_length=50)),
+                ('image_name', models.CharField(help_text='Upload being processed; later uploads get their own job', max_length=255)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('processing', 'Processing'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='dashboard_i_status_3160a4_idx')],
+            },
+        ),
+        migrations.RunPython(queue_existing_images, migrations.RunPython.noop),
+    ]
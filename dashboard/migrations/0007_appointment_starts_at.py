@@ -0,0 +1,71 @@
+# Generated by Django 4.2.23 on 2026-10-19 09:14
+
+from datetime import date as date_cls, datetime
+
+from django.db import migrations, models
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+BATCH_SIZE = 5000
+# Frozen copy of dashboard.models.APPOINTMENT_TIME_FORMATS at the time of this migration
+TIME_FORMATS = ['%H:%M', '%H:%M:%S', '%I:%M %p']
+
+
+def appointment_start(date, time):
+    """Aware datetime of an appointment's date and time string, or None if unparseable"""
+    if isinstance(date, str):
+        date = parse_date(date)
+    if not isinstance(date, date_cls) or not time:
+        return None
+    for fmt in TIME_FORMATS:
+        try:
+            return timezone.make_aware(datetime.combine(date, datetime.strptime(time.strip(), fmt).time()))
+        except ValueError:
+            continue
+    return None
+
+
+def fill_starts_at(apps, schema_editor):
+    """Compute starts_at for existing appointments, in primary key batches"""
+    Appointment = apps.get_model('dashboard', 'Appointment')
+    last_id = 0
+    while True:
+        batch = list(
+            Appointment.objects.filter(id__gt=last_id).order_by('id').only('id', 'date', 'time')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        for appointment in batch:
+            appointment.starts_at = appointment_start(appointment.date, appointment.time)
+        Appointment.objects.bulk_update(batch, ['starts_at'])
+        last_id = batch[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0006_image_processing'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='starts_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(fill_starts_at, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='smsnotification',
+            name='dedupe_key',
+            field=models.CharField(blank=True, editable=False, max_length=100, null=True, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='smsnotification',
+            name='kind',
+            field=models.CharField(choices=[('confirmation', 'Appointment Confirmation'), ('reminder', 'Appointment Reminder'), ('other', 'Other')], default='other', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['starts_at'], name='appointment_starts_at_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.23 on 2026-10-19 09:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0007_appointment_starts_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='smsnotification',
+            name='kind',
+            field=models.CharField(choices=[('confirmation', 'Appointment Confirmation'), ('reminder', 'Appointment Reminder'), ('waitlist_offer', 'Waitlist Offer'), ('other', 'Other')], default='other', max_length=20),
+        ),
+        migrations.CreateModel(
+            name='WaitlistEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('full_name', models.CharField(max_length=200)),
+                ('email', models.EmailField(max_length=254)),
+                ('phone', models.CharField(max_length=20)),
+                ('date', models.DateField()),
+                ('reason', models.TextField(blank=True)),
+                ('status', models.CharField(choices=[('waiting', 'Waiting'), ('offered', 'Slot Offered'), ('booked', 'Booked'), ('expired', 'Offer Expired'), ('withdrawn', 'Withdrawn')], default='waiting', max_length=10)),
+                ('offered_time', models.CharField(blank=True, max_length=20)),
+                ('offer_expires_at', models.DateTimeField(blank=True, null=True)),
+                ('offer_token', models.CharField(blank=True, editable=False, max_length=64, null=True, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('appointment', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='waitlist_entry', to='dashboard.appointment')),
+                ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to='dashboard.doctor')),
+                ('hospital', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to='dashboard.hospital')),
+                ('service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to='dashboard.service')),
+            ],
+            options={
+                'verbose_name_plural': 'Waitlist entries',
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['doctor', 'date', 'status', 'created_at'], name='dashboard_w_doctor__511474_idx'), models.Index(fields=['status', 'offer_expires_at'], name='dashboard_w_status_83e51b_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.23 on 2026-10-19 09:18
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('dashboard', '0008_waitlistentry'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='smsnotification',
+            name='kind',
+            field=models.CharField(choices=[('confirmation', 'Appointment Confirmation'), ('reminder', 'Appointment Reminder'), ('waitlist_offer', 'Waitlist Offer'), ('status_change', 'Appointment Status Change'), ('other', 'Other')], default='other', max_length=20),
+        ),
+        migrations.CreateModel(
+            name='AppointmentEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_status', models.PositiveSmallIntegerField(blank=True, choices=[(1, 'Pending'), (2, 'Confirmed'), (3, 'Cancelled'), (4, 'Completed')], null=True)),
+                ('to_status', models.PositiveSmallIntegerField(choices=[(1, 'Pending'), (2, 'Confirmed'), (3, 'Cancelled'), (4, 'Completed')])),
+                ('timestamp', models.DateTimeField(default=django.utils.timezone.now)),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('appointment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='dashboard.appointment')),
+                ('hospital', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='dashboard.hospital')),
+            ],
+            options={
+                'ordering': ['timestamp'],
+                'indexes': [models.Index(fields=['appointment', 'timestamp'], name='dashboard_a_appoint_3c4bea_idx'), models.Index(fields=['hospital', 'timestamp'], name='dashboard_a_hospita_b095f3_idx')],
+            },
+        ),
+    ]
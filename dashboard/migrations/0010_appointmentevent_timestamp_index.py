@@ -0,0 +1,17 @@
+# Generated by Django 4.2.23 on 2026-10-19 09:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0009_appointmentevent'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointmentevent',
+            index=models.Index(fields=['timestamp'], name='dashboard_a_timesta_010dff_idx'),
+        ),
+    ]
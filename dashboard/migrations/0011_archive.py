@@ -0,0 +1,103 @@
+# Generated by Django 4.2.23 on 2026-10-19 09:20
+
+import django.core.serializers.json
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0010_appointmentevent_timestamp_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedAppointment',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('hospital_id', models.BigIntegerField()),
+                ('doctor_id', models.BigIntegerField()),
+                ('email', models.EmailField(max_length=254)),
+                ('date', models.DateField()),
+                ('time', models.CharField(max_length=20)),
+                ('status', models.CharField(max_length=20)),
+                ('data', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedManagementLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('doctor', 'Doctor'), ('hospital', 'Hospital')], max_length=10)),
+                ('original_id', models.BigIntegerField()),
+                ('object_id', models.BigIntegerField()),
+                ('manager_id', models.BigIntegerField(blank=True, null=True)),
+                ('action', models.CharField(max_length=50)),
+                ('timestamp', models.DateTimeField()),
+                ('notes', models.TextField(blank=True)),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['-timestamp'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='appointmentevent',
+            name='appointment',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='events', to='dashboard.appointment'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['created_at'], name='dashboard_a_created_850eea_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['hospital', 'created_at'], name='dashboard_a_hospita_4e2c3c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['email', 'created_at'], name='dashboard_a_email_72105c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['user', 'booking_date'], name='dashboard_b_user_id_73df60_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='doctormanagement',
+            index=models.Index(fields=['timestamp'], name='dashboard_d_timesta_40a5cf_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='doctormanagement',
+            index=models.Index(fields=['doctor', 'timestamp'], name='dashboard_d_doctor__719dca_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hospitalmanagement',
+            index=models.Index(fields=['timestamp'], name='dashboard_h_timesta_313baa_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hospitalmanagement',
+            index=models.Index(fields=['hospital', 'timestamp'], name='dashboard_h_hospita_07331e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedmanagementlog',
+            index=models.Index(fields=['kind', 'object_id', 'timestamp'], name='dashboard_a_kind_79259f_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='archivedmanagementlog',
+            constraint=models.UniqueConstraint(fields=('kind', 'original_id'), name='unique_archived_management_log'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedappointment',
+            index=models.Index(fields=['hospital_id', 'date'], name='dashboard_a_hospita_6cf4f1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedappointment',
+            index=models.Index(fields=['email', 'date'], name='dashboard_a_email_ea4911_idx'),
+        ),
+    ]
@@ -0,0 +1,97 @@
+# Generated by Django 4.2.23 on 2026-10-19 09:22
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery
+import django.db.models.deletion
+
+
+def snapshot_existing_logs(apps, schema_editor):
+    """Copy the logged doctor/hospital id and name into the snapshot fields"""
+    Doctor = apps.get_model('dashboard', 'Doctor')
+    Hospital = apps.get_model('dashboard', 'Hospital')
+    doctor = Doctor.objects.filter(id=OuterRef('doctor_id'))
+    apps.get_model('dashboard', 'DoctorManagement').objects.update(
+        object_id=F('doctor_id'),
+        object_name=Subquery(doctor.values('name')[:1]),
+        hospital_id=Subquery(doctor.values('hospital_id')[:1]),
+    )
+    apps.get_model('dashboard', 'HospitalManagement').objects.update(
+        object_id=F('hospital_id'),
+        object_name=Subquery(Hospital.objects.filter(id=OuterRef('hospital_id')).values('name')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0011_archive'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='doctormanagement',
+            name='dashboard_d_doctor__719dca_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='hospitalmanagement',
+            name='dashboard_h_hospita_07331e_idx',
+        ),
+        migrations.AddField(
+            model_name='archivedmanagementlog',
+            name='object_name',
+            field=models.CharField(blank=True, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='doctormanagement',
+            name='hospital',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='dashboard.hospital'),
+        ),
+        migrations.AddField(
+            model_name='doctormanagement',
+            name='object_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='doctormanagement',
+            name='object_name',
+            field=models.CharField(blank=True, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='hospitalmanagement',
+            name='object_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='hospitalmanagement',
+            name='object_name',
+            field=models.CharField(blank=True, max_length=200),
+        ),
+        migrations.RunPython(snapshot_existing_logs, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='archivedmanagementlog',
+            name='object_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='doctormanagement',
+            name='doctor',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='dashboard.doctor'),
+        ),
+        migrations.AlterField(
+            model_name='hospitalmanagement',
+            name='hospital',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='dashboard.hospital'),
+        ),
+        migrations.AddIndex(
+            model_name='doctormanagement',
+            index=models.Index(fields=['object_id', 'timestamp'], name='dashboard_d_object__06d3d9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='doctormanagement',
+            index=models.Index(fields=['hospital', 'timestamp'], name='dashboard_d_hospita_76055f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hospitalmanagement',
+            index=models.Index(fields=['object_id', 'timestamp'], name='dashboard_h_object__be675b_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.23 on 2026-10-19 10:02
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery
+
+
+def fill_hospital_ids(apps, schema_editor):
+    """
+    Hospital logs refer to their hospital; doctor logs get the doctor's
+    current hospital, the closest record left of where it was at the time.
+    """
+    ArchivedManagementLog = apps.get_model('dashboard', 'ArchivedManagementLog')
+    Doctor = apps.get_model('dashboard', 'Doctor')
+    ArchivedManagementLog.objects.filter(kind='hospital').update(hospital_id=F('object_id'))
+    ArchivedManagementLog.objects.filter(kind='doctor').update(
+        hospital_id=Subquery(Doctor.objects.filter(id=OuterRef('object_id')).values('hospital_id')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0012_management_log_snapshots'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedmanagementlog',
+            name='hospital_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='archivedmanagementlog',
+            index=models.Index(fields=['hospital_id', 'timestamp'], name='dashboard_a_hospita_82be3d_idx'),
+        ),
+        migrations.RunPython(fill_hospital_ids, migrations.RunPython.noop),
+    ]
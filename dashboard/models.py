@@ -1,10 +1,131 @@
 # models.py
+from datetime import date as date_cls, datetime
+
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Left
 from django.contrib.auth.models import AbstractUser
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from django.urls import reverse
 
+from accounts.access import HospitalScopedQuerySet
 from accounts.models import CustomUser
+from .images import IMAGE_STATUS_CHOICES
+
+APPOINTMENT_TIME_FORMATS = ['%H:%M', '%H:%M:%S', '%I:%M %p']
+
+# Listings show the start of long text fields; the full text is loaded by
+# detail pages and the dashboard's detail endpoints
+PREVIEW_LENGTH = 300
+
+
+def related_count(queryset, field='hospital'):
+    """Subquery counting ``queryset`` rows pointing at the outer row via ``field``"""
+    counts = queryset.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(count=Count('pk'))
+    return Coalesce(Subquery(counts.values('count')), 0)
+
+
+def appointment_start(date, time):
+    """Aware datetime of an appointment's date and time string, or None if unparseable"""
+    if isinstance(date, str):
+        date = parse_date(date)
+    if not isinstance(date, date_cls) or not time:
+        return None
+    for fmt in APPOINTMENT_TIME_FORMATS:
+        try:
+            return timezone.make_aware(datetime.combine(date, datetime.strptime(time.strip(), fmt).time()))
+        except ValueError:
+            continue
+    return None
+
+
+class HospitalQuerySet(HospitalScopedQuerySet):
+    hospital_lookup = 'id'
+
+    def for_choices(self):
+        """Only what a hospital <select> shows"""
+        return self.only('id', 'name').order_by('name')
+
+    def for_cards(self):
+        """Hospital cards: the description is cut to ``description_preview``"""
+        return self.only(
+            'id', 'name', 'location', 'phone_number', 'image', 'image_status', 'image_derivatives',
+        ).annotate(description_preview=Left('description', PREVIEW_LENGTH))
+
+    def with_counts(self):
+        """Only the name, with doctor, service and appointment counts as columns"""
+        return self.only('id', 'name').annotate(
+            doctor_count=related_count(Doctor.objects.all()),
+            service_count=related_count(Service.objects.all()),
+            appointment_count=related_count(Appointment.objects.all()),
+            confirmed_count=related_count(Appointment.objects.filter(status='confirmed')),
+        )
+
+
+class ServiceQuerySet(HospitalScopedQuerySet):
+    def for_listing(self):
+        return (
+            self.select_related('hospital')
+            .only('id', 'name', 'description', 'duration', 'is_active', 'hospital', 'hospital__name')
+            .order_by('hospital__name', 'name')
+        )
+
+
+class DoctorQuerySet(HospitalScopedQuerySet):
+    def for_listing(self):
+        return (
+            self.select_related('hospital')
+            .only(
+                'id', 'name', 'specialty', 'experience_years', 'image', 'image_status', 'image_derivatives',
+                'hospital', 'hospital__name',
+            )
+            .order_by('name')
+        )
+
+    def for_cards(self):
+        """Doctor cards on the hospital page; bio and availability stay in the database"""
+        return self.only(
+            'id', 'name', 'title', 'specialty', 'experience_years', 'image', 'image_status', 'image_derivatives',
+        )
+
+
+class AppointmentQuerySet(HospitalScopedQuerySet):
+    def for_patient(self, user):
+        # Patients may book without an account; their appointments carry their email
+        return self.filter(models.Q(email=user.email) | models.Q(booking__user=user))
+
+    def for_listing(self):
+        """The reason is cut to ``reason_preview``; the detail endpoint returns all of it"""
+        return (
+            self.select_related('hospital', 'doctor', 'service')
+            .only(
+                'id', 'full_name', 'email', 'phone', 'date', 'time', 'status', 'created_at',
+                'hospital', 'hospital__name', 'doctor', 'doctor__name', 'service', 'service__name',
+            )
+            .annotate(reason_preview=Left('reason', PREVIEW_LENGTH))
+            .order_by('-created_at')
+        )
+
+
+class BlockedTimeSlotQuerySet(HospitalScopedQuerySet):
+    def for_listing(self):
+        return (
+            self.select_related('hospital', 'doctor', 'created_by')
+            .only(
+                'id', 'date', 'start_time', 'end_time', 'block_type', 'reason', 'created_at',
+                'hospital', 'hospital__name', 'doctor', 'doctor__name',
+                'created_by', 'created_by__username', 'created_by__first_name', 'created_by__last_name',
+            )
+            .order_by('-created_at')
+        )
+
+
+class ArchivedAppointmentQuerySet(HospitalScopedQuerySet):
+    def for_patient(self, user):
+        return self.filter(email=user.email)
+
 
 # Custom User Model with role support
 
@@ -23,11 +144,16 @@ class Hospital(models.Model):
     
     # Image for frontend display
     image = models.ImageField(upload_to='hospitals/', blank=True, null=True, help_text="Hospital branding image")
+    # Resized versions, filled in by the process_image_jobs worker
+    image_status = models.CharField(max_length=10, choices=IMAGE_STATUS_CHOICES, blank=True, default='')
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False)
     
     # Optional: gallery of images
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = HospitalQuerySet.as_manager()
+
     def __str__(self):
         return self.name
 
@@ -47,6 +173,8 @@ class Service(models.Model):
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = ServiceQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.name} @ {self.hospital.name}"
 
@@ -75,6 +203,8 @@ class Doctor(models.Model):
     
     # Profile image
     image = models.ImageField(upload_to='doctors/', blank=True, null=True)
+    image_status = models.CharField(max_length=10, choices=IMAGE_STATUS_CHOICES, blank=True, default='')
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False)
     
     # Availability stored as JSON (can be enhanced with proper availability model later)
     availability_data = models.JSONField(default=dict, blank=True, help_text="e.g., {'monday': '9:00-17:00'}")
@@ -83,6 +213,8 @@ class Doctor(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = DoctorQuerySet.as_manager()
+
     def __str__(self):
         return f"Dr. {self.name} - {self.specialty}"
 
@@ -109,18 +241,86 @@ class Appointment(models.Model):
     
     date = models.DateField()
     time = models.CharField(max_length=20)  # Could be improved with TimeField + slot logic
+    # date + time as one indexed column for range queries (reminders); set in save()
+    starts_at = models.DateTimeField(null=True, blank=True, editable=False)
     reason = models.TextField(blank=True)
     
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = AppointmentQuerySet.as_manager()
+
     def __str__(self):
         return f"Appt: {self.full_name} | {self.hospital.name} | {self.date} {self.time}"
 
+    def save(self, *args, **kwargs):
+        self.starts_at = appointment_start(self.date, self.time)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'date', 'time'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'starts_at'}
+        super().save(*args, **kwargs)
+
     class Meta:
         ordering = ['-created_at']
-        unique_together = ('doctor', 'date', 'time')  # Prevent double-booking same slot
+        constraints = [
+            # Prevent double-booking the same slot; cancelled appointments free it.
+            # Backed by a partial index that also serves the slot lookups in
+            # create_appointment and get_booked_times, which filter with
+            # .exclude(status='cancelled') to match its condition.
+            models.UniqueConstraint(
+                fields=['doctor', 'date', 'time'],
+                condition=~models.Q(status='cancelled'),
+                name='unique_active_appointment_slot',
+            ),
+        ]
+        indexes = [
+            # Range scans by start time for the reminder scheduler. Not partial on
+            # status: SQLite only uses a partial index when the query's WHERE
+            # clause contains the index condition term for term, and the
+            # reminder query filters status IN (...) instead.
+            models.Index(fields=['starts_at'], name='appointment_starts_at_idx'),
+            # Newest-first dashboard lists (ordering = -created_at) read these backwards
+            models.Index(fields=['created_at']),
+            models.Index(fields=['hospital', 'created_at']),
+            models.Index(fields=['email', 'created_at']),
+        ]
+
+
+# Appointment status history
+class AppointmentEvent(models.Model):
+    """
+    Append-only log of appointment status changes. Statuses are stored as
+    small integer codes (STATUS_CODES) rather than repeating the text.
+    """
+    STATUS_CODES = {
+        'pending': 1,
+        'confirmed': 2,
+        'cancelled': 3,
+        'completed': 4,
+    }
+    STATUS_CODE_CHOICES = [(code, status.title()) for status, code in STATUS_CODES.items()]
+
+    # No database constraint: the history outlives appointments moved to ArchivedAppointment
+    appointment = models.ForeignKey(Appointment, on_delete=models.DO_NOTHING, db_constraint=False, related_name='events')
+    # Copied from the appointment so per-hospital audits need no join
+    hospital = models.ForeignKey(Hospital, on_delete=models.CASCADE, related_name='+')
+    actor = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    from_status = models.PositiveSmallIntegerField(choices=STATUS_CODE_CHOICES, null=True, blank=True)  # None when booked
+    to_status = models.PositiveSmallIntegerField(choices=STATUS_CODE_CHOICES)
+    timestamp = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Appointment {self.appointment_id}: {self.get_from_status_display()} → {self.get_to_status_display()}"
+
+    class Meta:
+        ordering = ['timestamp']
+        indexes = [
+            models.Index(fields=['appointment', 'timestamp']),
+            models.Index(fields=['hospital', 'timestamp']),
+            # Period scans across all hospitals (statistics rebuilds)
+            models.Index(fields=['timestamp']),
+        ]
 
 
 # Booking Model (Tracks user's booking of an appointment)
@@ -135,41 +335,63 @@ class Booking(models.Model):
 
     class Meta:
         ordering = ['-booking_date']
+        indexes = [
+            models.Index(fields=['user', 'booking_date']),
+        ]
 
 
 # Audit Logs
-class DoctorManagement(models.Model):
+class ManagementLog(models.Model):
+    """
+    Base of the doctor and hospital audit logs, written through
+    dashboard.audit.log_action. ``object_id`` and ``object_name`` snapshot the
+    entity when the entry is made, so its history outlives it: deleting a
+    doctor or hospital only clears the foreign key.
+    """
     ACTION_CHOICES = [
         ('added', 'Added'),
         ('updated', 'Updated'),
         ('removed', 'Removed'),
         ('deactivated', 'Deactivated'),
     ]
-    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE)
     manager = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True)
     action = models.CharField(max_length=50, choices=ACTION_CHOICES)
     timestamp = models.DateTimeField(default=timezone.now)
     notes = models.TextField(blank=True)
+    object_id = models.BigIntegerField(null=True, blank=True)
+    object_name = models.CharField(max_length=200, blank=True)
+
+    class Meta:
+        abstract = True
+
+
+class DoctorManagement(ManagementLog):
+    doctor = models.ForeignKey(Doctor, on_delete=models.SET_NULL, null=True, blank=True)
+    # The doctor's hospital at the time, for per-hospital audit queries
+    hospital = models.ForeignKey(Hospital, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
 
     def __str__(self):
-        return f"{self.action.title()}: {self.doctor} by {self.manager}"
+        return f"{self.action.title()}: {self.object_name} by {self.manager}"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['timestamp']),
+            models.Index(fields=['object_id', 'timestamp']),
+            models.Index(fields=['hospital', 'timestamp']),
+        ]
 
-class HospitalManagement(models.Model):
-    ACTION_CHOICES = [
-        ('added', 'Added'),
-        ('updated', 'Updated'),
-        ('removed', 'Removed'),
-        ('deactivated', 'Deactivated'),
-    ]
-    hospital = models.ForeignKey(Hospital, on_delete=models.CASCADE)
-    manager = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True)
-    action = models.CharField(max_length=50, choices=ACTION_CHOICES)
-    timestamp = models.DateTimeField(default=timezone.now)
-    notes = models.TextField(blank=True)
+
+class HospitalManagement(ManagementLog):
+    hospital = models.ForeignKey(Hospital, on_delete=models.SET_NULL, null=True, blank=True)
 
     def __str__(self):
-        return f"{self.action.title()} hospital: {self.hospital}"
+        return f"{self.action.title()} hospital: {self.object_name}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['timestamp']),
+            models.Index(fields=['object_id', 'timestamp']),
+        ]
 
 
 # Blocked Time Slots Model
@@ -199,6 +421,8 @@ class BlockedTimeSlot(models.Model):
     
     # Active status
     is_active = models.BooleanField(default=True)
+
+    objects = BlockedTimeSlotQuerySet.as_manager()
     
     def __str__(self):
         doctor_info = f" - {self.doctor.name}" if self.doctor else " - All Doctors"
@@ -229,4 +453,188 @@ class BlockedTimeSlot(models.Model):
         indexes = [
             models.Index(fields=['hospital', 'date', 'is_active']),
             models.Index(fields=['doctor', 'date', 'is_active']),
-        ]
\ No newline at end of file
+        ]
+
+
+# Waitlist for fully booked days
+class WaitlistEntry(models.Model):
+    """
+    Patient waiting for a slot with a doctor on a given day. When an appointment
+    is cancelled the freed slot is offered to the first waiting entry and held
+    for it until offer_expires_at (see appointment.waitlist).
+    """
+    STATUS_CHOICES = [
+        ('waiting', 'Waiting'),
+        ('offered', 'Slot Offered'),
+        ('booked', 'Booked'),
+        ('expired', 'Offer Expired'),
+        ('withdrawn', 'Withdrawn'),
+    ]
+
+    full_name = models.CharField(max_length=200)
+    email = models.EmailField()
+    phone = models.CharField(max_length=20)
+
+    hospital = models.ForeignKey(Hospital, on_delete=models.CASCADE, related_name='waitlist_entries')
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='waitlist_entries')
+    service = models.ForeignKey(Service, on_delete=models.CASCADE, related_name='waitlist_entries')
+    date = models.DateField()
+    reason = models.TextField(blank=True)
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='waiting')
+    # The slot currently held for this patient
+    offered_time = models.CharField(max_length=20, blank=True)
+    offer_expires_at = models.DateTimeField(null=True, blank=True)
+    offer_token = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False)
+    appointment = models.OneToOneField(Appointment, on_delete=models.SET_NULL, null=True, blank=True, related_name='waitlist_entry')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Waitlist: {self.full_name} | {self.doctor.name} on {self.date} ({self.get_status_display()})"
+
+    class Meta:
+        ordering = ['created_at']
+        verbose_name_plural = 'Waitlist entries'
+        indexes = [
+            # Next waiting patient / current holds for a doctor's day
+            models.Index(fields=['doctor', 'date', 'status', 'created_at']),
+            # Offers whose hold has run out
+            models.Index(fields=['status', 'offer_expires_at']),
+        ]
+
+# Archive (see dashboard.archive)
+class ArchivedAppointment(models.Model):
+    """
+    Completed or cancelled appointment moved out of Appointment by the
+    archive_records command. Keeps the original id; the full row and its
+    booking are stored in ``data``.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    # Plain ids rather than foreign keys: archived rows outlive hospitals and patients
+    hospital_id = models.BigIntegerField()
+    doctor_id = models.BigIntegerField()
+    email = models.EmailField()
+    date = models.DateField()
+    time = models.CharField(max_length=20)
+    status = models.CharField(max_length=20)
+    data = models.JSONField(encoder=DjangoJSONEncoder)
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    objects = ArchivedAppointmentQuerySet.as_manager()
+
+    def __str__(self):
+        return f"Archived appt {self.id}: {self.email} | {self.date} {self.time} ({self.status})"
+
+    class Meta:
+        ordering = ['-date']
+        indexes = [
+            models.Index(fields=['hospital_id', 'date']),
+            models.Index(fields=['email', 'date']),
+        ]
+
+
+class ArchivedManagementLog(models.Model):
+    """DoctorManagement / HospitalManagement row moved out by archive_records"""
+    KIND_CHOICES = [
+        ('doctor', 'Doctor'),
+        ('hospital', 'Hospital'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    original_id = models.BigIntegerField()
+    object_id = models.BigIntegerField(null=True, blank=True)
+    object_name = models.CharField(max_length=200, blank=True)
+    manager_id = models.BigIntegerField(null=True, blank=True)
+    # The logged hospital, or the doctor's hospital at the time
+    hospital_id = models.BigIntegerField(null=True, blank=True)
+    action = models.CharField(max_length=50)
+    timestamp = models.DateTimeField()
+    notes = models.TextField(blank=True)
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Archived {self.kind} log {self.original_id}: {self.action}"
+
+    class Meta:
+        ordering = ['-timestamp']
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'original_id'], name='unique_archived_management_log'),
+        ]
+        indexes = [
+            models.Index(fields=['kind', 'object_id', 'timestamp']),
+            models.Index(fields=['hospital_id', 'timestamp']),
+        ]
+
+
+# Outgoing SMS queue
+class SmsNotification(models.Model):
+    """SMS waiting to be sent (or already sent) through the SMS gateway"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+    KIND_CHOICES = [
+        ('confirmation', 'Appointment Confirmation'),
+        ('reminder', 'Appointment Reminder'),
+        ('waitlist_offer', 'Waitlist Offer'),
+        ('status_change', 'Appointment Status Change'),
+        ('other', 'Other'),
+    ]
+
+    appointment = models.ForeignKey(Appointment, on_delete=models.SET_NULL, null=True, blank=True, related_name='sms_notifications')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, default='other')
+    phone = models.CharField(max_length=20)
+    message = models.TextField()
+    # Unique per logical message (e.g. 'reminder:24h:<appointment id>') so it is queued only once
+    dedupe_key = models.CharField(max_length=100, unique=True, null=True, blank=True, editable=False)
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    send_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"SMS to {self.phone} ({self.get_status_display()})"
+
+    class Meta:
+        ordering = ['send_after']
+        indexes = [
+            models.Index(fields=['status', 'send_after']),
+        ]
+
+
+# Background image processing queue
+class ImageJob(models.Model):
+    """Resize/strip job for one uploaded image, run by process_image_jobs"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('processing', 'Processing'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    model_label = models.CharField(max_length=100, help_text="e.g. dashboard.hospital")
+    object_id = models.PositiveBigIntegerField()
+    field_name = models.CharField(max_length=50)
+    image_name = models.CharField(max_length=255, help_text="Upload being processed; later uploads get their own job")
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.model_label} #{self.object_id} {self.field_name} ({self.get_status_display()})"
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
@@ -0,0 +1,51 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from accounts.backends import forget_hospital_users, forget_users
+from accounts.models import CustomUser
+from appointment.availability import slots_changed
+from .fragment_cache import APPOINTMENTS, BLOCKED_SLOTS, DIRECTORY, bump_version
+from .image_jobs import sync_image_state
+from .models import Appointment, BlockedTimeSlot, Hospital, Doctor, Service
+
+
+# Queue new uploads for the process_image_jobs worker instead of resizing
+# them in the request
+@receiver(post_save, sender=Hospital)
+@receiver(post_save, sender=Doctor)
+@receiver(post_save, sender=CustomUser)
+def queue_image_processing(sender, instance, **kwargs):
+    sync_image_state(instance)
+
+
+# Invalidate the cached template fragments that show the changed rows
+@receiver([post_save, post_delete], sender=Hospital)
+@receiver([post_save, post_delete], sender=Doctor)
+@receiver([post_save, post_delete], sender=Service)
+def directory_changed(sender, instance, **kwargs):
+    bump_version(DIRECTORY, hospital_ids=[instance.pk if sender is Hospital else instance.hospital_id])
+
+
+@receiver([post_save, post_delete], sender=Appointment)
+def appointments_changed(sender, instance, **kwargs):
+    bump_version(APPOINTMENTS, hospital_ids=[instance.hospital_id])
+    slots_changed(instance.date, doctor_id=instance.doctor_id)
+
+
+@receiver([post_save, post_delete], sender=BlockedTimeSlot)
+def blocked_slots_changed(sender, instance, **kwargs):
+    bump_version(BLOCKED_SLOTS, hospital_ids=[instance.hospital_id])
+    # Blocks without a doctor apply to the whole hospital
+    slots_changed(instance.date, doctor_id=instance.doctor_id, hospital_id=instance.hospital_id)
+
+
+# Drop cached request users (accounts.backends) showing the changed rows
+@receiver([post_save, post_delete], sender=CustomUser)
+def user_changed(sender, instance, **kwargs):
+    forget_users([instance.pk])
+
+
+# pre_delete: by post_delete the hospital's users have been unassigned
+@receiver([post_save, pre_delete], sender=Hospital)
+def hospital_changed(sender, instance, **kwargs):
+    forget_hospital_users(instance.pk)
@@ -0,0 +1,39 @@
+from django import template
+from django.utils.html import format_html
+
+from dashboard import images
+
+register = template.Library()
+
+
+@register.simple_tag
+def image_url(image, size='card', fmt='jpeg'):
+    """{% image_url hospital.image 'thumbnail' %}"""
+    return images.derivative_url(image, size, fmt)
+
+
+@register.simple_tag
+def image_srcset(image, fmt='webp'):
+    """{% image_srcset hospital.image %} -> "url 160w, url 480w, url 1280w" """
+    return images.srcset(image, fmt)
+
+
+@register.simple_tag
+def responsive_image(image, size='card', alt='', sizes='100vw', css_class='', loading='lazy'):
+    """
+    <picture> with WebP and JPEG srcsets; ``size`` picks the fallback src.
+    {% responsive_image hospital.image 'card' alt=hospital.name sizes='(min-width: 768px) 33vw, 100vw' %}
+    """
+    if not image:
+        return ''
+    if not images.get_derivatives(image):
+        return format_html('<img src="{}" alt="{}" class="{}" loading="{}">', image.url, alt, css_class, loading)
+    return format_html(
+        '<picture>'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}" class="{}" loading="{}">'
+        '</picture>',
+        images.srcset(image, 'webp'), sizes,
+        images.derivative_url(image, size, 'jpeg'), images.srcset(image, 'jpeg'), sizes,
+        alt, css_class, loading,
+    )
@@ -1,3 +1,531 @@
-from django.test import TestCase
+import io
+import json
+import tempfile
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+from PIL import Image
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.management import call_command
+from django.db import connection
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from accounts.access import hospital_limit
+from accounts.models import CustomUser
+from .archive import archive_management_logs
+from .audit import build_entry, log_action, write_entries
+from .csv_import import import_csv
+from .image_jobs import process_job_image, record_image_result
+from .images import derivative_url, process_image, srcset
+from .fragment_cache import APPOINTMENTS, DIRECTORY, data_version, fragment_scope
+from .models import (
+    Appointment, AppointmentEvent, ArchivedAppointment, ArchivedManagementLog, BlockedTimeSlot, Booking, Doctor,
+    DoctorManagement, Hospital, HospitalManagement, ImageJob, Service, SmsNotification,
+)
+from .transitions import bulk_transition
+
+
+class DashboardFixtureMixin:
+    @classmethod
+    def setUpTestData(cls):
+        cls.hospital = Hospital.objects.create(name='General', address='1 Main Street')
+        cls.other_hospital = Hospital.objects.create(name='Ridge', address='2 Ridge Road')
+        cls.doctor = Doctor.objects.create(name='Ama Mensah', specialty='Pediatrics', hospital=cls.hospital)
+        cls.other_doctor = Doctor.objects.create(name='Yaw Osei', specialty='Cardiology', hospital=cls.other_hospital)
+        cls.service = Service.objects.create(name='Consultation', hospital=cls.hospital)
+        cls.other_service = Service.objects.create(name='Consultation', hospital=cls.other_hospital)
+        cls.admin = CustomUser.objects.create_user('admin', 'admin@example.com', 'pass', role='admin')
+        cls.staff = CustomUser.objects.create_user('staff', 'staff@example.com', 'pass', role='staff', hospital=cls.hospital)
+        cls.hospital_admin = CustomUser.objects.create_user(
+            'manager', 'manager@example.com', 'pass', role='hospital_admin', hospital=cls.hospital,
+        )
+        cls.other_staff = CustomUser.objects.create_user(
+            'other', 'other@example.com', 'pass', role='staff', hospital=cls.other_hospital,
+        )
+        cls.patient = CustomUser.objects.create_user('patient', 'kofi@example.com', 'pass', role='patient')
+        cls.day = date.today() + timedelta(days=7)
+        cls.appointment = cls.book(cls.hospital, cls.doctor, cls.service, '09:00', email='kofi@example.com')
+        cls.other_appointment = cls.book(cls.other_hospital, cls.other_doctor, cls.other_service, '09:00')
+
+    @classmethod
+    def book(cls, hospital, doctor, service, time, **values):
+        return Appointment.objects.create(**{
+            'full_name': 'Kofi Owusu', 'email': 'someone@example.com', 'phone': '0241234567',
+            'hospital': hospital, 'doctor': doctor, 'service': service, 'date': cls.day, 'time': time,
+            **values,
+        })
+
+    def setUp(self):
+        cache.clear()
+
+
+@override_settings(FRAGMENT_CACHE_TIMEOUT=600)
+class FragmentCacheTests(DashboardFixtureMixin, TestCase):
+    def test_cached_dashboard_runs_no_counts(self):
+        self.client.force_login(self.staff)
+        self.client.get('/dashboard/')
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get('/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([query['sql'] for query in captured if 'COUNT(' in query['sql']], [])
+
+    def test_booking_elsewhere_keeps_hospital_versions(self):
+        own, other = data_version(APPOINTMENTS, self.hospital.id), data_version(APPOINTMENTS, self.other_hospital.id)
+        system_wide = data_version(APPOINTMENTS)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book(self.other_hospital, self.other_doctor, self.other_service, '09:30')
+        self.assertEqual(data_version(APPOINTMENTS, self.hospital.id), own)
+        self.assertNotEqual(data_version(APPOINTMENTS, self.other_hospital.id), other)
+        self.assertNotEqual(data_version(APPOINTMENTS), system_wide)
+
+    def test_directory_change_only_invalidates_its_hospital_page(self):
+        own, other = data_version(DIRECTORY, self.hospital.id), data_version(DIRECTORY, self.other_hospital.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            Doctor.objects.create(name='Akua Boateng', specialty='Dentistry', hospital=self.other_hospital)
+        self.assertEqual(data_version(DIRECTORY, self.hospital.id), own)
+        self.assertNotEqual(data_version(DIRECTORY, self.other_hospital.id), other)
+
+
+class ListQueryCountTests(DashboardFixtureMixin, TestCase):
+    """List pages run the same queries however many rows they show"""
+
+    def add_rows(self):
+        hospital = Hospital.objects.create(name='Korle Bu', address='3 Guggisberg Avenue')
+        service = Service.objects.create(name='Consultation', hospital=hospital)
+        CustomUser.objects.create_user('korlebu', 'korlebu@example.com', 'pass', role='hospital_admin', hospital=hospital)
+        for number in range(3):
+            doctor = Doctor.objects.create(name=f'Doctor {number}', specialty='Cardiology', hospital=hospital)
+            appointment = self.book(hospital, doctor, service, '10:00', email=f'patient{number}@example.com')
+            Booking.objects.create(user=self.patient, appointment=appointment, status='confirmed')
+        # More doctors and appointments on the fixture hospital's page too
+        doctor = Doctor.objects.create(name='Kwesi Addo', specialty='Dermatology', hospital=self.hospital)
+        self.book(self.hospital, doctor, self.service, '11:00')
+
+    def assertQueriesDoNotGrow(self, user, url):
+        self.client.force_login(user)
+        with CaptureQueriesContext(connection) as before:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.add_rows()
+        with self.assertNumQueries(len(before)):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_appointments(self):
+        self.assertQueriesDoNotGrow(self.admin, '/dashboard/appointments/')
+
+    def test_bookings(self):
+        self.assertQueriesDoNotGrow(self.admin, '/dashboard/bookings/')
+
+    def test_doctors(self):
+        self.assertQueriesDoNotGrow(self.admin, '/dashboard/doctors/')
+
+    def test_hospitals(self):
+        response = self.assertQueriesDoNotGrow(self.admin, '/dashboard/hospitals/')
+        self.assertContains(response, 'korlebu')
+        self.assertContains(response, 'manager')
+
+    def test_public_hospitals(self):
+        self.assertQueriesDoNotGrow(self.patient, '/hospitals/')
+
+    def test_public_hospital_doctors(self):
+        self.assertQueriesDoNotGrow(self.patient, f'/hospital/{self.hospital.id}/')
+
+
+class RoleScopeTests(DashboardFixtureMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.unassigned_staff = CustomUser.objects.create_user('new', 'new@example.com', 'pass', role='staff')
+        for appointment in [cls.appointment, cls.other_appointment]:
+            ArchivedAppointment.objects.create(
+                id=appointment.id, hospital_id=appointment.hospital_id, doctor_id=appointment.doctor_id,
+                email=appointment.email, date=appointment.date, time=appointment.time, status='completed', data={},
+            )
+
+    def assertScope(self, queryset, expected):
+        self.assertEqual(set(queryset.values_list('id', flat=True)), {row.id for row in expected})
+
+    def test_admin_sees_and_manages_every_hospital(self):
+        self.assertScope(Appointment.objects.for_user(self.admin), [self.appointment, self.other_appointment])
+        self.assertScope(Appointment.objects.managed_by(self.admin), [self.appointment, self.other_appointment])
+        self.assertScope(ArchivedAppointment.objects.for_user(self.admin), [self.appointment, self.other_appointment])
+        self.assertScope(Hospital.objects.for_user(self.admin), [self.hospital, self.other_hospital])
+        self.assertIsNone(hospital_limit(self.admin))
+        self.assertEqual(fragment_scope(self.admin), 'admin')
+
+    def test_hospital_roles_see_and_manage_their_hospital(self):
+        for user in [self.hospital_admin, self.staff]:
+            with self.subTest(role=user.role):
+                self.assertScope(Appointment.objects.for_user(user), [self.appointment])
+                self.assertScope(Appointment.objects.managed_by(user), [self.appointment])
+                self.assertScope(ArchivedAppointment.objects.for_user(user), [self.appointment])
+                self.assertScope(Doctor.objects.for_user(user), [self.doctor])
+                self.assertEqual(hospital_limit(user), self.hospital.id)
+                self.assertEqual(fragment_scope(user), f'{user.role}:{self.hospital.id}')
+
+    def test_patients_see_their_own_and_manage_nothing(self):
+        for user in [self.patient, self.unassigned_staff]:
+            with self.subTest(user=user.username):
+                expected = [self.appointment] if user == self.patient else []
+                self.assertScope(Appointment.objects.for_user(user), expected)
+                self.assertScope(ArchivedAppointment.objects.for_user(user), expected)
+                self.assertScope(Appointment.objects.managed_by(user), [])
+                self.assertScope(Doctor.objects.for_user(user), [])
+                self.assertIsNone(hospital_limit(user))
+                self.assertEqual(fragment_scope(user), f'patient:{user.id}')
+
+    def test_users_page_scope(self):
+        self.assertScope(
+            CustomUser.objects.manageable_by(self.admin),
+            [self.staff, self.hospital_admin, self.other_staff, self.patient, self.unassigned_staff],
+        )
+        self.assertScope(
+            CustomUser.objects.manageable_by(self.hospital_admin), [self.staff, self.patient, self.unassigned_staff],
+        )
+        for user in [self.staff, self.patient]:
+            self.assertScope(CustomUser.objects.manageable_by(user), [])
+
+    def test_appointment_detail_follows_the_scope(self):
+        cases = [
+            (self.admin, self.other_appointment, 200),
+            (self.staff, self.appointment, 200),
+            (self.staff, self.other_appointment, 404),
+            (self.patient, self.appointment, 200),
+            (self.patient, self.other_appointment, 404),
+        ]
+        for user, appointment, status in cases:
+            with self.subTest(user=user.username, appointment=appointment.id):
+                self.client.force_login(user)
+                response = self.client.get(f'/dashboard/appointments/{appointment.id}/')
+                self.assertEqual(response.status_code, status)
+
+
+class BulkTransitionTests(DashboardFixtureMixin, TestCase):
+    def post_bulk(self, appointment_ids, status):
+        return self.client.post(
+            '/dashboard/appointments/bulk-status/',
+            json.dumps({'appointment_ids': appointment_ids, 'status': status}),
+            content_type='application/json',
+        )
+
+    def test_only_allowed_changes_in_scope_are_made(self):
+        completed = self.book(self.hospital, self.doctor, self.service, '10:00', status='completed')
+        self.client.force_login(self.staff)
+        response = self.post_bulk([self.appointment.id, self.other_appointment.id, completed.id, 999999], 'confirmed')
+
+        self.assertEqual(response.json()['updated'], [self.appointment.id])
+        self.assertEqual(response.json()['skipped'], sorted([self.other_appointment.id, completed.id, 999999]))
+        self.assertEqual(
+            dict(Appointment.objects.values_list('id', 'status')),
+            {self.appointment.id: 'confirmed', self.other_appointment.id: 'pending', completed.id: 'completed'},
+        )
+        event = AppointmentEvent.objects.get(appointment_id=self.appointment.id, actor=self.staff)
+        self.assertEqual(
+            (event.from_status, event.to_status),
+            (AppointmentEvent.STATUS_CODES['pending'], AppointmentEvent.STATUS_CODES['confirmed']),
+        )
+        self.assertEqual(list(SmsNotification.objects.values_list('appointment_id', flat=True)), [self.appointment.id])
+
+    def test_transition_rules(self):
+        self.appointment.status = 'cancelled'
+        self.appointment.save()
+        self.assertEqual(bulk_transition(self.admin, [self.appointment.id], 'confirmed')['updated'], [])
+        self.assertEqual(bulk_transition(self.admin, [self.other_appointment.id], 'completed')['updated'], [self.other_appointment.id])
+        self.assertEqual(bulk_transition(self.admin, [self.other_appointment.id], 'cancelled')['updated'], [])
+        # Completing sends no SMS
+        self.assertFalse(SmsNotification.objects.exists())
+
+    def test_query_count_does_not_grow_with_the_batch(self):
+        def queries(appointments):
+            with CaptureQueriesContext(connection) as captured:
+                bulk_transition(self.admin, [appointment.id for appointment in appointments], 'confirmed')
+            return len(captured)
+
+        one = queries([self.book(self.hospital, self.doctor, self.service, '10:00')])
+        many = queries([self.book(self.hospital, self.doctor, self.service, f'{hour}:00') for hour in range(11, 16)])
+        self.assertEqual(one, many)
+
+    def test_rejected_requests(self):
+        self.client.force_login(self.patient)
+        self.assertEqual(self.post_bulk([self.appointment.id], 'confirmed').status_code, 403)
+        self.client.force_login(self.staff)
+        self.assertEqual(self.post_bulk([self.appointment.id], 'pending').status_code, 400)
+        self.assertEqual(self.post_bulk(['1; DROP'], 'confirmed').status_code, 400)
+        self.assertEqual(Appointment.objects.get(id=self.appointment.id).status, 'pending')
+
+
+class CsvImportTests(DashboardFixtureMixin, TestCase):
+    def test_hospitals_are_upserted_and_errors_keep_their_line(self):
+        stream = io.StringIO(
+            'name,address,description\n'
+            'General,10 New Road,"Two-line\ndescription"\n'     # lines 2-3
+            ',No Name Street,\n'                                 # line 4
+            'Korle Bu,Guggisberg Avenue,Teaching hospital\n'     # line 5
+        )
+        result = import_csv('hospitals', stream)
+
+        self.assertEqual((result.created, result.updated, result.error_count), (1, 1, 1))
+        self.assertEqual([line for line, _ in result.errors], [4])
+        general = Hospital.objects.get(id=self.hospital.id)
+        self.assertEqual((general.address, general.description), ('10 New Road', 'Two-line\ndescription'))
+        self.assertEqual(Hospital.objects.get(name='Korle Bu').address, 'Guggisberg Avenue')
+
+    def test_doctors_are_matched_on_hospital_and_name_across_batches(self):
+        stream = io.StringIO(
+            'name,specialty,hospital\n'
+            'Ama Mensah,Neonatology,General\n'        # existing doctor: updated
+            'Ama Mensah,Neonatology,Nowhere\n'        # line 3: unknown hospital
+            'Kwame Asante,Surgery,Ridge\n'
+            'Esi Quaye,,General\n'                    # line 5: no specialty
+        )
+        result = import_csv('doctors', stream, batch_size=1)
+
+        self.assertEqual((result.created, result.updated), (1, 1))
+        self.assertEqual([line for line, _ in result.errors], [3, 5])
+        self.assertIn('No hospital named "Nowhere"', result.errors[0][1])
+        self.assertEqual(Doctor.objects.get(id=self.doctor.id).specialty, 'Neonatology')
+        self.assertEqual(Doctor.objects.filter(name='Ama Mensah').count(), 1)
+        self.assertEqual(Doctor.objects.get(name='Kwame Asante').hospital, self.other_hospital)
+
+    def test_services_upsert_leaves_missing_columns_alone(self):
+        Service.objects.filter(id=self.service.id).update(description='Walk-in', duration=45)
+        stream = io.StringIO('name,hospital\nConsultation,General\nVaccination,General\n')
+        result = import_csv('services', stream)
+
+        self.assertEqual((result.created, result.updated, result.error_count), (1, 1, 0))
+        service = Service.objects.get(id=self.service.id)
+        self.assertEqual((service.description, service.duration), ('Walk-in', 45))
+        self.assertTrue(Service.objects.filter(name='Vaccination', hospital=self.hospital).exists())
+
+    def test_dry_run_writes_nothing(self):
+        stream = io.StringIO('name,specialty,hospital\nKwame Asante,Surgery,Ridge\nYaa Asantewaa,Surgery,Nowhere\n')
+        result = import_csv('doctors', stream, dry_run=True)
+        self.assertEqual([line for line, _ in result.errors], [3])
+        self.assertFalse(Doctor.objects.filter(name='Kwame Asante').exists())
+
+
+class ArchiveTests(DashboardFixtureMixin, TestCase):
+    def test_archived_logs_keep_their_hospital(self):
+        old = timezone.now() - timedelta(days=400)
+        DoctorManagement.objects.create(
+            doctor=self.other_doctor, hospital=self.other_hospital, object_id=self.other_doctor.id,
+            object_name=self.other_doctor.name, manager=self.admin, action='added', timestamp=old,
+        )
+        HospitalManagement.objects.create(
+            hospital=self.hospital, object_id=self.hospital.id, object_name=self.hospital.name,
+            manager=self.admin, action='updated', timestamp=old,
+        )
+        self.assertEqual(sum(archive_management_logs(timezone.now() - timedelta(days=365))), 2)
+
+        self.assertFalse(DoctorManagement.objects.exists())
+        self.assertEqual(
+            set(ArchivedManagementLog.objects.values_list('kind', 'hospital_id')),
+            {('doctor', self.other_hospital.id), ('hospital', self.hospital.id)},
+        )
+
+
+class StripExifTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.location = directory.name
+
+    def upload(self, storage, orientation=None):
+        exif = Image.Exif()
+        exif[0x010F] = 'PhoneMaker'
+        if orientation:
+            exif[0x0112] = orientation
+        buffer = io.BytesIO()
+        Image.new('RGB', (32, 16), 'red').save(buffer, 'JPEG', exif=exif)
+        return storage.save('doctors/photo.jpg', ContentFile(buffer.getvalue()))
+
+    def read(self, storage, name):
+        with storage.open(name) as image_file:
+            return image_file.read()
+
+    def assertStripped(self, storage, name):
+        with storage.open(name) as image_file:
+            self.assertFalse(Image.open(image_file).getexif())
+        self.assertEqual(storage.listdir('doctors')[1], ['photo.jpg'])
+
+    def test_original_is_replaced(self):
+        storage = FileSystemStorage(location=self.location)
+        name = self.upload(storage)
+        self.assertEqual(process_image(storage, name)['source'], name)
+        self.assertStripped(storage, name)
+
+    def test_jpeg_is_not_reencoded(self):
+        storage = FileSystemStorage(location=self.location)
+        name = self.upload(storage)
+        before = self.read(storage, name)
+        process_image(storage, name)
+        after = self.read(storage, name)
+        # Everything from the start of scan on is the compressed image
+        self.assertEqual(after[after.index(b'\xff\xda'):], before[before.index(b'\xff\xda'):])
+        self.assertLess(len(after), len(before))
+
+    def test_orientation_is_kept(self):
+        storage = FileSystemStorage(location=self.location)
+        name = self.upload(storage, orientation=6)
+        derivatives = process_image(storage, name)
+        with storage.open(name) as image_file:
+            self.assertEqual(dict(Image.open(image_file).getexif()), {0x0112: 6})
+        # Derivatives are rotated instead
+        self.assertEqual(derivatives['sizes']['card']['width'], 16)
+
+    def test_renamed_original_is_saved_to_the_field(self):
+        storage = FileSystemStorage(location=self.location)
+        name = self.upload(storage)
+        with mock.patch.object(storage, 'get_available_name', side_effect=lambda name, max_length=None: name.replace('photo', 'photo_1')):
+            derivatives = process_image(storage, name)
+        self.assertEqual(derivatives['source'], 'doctors/photo_1.jpg')
+        self.assertEqual(storage.listdir('doctors')[1], ['photo_1.jpg'])
+
+        doctor = Doctor.objects.create(
+            name='Ama Mensah', specialty='Pediatrics', hospital=Hospital.objects.create(name='General', address='1 Main Street'),
+        )
+        Doctor.objects.filter(pk=doctor.pk).update(image=name, image_status='pending')
+        job = ImageJob.objects.create(model_label='dashboard.doctor', object_id=doctor.pk, field_name='image', image_name=name)
+        record_image_result(job, derivatives)
+        doctor.refresh_from_db()
+        self.assertEqual((doctor.image.name, doctor.image_status), ('doctors/photo_1.jpg', 'ready'))
+        self.assertEqual(derivative_url(doctor.image), derivatives['sizes']['card']['jpeg'])
+
+    def test_failed_write_keeps_the_original(self):
+        storage = FileSystemStorage(location=self.location)
+        name = self.upload(storage)
+        with mock.patch.object(storage, 'save', side_effect=OSError('disk full')):
+            with self.assertRaises(OSError):
+                process_image(storage, name)
+        with storage.open(name) as image_file:
+            self.assertTrue(Image.open(image_file).getexif())
+
+
+@override_settings(AUDIT_LOG_ASYNC=False)
+class AuditLogTests(DashboardFixtureMixin, TestCase):
+    def test_deleted_doctor_keeps_its_history(self):
+        earlier = log_action(self.doctor, 'updated', self.admin)
+        self.client.force_login(self.admin)
+        response = self.client.post('/dashboard/doctors/', {'delete_doctor': '1', 'doctor_id': self.doctor.id})
+        self.assertRedirects(response, '/dashboard/doctors/', fetch_redirect_response=False)
+        self.assertFalse(Doctor.objects.filter(id=self.doctor.id).exists())
+
+        entries = DoctorManagement.objects.filter(object_id=self.doctor.id).order_by('id')
+        self.assertEqual(
+            [(entry.action, entry.object_name, entry.doctor_id, entry.hospital_id, entry.manager) for entry in entries],
+            [('updated', 'Ama Mensah', None, self.hospital.id, self.admin), ('removed', 'Ama Mensah', None, self.hospital.id, self.admin)],
+        )
+        self.assertEqual(entries[0].id, earlier.id)
+
+    def test_entries_buffered_before_a_delete_are_still_written(self):
+        entry = build_entry(self.doctor, 'updated', self.admin)
+        Doctor.objects.filter(id=self.doctor.id).delete()
+        write_entries([entry])
+        entry = DoctorManagement.objects.get(object_id=self.doctor.id)
+        self.assertEqual((entry.object_name, entry.doctor_id, entry.hospital_id), ('Ama Mensah', None, self.hospital.id))
+
+
+class ImageDerivativeTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        media = override_settings(MEDIA_ROOT=directory.name)
+        media.enable()
+        self.addCleanup(media.disable)
+
+        hospital = Hospital.objects.create(name='General', address='1 Main Street')
+        self.doctor = Doctor.objects.create(name='Ama Mensah', specialty='Pediatrics', hospital=hospital)
+        buffer = io.BytesIO()
+        Image.new('RGB', (600, 300), 'red').save(buffer, 'JPEG')
+        self.doctor.image.save('photo.jpg', ContentFile(buffer.getvalue()))
+
+    def process(self):
+        job = ImageJob.objects.get(object_id=self.doctor.id, status='queued')
+        record_image_result(job, process_job_image(job.model_label, job.field_name, job.image_name))
+        self.doctor.refresh_from_db()
+
+    def render(self):
+        return Template("{% load image_tags %}{% responsive_image doctor.image 'card' alt=doctor.name %}").render(
+            Context({'doctor': self.doctor}),
+        )
+
+    def test_original_until_processed(self):
+        self.doctor.refresh_from_db()
+        self.assertEqual(self.doctor.image_status, 'pending')
+        self.assertEqual(derivative_url(self.doctor.image), '/media/doctors/photo.jpg')
+        self.assertEqual(srcset(self.doctor.image), '')
+        self.assertHTMLEqual(self.render(), '<img src="/media/doctors/photo.jpg" alt="Ama Mensah" class="" loading="lazy">')
+
+    def test_derivatives_once_processed(self):
+        self.process()
+        card = derivative_url(self.doctor.image, 'card', 'webp')
+        self.assertRegex(card, r'^/media/derivatives/\w{2}/\w{32}/card\.webp$')
+        directory = card.rsplit('/', 1)[0]
+        self.assertEqual(derivative_url(self.doctor.image), f'{directory}/card.jpeg')
+        # The original is narrower than the hero size
+        self.assertEqual(
+            srcset(self.doctor.image, 'jpeg'),
+            f'{directory}/thumbnail.jpeg 160w, {directory}/card.jpeg 480w, {directory}/hero.jpeg 600w',
+        )
+        html = self.render()
+        self.assertIn('<picture><source type="image/webp"', html)
+        self.assertIn(f'src="{directory}/card.jpeg"', html)
+
+    def test_replaced_image_falls_back_until_processed(self):
+        self.process()
+        self.doctor.image.save('new.jpg', ContentFile(self.doctor.image.read()))
+        self.assertEqual(derivative_url(self.doctor.image), '/media/doctors/new.jpg')
+        self.assertNotIn('<picture>', self.render())
+
+
+class AppointmentEventAdminTests(DashboardFixtureMixin, TestCase):
+    def test_history_is_read_only(self):
+        event = AppointmentEvent.objects.create(
+            appointment_id=self.appointment.id, hospital=self.hospital, to_status=AppointmentEvent.STATUS_CODES['pending'],
+        )
+        self.client.force_login(CustomUser.objects.create_superuser('root', 'root@example.com', 'pass'))
+        self.assertEqual(self.client.get('/admin/dashboard/appointmentevent/').status_code, 200)
+        self.assertEqual(self.client.get(f'/admin/dashboard/appointmentevent/{event.id}/delete/').status_code, 403)
+        self.client.post('/admin/dashboard/appointmentevent/', {'action': 'delete_selected', '_selected_action': [event.id], 'post': 'yes'})
+        self.assertTrue(AppointmentEvent.objects.filter(id=event.id).exists())
+
+
+class SeedLoadDataTests(TestCase):
+    def seed(self, seed, *args):
+        call_command(
+            'seed_load_data', '--seed', str(seed), '--hospitals', '2', '--doctors', '4', '--patients', '3',
+            '--appointments', '60', '--blocked-slots', '5', '--start-date', '2026-01-05', *args, stdout=io.StringIO(),
+        )
+        # Natural keys only: ids differ between runs
+        return {
+            'doctors': list(Doctor.objects.order_by('name').values_list('name', 'specialty', 'hospital__name', 'availability_data')),
+            'appointments': list(Appointment.objects.order_by('email').values_list(
+                'email', 'full_name', 'doctor__name', 'service__name', 'date', 'time', 'status', 'reason',
+            )),
+            'bookings': sorted(Booking.objects.values_list('appointment__email', 'user__username')),
+            'blocked_slots': sorted(BlockedTimeSlot.objects.values_list(
+                'hospital__name', 'doctor__name', 'date', 'start_time', 'end_time', 'block_type',
+            ), key=str),
+        }
+
+    def test_same_seed_gives_the_same_rows(self):
+        first = self.seed(7)
+        self.assertEqual(len(first['appointments']), 60)
+        self.assertTrue(first['bookings'])
+        self.assertEqual(self.seed(7, '--flush'), first)
+        self.assertEqual(self.seed(7, '--flush', '--workers', '1', '--batch-size', '7'), first)
+        self.assertNotEqual(self.seed(8, '--flush'), first)
+
+    def test_cached_pages_are_invalidated(self):
+        cache.clear()
+        before = data_version(DIRECTORY), data_version(APPOINTMENTS)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.seed(7)
+        self.assertNotEqual((data_version(DIRECTORY), data_version(APPOINTMENTS)), before)
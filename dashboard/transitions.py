@@ -0,0 +1,106 @@
+"""
+Appointment status transitions made by staff.
+
+change_status updates a single appointment. bulk_transition changes many with
+a fixed number of queries whatever the batch size: one SELECT that applies the
+permission and current-status checks, one UPDATE ... WHERE id IN (...), one
+bulk INSERT of AppointmentEvent rows and one bulk INSERT of SMS notifications.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from appointment.utils import build_appointment_status_sms
+from appointment.availability import slots_changed
+from appointment.waitlist import slot_freed
+from .events import record_event
+from .fragment_cache import APPOINTMENTS, bump_version
+from .models import Appointment, AppointmentEvent, SmsNotification
+
+# target status -> statuses it may be reached from
+STATUS_TRANSITIONS = {
+    'confirmed': ['pending'],
+    'cancelled': ['pending', 'confirmed'],
+    'completed': ['pending', 'confirmed'],
+}
+# Target statuses the patient is told about by SMS
+NOTIFY_STATUSES = ['confirmed', 'cancelled']
+MAX_BULK_SIZE = 500
+
+
+def change_status(appointment, status, actor=None):
+    """
+    Set one appointment's status and log the change in the same transaction.
+    Returns the previous status.
+    """
+    with transaction.atomic():
+        previous = Appointment.objects.select_for_update().values_list('status', flat=True).get(pk=appointment.pk)
+        appointment.status = status
+        appointment.save(update_fields=['status', 'updated_at'])
+        if previous != status:
+            record_event(appointment, status, from_status=previous, actor=actor)
+    return previous
+
+
+def bulk_transition(user, appointment_ids, status):
+    """
+    Move the given appointments to ``status``. Appointments the user may not
+    manage, or whose current status does not allow the change, are skipped.
+
+    Returns:
+        dict: {'updated': [ids], 'skipped': [ids]}
+    """
+    sources = STATUS_TRANSITIONS[status]
+    appointment_ids = {int(appointment_id) for appointment_id in appointment_ids}
+    now = timezone.now()
+
+    with transaction.atomic():
+        appointments = list(
+            Appointment.objects.managed_by(user)
+            .select_for_update(of=('self',))
+            .filter(id__in=appointment_ids, status__in=sources)
+            .select_related('hospital', 'doctor')
+            .only('id', 'full_name', 'phone', 'date', 'time', 'status', 'hospital__name', 'doctor__name')
+            .order_by('id')
+        )
+        updated_ids = [appointment.id for appointment in appointments]
+        Appointment.objects.filter(id__in=updated_ids).update(status=status, updated_at=now)
+        # update() sends no post_save
+        bump_version(APPOINTMENTS, hospital_ids={appointment.hospital_id for appointment in appointments})
+
+        AppointmentEvent.objects.bulk_create([
+            AppointmentEvent(
+                appointment_id=appointment.id,
+                hospital_id=appointment.hospital_id,
+                actor=user,
+                from_status=AppointmentEvent.STATUS_CODES[appointment.status],
+                to_status=AppointmentEvent.STATUS_CODES[status],
+                timestamp=now,
+            )
+            for appointment in appointments
+        ])
+
+        for appointment in appointments:
+            appointment.status = status
+        if status in NOTIFY_STATUSES:
+            notifications = []
+            for appointment in appointments:
+                phone_number, message = build_appointment_status_sms(appointment)
+                notifications.append(SmsNotification(
+                    appointment_id=appointment.id,
+                    kind='status_change',
+                    phone=phone_number,
+                    message=message,
+                    send_after=now,
+                ))
+            # Delivered by the send_notifications worker
+            SmsNotification.objects.bulk_create(notifications)
+
+        if status == 'cancelled':
+            for appointment in appointments:
+                slot_freed(appointment)
+                slots_changed(appointment.date, doctor_id=appointment.doctor_id)
+
+    return {
+        'updated': updated_ids,
+        'skipped': sorted(appointment_ids - set(updated_ids)),
+    }
@@ -10,4 +10,9 @@ urlpatterns = [
     path('users/', views.manage_users, name='manage_users'),
     path('blocked-slots/', views.manage_blocked_slots, name='manage_blocked_slots'),
     path('appointments/', views.view_appointments, name='view_appointments'),
+    path('appointments/<int:appointment_id>/', views.appointment_detail, name='appointment_detail'),
+    path('appointments/bulk-status/', views.bulk_update_appointments, name='bulk_update_appointments'),
+    path('archive/appointments/', views.archived_appointments, name='archived_appointments'),
+    path('archive/appointments/<int:appointment_id>/', views.archived_appointment_detail, name='archived_appointment_detail'),
+    path('audit/', views.audit_log, name='audit_log'),
 ]
\ No newline at end of file
@@ -1,30 +1,38 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db import models
+from django.http import JsonResponse
+from django.views.decorators.http import require_POST
+from django.core.exceptions import ValidationError
+from django.db.models import Prefetch
+import json
+from datetime import datetime
+from accounts.access import ADMIN_ROLE, HOSPITAL_ADMIN_ROLE, HOSPITAL_ROLES, PATIENT_ROLE, STAFF_ROLE
 from accounts.models import CustomUser
-from .models import Booking, DoctorManagement, HospitalManagement, Hospital, Doctor, Appointment, Service, BlockedTimeSlot
+from .models import (
+    ArchivedAppointment, Booking, DoctorManagement, HospitalManagement, Hospital, Doctor, Appointment, Service, BlockedTimeSlot,
+)
 from .forms import HospitalForm, DoctorForm, ServiceForm
+from .audit import AUDIT_PAGE_SIZE, audit_entries, log_action
+from .events import STATUS_NAMES, appointment_history
+from .fragment_cache import APPOINTMENTS, BLOCKED_SLOTS, DIRECTORY, deferred, fragment_cache_context
+from .transitions import MAX_BULK_SIZE, STATUS_TRANSITIONS, bulk_transition, change_status
+from appointment.waitlist import slot_freed
 from django.contrib.auth.forms import UserCreationForm
 
 @login_required
 def dashboard(request):
     """Main dashboard view with comprehensive role-based analytics"""
     user = request.user
+    access = request.access
 
-    # Get user's appointments based on role
-    if user.role == 'admin':
-        # System admin can see all appointments
-        user_appointments = Appointment.objects.all().order_by('-created_at')[:10]
-        appointments_count = Appointment.objects.all().count()
-    elif user.role in ['hospital_admin', 'staff'] and user.hospital:
-        # Hospital staff can see all appointments for their hospital
-        user_appointments = Appointment.objects.filter(hospital=user.hospital).order_by('-created_at')[:10]
-        appointments_count = Appointment.objects.filter(hospital=user.hospital).count()
-    else:
-        # Patients can only see their own appointments
-        user_appointments = Appointment.objects.filter(email=user.email).order_by('-created_at')[:10]
-        appointments_count = Appointment.objects.filter(email=user.email).count()
+    # All appointments for system admins, the hospital's for staff, their own for patients
+    appointments = Appointment.objects.for_user(user)
+    user_appointments = appointments.for_listing()[:10]
+    # Counts are deferred: the template only runs them when its cached fragment misses
+    appointments_count = deferred(appointments.count)
+    confirmed_appointments_count = deferred(appointments.filter(status='confirmed').count)
+    pending_appointments_count = deferred(appointments.filter(status='pending').count)
 
     # Get recent bookings
     recent_bookings = Booking.objects.filter(user=user).order_by('-booking_date')[:5]
@@ -36,50 +44,41 @@ def dashboard(request):
     hospitals_count = 0
     doctors_count = 0
     services_count = 0
-    confirmed_appointments_count = 0
-    pending_appointments_count = 0
 
     # Get data based on user role
-    if user.role == 'admin':
+    if access.is_admin:
         # System Admin - Full system analytics
-        doctor_management = DoctorManagement.objects.all().order_by('-timestamp')[:5]
-        hospital_management = HospitalManagement.objects.all().order_by('-timestamp')[:5]
-        hospitals_with_services = Hospital.objects.prefetch_related('doctors', 'services', 'appointments').all()[:6]
-        hospitals_count = Hospital.objects.count()
-        doctors_count = Doctor.objects.count()
-        services_count = Service.objects.count()
-        confirmed_appointments_count = Appointment.objects.filter(status='confirmed').count()
-        pending_appointments_count = Appointment.objects.filter(status='pending').count()
-
-    elif user.role in ['hospital_admin', 'staff'] and user.hospital:
+        doctor_management = audit_entries(DoctorManagement, limit=5)
+        hospital_management = audit_entries(HospitalManagement, limit=5)
+        hospitals_with_services = Hospital.objects.with_counts()[:6]
+        hospitals_count = deferred(Hospital.objects.count)
+        doctors_count = deferred(Doctor.objects.count)
+        services_count = deferred(Service.objects.count)
+
+    elif access.is_hospital_member:
         # Hospital Admin & Staff - Hospital-specific analytics
-        doctor_management = DoctorManagement.objects.filter(
-            doctor__hospital=user.hospital
-        ).order_by('-timestamp')[:5]
-        hospital_management = HospitalManagement.objects.filter(
-            hospital=user.hospital
-        ).order_by('-timestamp')[:5]
-        hospitals_with_services = Hospital.objects.filter(id=user.hospital.id).prefetch_related('doctors', 'services', 'appointments')
+        doctor_management = audit_entries(DoctorManagement, hospital_id=access.hospital_id, limit=5)
+        hospital_management = audit_entries(HospitalManagement, hospital_id=access.hospital_id, limit=5)
+        hospitals_with_services = Hospital.objects.filter(id=access.hospital_id).with_counts()
         hospitals_count = 1
-        doctors_count = Doctor.objects.filter(hospital=user.hospital).count()
-        services_count = Service.objects.filter(hospital=user.hospital).count()
-        confirmed_appointments_count = Appointment.objects.filter(hospital=user.hospital, status='confirmed').count()
-        pending_appointments_count = Appointment.objects.filter(hospital=user.hospital, status='pending').count()
+        doctors_count = deferred(Doctor.objects.for_user(user).count)
+        services_count = deferred(Service.objects.for_user(user).count)
 
     else:
         # Patients - Limited view
         doctor_management = DoctorManagement.objects.none()
         hospital_management = HospitalManagement.objects.none()
-        hospitals_with_services = Hospital.objects.prefetch_related('doctors').all()[:6]
-        hospitals_count = Hospital.objects.count()
-        doctors_count = Doctor.objects.count()
-        services_count = Service.objects.count()
-        confirmed_appointments_count = Appointment.objects.filter(email=user.email, status='confirmed').count()
-        pending_appointments_count = Appointment.objects.filter(email=user.email, status='pending').count()
+        hospitals_with_services = Hospital.objects.with_counts()[:6]
+        hospitals_count = deferred(Hospital.objects.count)
+        doctors_count = deferred(Doctor.objects.count)
+        services_count = deferred(Service.objects.count)
 
     # Calculate additional metrics
-    total_appointments = confirmed_appointments_count + pending_appointments_count
-    appointment_completion_rate = (confirmed_appointments_count / total_appointments * 100) if total_appointments > 0 else 0
+    @deferred
+    def appointment_completion_rate():
+        confirmed = confirmed_appointments_count()
+        total_appointments = confirmed + pending_appointments_count()
+        return round(confirmed / total_appointments * 100, 1) if total_appointments > 0 else 0
 
     context = {
         'user_appointments': user_appointments,
@@ -93,10 +92,11 @@ def dashboard(request):
         'appointments_count': appointments_count,
         'confirmed_appointments_count': confirmed_appointments_count,
         'pending_appointments_count': pending_appointments_count,
-        'appointment_completion_rate': round(appointment_completion_rate, 1),
-        'user_role': user.role,
-        'user_hospital': user.hospital,
+        'appointment_completion_rate': appointment_completion_rate,
+        'user_role': access.role,
+        'user_hospital': access.hospital,
         'request': request,  # Add request to context for template access
+        **fragment_cache_context(DIRECTORY, APPOINTMENTS, user=user),
     }
 
     return render(request, 'dashboard/dashboard.html', context)
@@ -105,9 +105,10 @@ def dashboard(request):
 def manage_bookings(request):
     """View for managing bookings"""
     user = request.user
+    access = request.access
     
     # Handle appointment status changes (for staff roles)
-    if request.method == 'POST' and user.role in ['admin', 'hospital_admin', 'staff']:
+    if request.method == 'POST' and access.is_manager:
         action = request.POST.get('action')
         appointment_id = request.POST.get('appointment_id')
         
@@ -116,14 +117,13 @@ def manage_bookings(request):
                 appointment = Appointment.objects.get(id=appointment_id)
                 
                 # Check if user has permission to manage this appointment
-                if user.role == 'admin' or (user.hospital and appointment.hospital == user.hospital):
+                if access.can_manage(appointment.hospital_id):
                     if action == 'confirm':
-                        appointment.status = 'confirmed'
-                        appointment.save()
+                        change_status(appointment, 'confirmed', actor=user)
                         messages.success(request, f'Appointment for {appointment.full_name} has been confirmed.')
                     elif action == 'cancel':
-                        appointment.status = 'cancelled'
-                        appointment.save()
+                        change_status(appointment, 'cancelled', actor=user)
+                        slot_freed(appointment)
                         messages.success(request, f'Appointment for {appointment.full_name} has been cancelled.')
                 else:
                     messages.error(request, 'You do not have permission to manage this appointment.')
@@ -132,22 +132,16 @@ def manage_bookings(request):
         
         return redirect('manage_bookings')
     
-    # Get appointments based on user role (staff manage appointments, not just bookings)
-    if user.role == 'admin':
-        # System admin sees all appointments
-        appointments = Appointment.objects.all().order_by('-created_at')
-    elif user.role in ['hospital_admin', 'staff'] and user.hospital:
-        # Hospital admin and staff see appointments for their hospital
-        appointments = Appointment.objects.filter(hospital=user.hospital).order_by('-created_at')
+    # Staff manage their scope's appointments; patients see only their own bookings (actual Booking objects)
+    if access.is_admin or access.is_hospital_member:
+        appointments = Appointment.objects.for_user(user).for_listing()
     else:
-        # Patients see only their own bookings (actual Booking objects)
-        bookings = Booking.objects.filter(user=user).order_by('-booking_date')
-        appointments = [booking.appointment for booking in bookings]
+        appointments = Appointment.objects.for_listing().filter(booking__user=user).order_by('-booking__booking_date')
     
     context = {
         'appointments': appointments,
-        'user_role': user.role,
-        'user_hospital': user.hospital,
+        'user_role': access.role,
+        'user_hospital': access.hospital,
     }
     
     return render(request, 'dashboard/manage_bookings.html', context)
@@ -156,9 +150,10 @@ def manage_bookings(request):
 def view_appointments(request):
     """View for viewing appointments (Main Admin, Hospital Admin, Staff)"""
     user = request.user
+    access = request.access
     
     # Handle appointment status changes (for staff roles)
-    if request.method == 'POST' and user.role in ['admin', 'hospital_admin', 'staff']:
+    if request.method == 'POST' and access.is_manager:
         action = request.POST.get('action')
         appointment_id = request.POST.get('appointment_id')
         
@@ -167,18 +162,16 @@ def view_appointments(request):
                 appointment = Appointment.objects.get(id=appointment_id)
                 
                 # Check if user has permission to manage this appointment
-                if user.role == 'admin' or (user.hospital and appointment.hospital == user.hospital):
+                if access.can_manage(appointment.hospital_id):
                     if action == 'confirm':
-                        appointment.status = 'confirmed'
-                        appointment.save()
+                        change_status(appointment, 'confirmed', actor=user)
                         messages.success(request, f'Appointment for {appointment.full_name} has been confirmed.')
                     elif action == 'cancel':
-                        appointment.status = 'cancelled'
-                        appointment.save()
+                        change_status(appointment, 'cancelled', actor=user)
+                        slot_freed(appointment)
                         messages.success(request, f'Appointment for {appointment.full_name} has been cancelled.')
                     elif action == 'complete':
-                        appointment.status = 'completed'
-                        appointment.save()
+                        change_status(appointment, 'completed', actor=user)
                         messages.success(request, f'Appointment for {appointment.full_name} has been marked as completed.')
                 else:
                     messages.error(request, 'You do not have permission to manage this appointment.')
@@ -187,54 +180,178 @@ def view_appointments(request):
         
         return redirect('view_appointments')
     
-    # Get appointments based on user role
-    if user.role == 'admin':
-        # System admin can view all appointments
-        appointments = Appointment.objects.all().order_by('-created_at')
-    elif user.role in ['hospital_admin', 'staff'] and user.hospital:
-        # Hospital admin and staff can view appointments for their hospital
-        appointments = Appointment.objects.filter(hospital=user.hospital).order_by('-created_at')
-    else:
-        # Patients cannot access this page
+    # Patients cannot access this page
+    if not (access.is_admin or access.is_hospital_member):
         return render(request, 'dashboard/access_denied.html')
+    appointments = Appointment.objects.for_user(user).for_listing()
 
     context = {
         'appointments': appointments,
-        'user_role': user.role,
-        'user_hospital': user.hospital,
+        'user_role': access.role,
+        'user_hospital': access.hospital,
     }
     
     return render(request, 'dashboard/view_appointments.html', context)
 
+@login_required
+@require_POST
+def bulk_update_appointments(request):
+    """API endpoint to change the status of several appointments at once"""
+    access = request.access
+    if not access.is_manager:
+        return JsonResponse({'success': False, 'error': 'Permission denied'}, status=403)
+    try:
+        data = json.loads(request.body)
+        appointment_ids = data['appointment_ids']
+        status = data['status']
+    except (ValueError, KeyError):
+        return JsonResponse({'success': False, 'error': 'Expected appointment_ids and status'}, status=400)
+
+    if status not in STATUS_TRANSITIONS:
+        return JsonResponse({'success': False, 'error': f'Invalid status: {status}'}, status=400)
+    if not isinstance(appointment_ids, list) or not all(str(i).isdigit() for i in appointment_ids):
+        return JsonResponse({'success': False, 'error': 'appointment_ids must be a list of ids'}, status=400)
+    if len(appointment_ids) > MAX_BULK_SIZE:
+        return JsonResponse({'success': False, 'error': f'At most {MAX_BULK_SIZE} appointments per request'}, status=400)
+
+    result = bulk_transition(request.user, appointment_ids, status)
+    return JsonResponse({'success': True, **result})
+
+ARCHIVE_PAGE_SIZE = 50
+
+def _archived_appointment_json(archived):
+    return {
+        'id': archived.id,
+        'hospital_id': archived.hospital_id,
+        'doctor_id': archived.doctor_id,
+        'email': archived.email,
+        'date': archived.date.isoformat(),
+        'time': archived.time,
+        'status': archived.status,
+        'archived_at': archived.archived_at.isoformat(),
+    }
+
+@login_required
+def appointment_detail(request, appointment_id):
+    """The columns list pages leave out, for the appointment details modal"""
+    appointments = Appointment.objects.for_user(request.user)
+    appointment = get_object_or_404(appointments.only('id', 'reason'), id=appointment_id)
+    return JsonResponse({'id': appointment.id, 'reason': appointment.reason})
+
+@login_required
+def archived_appointments(request):
+    """
+    Read-only API listing archived appointments, newest first.
+    Filters: ?email=, ?date_from=, ?date_to= (YYYY-MM-DD); paging: ?page=
+    """
+    queryset = ArchivedAppointment.objects.for_user(request.user)
+    if request.GET.get('email'):
+        queryset = queryset.filter(email=request.GET['email'])
+    try:
+        if request.GET.get('date_from'):
+            queryset = queryset.filter(date__gte=request.GET['date_from'])
+        if request.GET.get('date_to'):
+            queryset = queryset.filter(date__lte=request.GET['date_to'])
+    except ValidationError:
+        return JsonResponse({'error': 'Dates must be YYYY-MM-DD'}, status=400)
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+
+    offset = (page - 1) * ARCHIVE_PAGE_SIZE
+    # One extra row tells whether there is a next page without a COUNT(*)
+    rows = list(queryset.order_by('-date', '-id').defer('data')[offset:offset + ARCHIVE_PAGE_SIZE + 1])
+    return JsonResponse({
+        'results': [_archived_appointment_json(archived) for archived in rows[:ARCHIVE_PAGE_SIZE]],
+        'page': page,
+        'has_next': len(rows) > ARCHIVE_PAGE_SIZE,
+    })
+
+@login_required
+def archived_appointment_detail(request, appointment_id):
+    """Read-only API returning one archived appointment with its booking and status history"""
+    archived = get_object_or_404(ArchivedAppointment.objects.for_user(request.user), id=appointment_id)
+    history = [
+        {
+            'from_status': STATUS_NAMES.get(event.from_status),
+            'to_status': STATUS_NAMES[event.to_status],
+            'actor_id': event.actor_id,
+            'timestamp': event.timestamp.isoformat(),
+        }
+        for event in appointment_history(archived.id)
+    ]
+    return JsonResponse({**_archived_appointment_json(archived), 'data': archived.data, 'history': history})
+
+@login_required
+def audit_log(request):
+    """
+    Read-only API listing doctor or hospital management log entries, newest first.
+    Filters: ?type=doctor|hospital, ?object_id=; paging: ?before=<timestamp>,<id>
+    taken from the previous page's ``next``
+    """
+    access = request.access
+    models_by_type = {'doctor': DoctorManagement, 'hospital': HospitalManagement}
+    model = models_by_type.get(request.GET.get('type', 'doctor'))
+    if model is None:
+        return JsonResponse({'error': 'type must be doctor or hospital'}, status=400)
+
+    if access.is_admin:
+        hospital_id = None
+    elif access.is_hospital_member:
+        hospital_id = access.hospital_id
+    else:
+        return JsonResponse({'error': 'Permission denied'}, status=403)
+
+    try:
+        object_id = int(request.GET['object_id']) if request.GET.get('object_id') else None
+        before = None
+        if request.GET.get('before'):
+            # An unescaped '+' in the UTC offset arrives as a space
+            timestamp, last_id = request.GET['before'].replace(' ', '+').rsplit(',', 1)
+            before = (datetime.fromisoformat(timestamp), int(last_id))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid object_id or before'}, status=400)
+
+    entries = audit_entries(model, hospital_id=hospital_id, object_id=object_id, before=before)
+    results = [
+        {
+            'id': entry.id,
+            'object_id': entry.object_id,
+            'object_name': entry.object_name,
+            'hospital_id': entry.hospital_id,
+            'action': entry.action,
+            'manager': entry.manager.username if entry.manager else None,
+            'notes': entry.notes,
+            'timestamp': entry.timestamp.isoformat(),
+        }
+        for entry in entries
+    ]
+    last = entries[-1] if len(entries) == AUDIT_PAGE_SIZE else None
+    return JsonResponse({
+        'results': results,
+        'next': f'{last.timestamp.isoformat()},{last.id}' if last else None,
+    })
+
 @login_required
 def manage_doctors(request):
     """View for managing doctors (Hospital Admin & Staff)"""
-    # Role-based access control
-    if request.user.role == 'admin':
-        # System admin can manage all doctors
-        doctors_queryset = Doctor.objects.all()
-        hospitals_queryset = Hospital.objects.all()
-    elif request.user.role in ['hospital_admin', 'staff'] and request.user.hospital:
-        # Hospital admin and staff can only manage doctors in their hospital
-        doctors_queryset = Doctor.objects.filter(hospital=request.user.hospital)
-        hospitals_queryset = Hospital.objects.filter(id=request.user.hospital.id)
-    else:
+    access = request.access
+    # Role-based access control: system admins manage all doctors, hospital admins and staff their hospital's
+    if not (access.is_admin or access.is_hospital_member):
         # Patients cannot access this page
         return render(request, 'dashboard/access_denied.html')
+    doctors_queryset = Doctor.objects.for_user(request.user).for_listing()
+    hospitals_queryset = Hospital.objects.for_user(request.user).for_choices()
     
     # Handle delete request
     if request.method == 'POST' and 'delete_doctor' in request.POST:
         doctor_id = request.POST.get('doctor_id')
         doctor = get_object_or_404(Doctor, id=doctor_id)
         doctor_name = doctor.name
+        # Log before deleting so the entry keeps the doctor's id and name
+        log_action(doctor, 'removed', request.user, f'Doctor {doctor_name} was removed from the system')
         doctor.delete()
-        # Log the management activity
-        DoctorManagement.objects.create(
-            doctor=doctor,
-            manager=request.user,
-            action='removed',
-            notes=f'Doctor {doctor_name} was removed from the system'
-            )
         messages.success(request, f'Doctor {doctor_name} has been deleted successfully!')
         return redirect('manage_doctors')
     
@@ -246,12 +363,7 @@ def manage_doctors(request):
         if form.is_valid():
             doctor = form.save()
             # Log the management activity
-            DoctorManagement.objects.create(
-                doctor=doctor,
-                manager=request.user,
-                action='updated',
-                notes=f'Doctor {doctor.name} was updated in the system'
-            )
+            log_action(doctor, 'updated', request.user, f'Doctor {doctor.name} was updated in the system')
             messages.success(request, f'Doctor {doctor.name} has been updated successfully!')
             return redirect('manage_doctors')
     elif request.method == 'POST':
@@ -259,12 +371,7 @@ def manage_doctors(request):
         if form.is_valid():
             doctor = form.save()
             # Log the management activity
-            DoctorManagement.objects.create(
-                doctor=doctor,
-                manager=request.user,
-                action='added',
-                notes=f'Doctor {doctor.name} was added to the system'
-            )
+            log_action(doctor, 'added', request.user, f'Doctor {doctor.name} was added to the system')
             messages.success(request, f'Doctor {doctor.name} has been added successfully!')
             return redirect('manage_doctors')
     else:
@@ -272,20 +379,18 @@ def manage_doctors(request):
     
     doctors = doctors_queryset
     # Filter management activities based on user's hospital if they're a hospital admin
-    if request.user.role == 'hospital_admin' and request.user.hospital:
-        management_activities = DoctorManagement.objects.filter(
-            doctor__hospital=request.user.hospital
-        ).order_by('-timestamp')[:10]
+    if access.role == HOSPITAL_ADMIN_ROLE and access.hospital:
+        management_activities = audit_entries(DoctorManagement, hospital_id=access.hospital_id, limit=10)
     else:
-        management_activities = DoctorManagement.objects.all().order_by('-timestamp')[:10]
+        management_activities = audit_entries(DoctorManagement, limit=10)
 
     context = {
         'doctors': doctors,
         'management_activities': management_activities,
         'form': form,
         'hospitals': hospitals_queryset,
-        'user_role': request.user.role,
-        'user_hospital': request.user.hospital,
+        'user_role': access.role,
+        'user_hospital': access.hospital,
     }
     
     return render(request, 'dashboard/manage_doctors.html', context)
@@ -293,8 +398,9 @@ def manage_doctors(request):
 @login_required
 def manage_hospitals(request):
     """View for managing hospitals (Main Admin only)"""
+    access = request.access
     # Only system admins can manage hospitals
-    if request.user.role != 'admin':
+    if not access.is_admin:
         return render(request, 'dashboard/access_denied.html')
 
     hospitals_queryset = Hospital.objects.all()
@@ -308,7 +414,7 @@ def manage_hospitals(request):
 
         try:
             user = CustomUser.objects.get(email=user_email)
-            user.role = 'hospital_admin'
+            user.role = HOSPITAL_ADMIN_ROLE
             user.hospital = hospital
             user.save()
             messages.success(request, f'{user.username} has been assigned as Hospital Admin for {hospital.name}!')
@@ -324,14 +430,9 @@ def manage_hospitals(request):
         hospital_id = request.POST.get('hospital_id')
         hospital = get_object_or_404(Hospital, id=hospital_id)
         hospital_name = hospital.name
+        # Log before deleting so the entry keeps the hospital's id and name
+        log_action(hospital, 'removed', request.user, f'Hospital {hospital_name} was removed from the system')
         hospital.delete()
-        # Log the management activity
-        HospitalManagement.objects.create(
-            hospital=hospital,
-            manager=request.user,
-            action='removed',
-            notes=f'Hospital {hospital_name} was removed from the system'
-        )
         messages.success(request, f'Hospital {hospital_name} has been deleted successfully!')
         return redirect('manage_hospitals')
     
@@ -343,12 +444,7 @@ def manage_hospitals(request):
         if form.is_valid():
             hospital = form.save()
             # Log the management activity
-            HospitalManagement.objects.create(
-                hospital=hospital,
-                manager=request.user,
-                action='updated',
-                notes=f'Hospital {hospital.name} was updated in the system'
-            )
+            log_action(hospital, 'updated', request.user, f'Hospital {hospital.name} was updated in the system')
             messages.success(request, f'Hospital {hospital.name} has been updated successfully!')
             return redirect('manage_hospitals')
     elif request.method == 'POST':
@@ -356,12 +452,7 @@ def manage_hospitals(request):
         if form.is_valid():
             hospital = form.save()
             # Log the management activity
-            HospitalManagement.objects.create(
-                hospital=hospital,
-                manager=request.user,
-                action='added',
-                notes=f'Hospital {hospital.name} was added to the system'
-            )
+            log_action(hospital, 'added', request.user, f'Hospital {hospital.name} was added to the system')
             messages.success(request, f'Hospital {hospital.name} has been added successfully!')
             return redirect('manage_hospitals')
     else:
@@ -369,33 +460,27 @@ def manage_hospitals(request):
     
     hospitals = hospitals_queryset
     # Filter management activities based on user's role
-    if request.user.role == 'hospital_admin' and request.user.hospital:
-        management_activities = HospitalManagement.objects.filter(
-            hospital=request.user.hospital
-        ).order_by('-timestamp')[:10]
+    if access.role == HOSPITAL_ADMIN_ROLE and access.hospital:
+        management_activities = audit_entries(HospitalManagement, hospital_id=access.hospital_id, limit=10)
     else:
-        management_activities = HospitalManagement.objects.all().order_by('-timestamp')[:10]
+        management_activities = audit_entries(HospitalManagement, limit=10)
 
-    # Add hospital admin information to each hospital
-    hospitals_with_admins = []
-    for hospital in hospitals:
-        try:
-            hospital_admin = CustomUser.objects.filter(
-                hospital=hospital,
-                role='hospital_admin'
-            ).first()
-            hospital.hospital_admin = hospital_admin
-        except:
-            hospital.hospital_admin = None
-        hospitals_with_admins.append(hospital)
+    # Add hospital admin information to each hospital, fetched in one query
+    hospitals_with_admins = list(hospitals.prefetch_related(Prefetch(
+        'customuser_set',
+        queryset=CustomUser.objects.filter(role=HOSPITAL_ADMIN_ROLE).order_by('id'),
+        to_attr='hospital_admins',
+    )))
+    for hospital in hospitals_with_admins:
+        hospital.hospital_admin = hospital.hospital_admins[0] if hospital.hospital_admins else None
 
     context = {
         'hospitals': hospitals_with_admins,
         'management_activities': management_activities,
         'form': form,
         'can_add_hospital': can_add_hospital,
-        'user_role': request.user.role,
-        'user_hospital': request.user.hospital,
+        'user_role': access.role,
+        'user_hospital': access.hospital,
     }
 
     return render(request, 'dashboard/manage_hospitals.html', context)
@@ -403,18 +488,13 @@ def manage_hospitals(request):
 @login_required
 def manage_services(request):
     """View for managing services (Hospital Admin & Staff)"""
-    # Role-based access control
-    if request.user.role == 'admin':
-        # System admin can manage all services
-        services_queryset = Service.objects.all().order_by('hospital__name', 'name')
-        hospitals_queryset = Hospital.objects.all()
-    elif request.user.role in ['hospital_admin', 'staff'] and request.user.hospital:
-        # Hospital admin and staff can only manage services in their hospital
-        services_queryset = Service.objects.filter(hospital=request.user.hospital).order_by('name')
-        hospitals_queryset = Hospital.objects.filter(id=request.user.hospital.id)
-    else:
+    access = request.access
+    # Role-based access control: system admins manage all services, hospital admins and staff their hospital's
+    if not (access.is_admin or access.is_hospital_member):
         # Patients cannot access this page
         return render(request, 'dashboard/access_denied.html')
+    services_queryset = Service.objects.for_user(request.user).for_listing()
+    hospitals_queryset = Hospital.objects.for_user(request.user).for_choices()
 
     # Handle delete request
     if request.method == 'POST' and 'delete_service' in request.POST:
@@ -449,8 +529,8 @@ def manage_services(request):
         'services': services,
         'form': form,
         'hospitals': hospitals_queryset,
-        'user_role': request.user.role,
-        'user_hospital': request.user.hospital,
+        'user_role': access.role,
+        'user_hospital': access.hospital,
     }
 
     return render(request, 'dashboard/manage_services.html', context)
@@ -458,8 +538,9 @@ def manage_services(request):
 @login_required
 def manage_users(request):
     """View for managing users and assigning them to hospitals"""
+    access = request.access
     # Main Admin & Hospital Admin can manage users
-    if request.user.role not in ['admin', 'hospital_admin']:
+    if access.role not in [ADMIN_ROLE, HOSPITAL_ADMIN_ROLE]:
         return render(request, 'dashboard/access_denied.html')
 
     # Handle user creation
@@ -484,7 +565,7 @@ def manage_users(request):
             )
             
             # Assign hospital if needed
-            if role in ['hospital_admin', 'staff'] and hospital_id:
+            if role in HOSPITAL_ROLES and hospital_id:
                 user.hospital = Hospital.objects.get(id=hospital_id)
                 user.save()
             
@@ -504,7 +585,7 @@ def manage_users(request):
             user = CustomUser.objects.get(id=user_id)
             user.role = new_role
 
-            if new_role in ['hospital_admin', 'staff']:
+            if new_role in HOSPITAL_ROLES:
                 if hospital_id:
                     user.hospital = Hospital.objects.get(id=hospital_id)
                 else:
@@ -524,29 +605,18 @@ def manage_users(request):
 
         return redirect('manage_users')
 
-    # Get users based on role
-    if request.user.role == 'admin':
-        # Main Admin can see all users except themselves
-        users = CustomUser.objects.exclude(id=request.user.id).order_by('username')
-    elif request.user.role == 'hospital_admin' and request.user.hospital:
-        # Hospital Admin can see all users in their hospital and unassigned staff/patients
-        users = CustomUser.objects.filter(
-            models.Q(hospital=request.user.hospital) |
-            models.Q(hospital__isnull=True, role__in=['staff', 'patient'])
-        ).exclude(id=request.user.id).order_by('username')
-    else:
-        users = CustomUser.objects.none()
+    users = CustomUser.objects.manageable_by(request.user).for_listing()
 
     # Filter available hospitals and roles based on current user's role
-    if request.user.role == 'admin':
-        available_hospitals = Hospital.objects.all()
+    if access.is_admin:
+        available_hospitals = Hospital.objects.for_choices()
         available_roles = CustomUser.ROLE_CHOICES
-    elif request.user.role == 'hospital_admin' and request.user.hospital:
-        available_hospitals = Hospital.objects.filter(id=request.user.hospital.id)
+    elif access.role == HOSPITAL_ADMIN_ROLE and access.hospital:
+        available_hospitals = Hospital.objects.for_user(request.user).for_choices()
         # Hospital admin can only create staff and manage patients
         available_roles = [
-            ('staff', 'Hospital Staff'),
-            ('patient', 'Patient'),
+            (STAFF_ROLE, 'Hospital Staff'),
+            (PATIENT_ROLE, 'Patient'),
         ]
     else:
         available_hospitals = Hospital.objects.none()
@@ -556,8 +626,8 @@ def manage_users(request):
         'users': users,
         'hospitals': available_hospitals,
         'role_choices': available_roles,
-        'user_role': request.user.role,
-        'user_hospital': request.user.hospital,
+        'user_role': access.role,
+        'user_hospital': access.hospital,
     }
 
     return render(request, 'dashboard/manage_users.html', context)
@@ -566,9 +636,10 @@ def manage_users(request):
 def manage_blocked_slots(request):
     """View for managing blocked time slots (Hospital Admin & Staff)"""
     user = request.user
+    access = request.access
     
     # Role-based access control
-    if user.role not in ['admin', 'hospital_admin', 'staff']:
+    if not access.is_manager:
         return render(request, 'dashboard/access_denied.html')
     
     # Handle creating new blocked slot
@@ -583,8 +654,8 @@ def manage_blocked_slots(request):
             reason = request.POST.get('reason', '')
 
             # Validate permissions
-            if user.role in ['hospital_admin', 'staff'] and user.hospital:
-                if int(hospital_id) != user.hospital.id:
+            if access.is_hospital_member:
+                if int(hospital_id) != access.hospital_id:
                     messages.error(request, 'You can only block slots for your hospital.')
                     return redirect('manage_blocked_slots')
 
@@ -614,8 +685,8 @@ def manage_blocked_slots(request):
             blocked_slot = get_object_or_404(BlockedTimeSlot, id=block_id)
             
             # Check permissions
-            if user.role in ['hospital_admin', 'staff'] and user.hospital:
-                if blocked_slot.hospital != user.hospital:
+            if access.is_hospital_member:
+                if blocked_slot.hospital_id != access.hospital_id:
                     messages.error(request, 'You can only delete blocks for your hospital.')
                     return redirect('manage_blocked_slots')
             
@@ -628,23 +699,17 @@ def manage_blocked_slots(request):
         
         return redirect('manage_blocked_slots')
     
-    # Get blocked slots based on user role
-    if user.role == 'admin':
-        blocked_slots = BlockedTimeSlot.objects.select_related('hospital', 'doctor', 'created_by').all()
-        hospitals_queryset = Hospital.objects.all()
-    elif user.role in ['hospital_admin', 'staff'] and user.hospital:
-        blocked_slots = BlockedTimeSlot.objects.select_related('hospital', 'doctor', 'created_by').filter(hospital=user.hospital)
-        hospitals_queryset = Hospital.objects.filter(id=user.hospital.id)
-    else:
-        blocked_slots = BlockedTimeSlot.objects.none()
-        hospitals_queryset = Hospital.objects.none()
+    # All blocks for system admins, their hospital's for hospital admins and staff
+    blocked_slots = BlockedTimeSlot.objects.for_user(user).for_listing()
+    hospitals_queryset = Hospital.objects.for_user(user).for_choices()
 
     context = {
-        'blocked_slots': blocked_slots.order_by('-created_at'),
+        'blocked_slots': blocked_slots,
         'hospitals': hospitals_queryset,
         'block_types': BlockedTimeSlot.BLOCK_TYPE_CHOICES,
-        'user_role': user.role,
-        'user_hospital': user.hospital,
+        'user_role': access.role,
+        'user_hospital': access.hospital,
+        **fragment_cache_context(DIRECTORY, BLOCKED_SLOTS, user=user),
     }
     
     return render(request, 'dashboard/manage_blocked_slots.html', context)
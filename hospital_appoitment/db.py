@@ -0,0 +1,84 @@
+"""
+Database helpers.
+
+- configure_sqlite_connection: applies settings.SQLITE_PRAGMAS to every new
+  SQLite connection (connected in DashboardConfig.ready).
+- ReadWriteRouter: sends reads to the 'replica' alias and writes to 'default'.
+- skip_locked: SELECT ... FOR UPDATE SKIP LOCKED where the backend supports it.
+- claim_batch: take queued rows off a DB-backed queue (SMS, image jobs).
+"""
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+
+def apply_sqlite_pragmas(cursor, pragmas):
+    """Run PRAGMA statements on a DB-API cursor, e.g. {'journal_mode': 'WAL'}"""
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def configure_sqlite_connection(sender, connection, **kwargs):
+    """connection_created receiver that tunes SQLite connections"""
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', None)
+    if connection.vendor != 'sqlite' or not pragmas:
+        return
+    with connection.cursor() as cursor:
+        apply_sqlite_pragmas(cursor, pragmas)
+
+
+class ReadWriteRouter:
+    """
+    Route reads to the 'replica' database and writes to 'default'.
+
+    Both aliases may point at the same SQLite file: with WAL enabled, readers on
+    the replica connection never wait for a writer holding the default one.
+    Reads made inside a transaction on 'default' stay there so they can see
+    its uncommitted writes.
+    """
+    read_alias = 'replica'
+    write_alias = 'default'
+
+    def db_for_read(self, model, **hints):
+        if self.read_alias not in settings.DATABASES:
+            return None
+        if connections[self.write_alias].in_atomic_block:
+            return self.write_alias
+        return self.read_alias
+
+    def db_for_write(self, model, **hints):
+        return self.write_alias
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == self.write_alias
+
+
+def skip_locked(queryset):
+    """
+    Lock the selected rows for the current transaction, skipping rows other
+    workers already hold (SELECT ... FOR UPDATE SKIP LOCKED).
+
+    Backends without row locks (SQLite) get the queryset back unchanged;
+    callers must still claim rows with a conditional UPDATE.
+    """
+    if connections[queryset.db].features.has_select_for_update_skip_locked:
+        return queryset.select_for_update(skip_locked=True)
+    return queryset
+
+
+def claim_batch(queryset, limit, status):
+    """
+    Move up to ``limit`` rows of ``queryset`` from 'queued' to ``status`` and
+    return them. The model needs ``status`` and ``locked_at`` fields.
+    """
+    model = queryset.model
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(skip_locked(queryset.filter(status='queued')).values_list('id', flat=True)[:limit])
+        # The status filter keeps two workers from claiming the same row on SQLite
+        model.objects.filter(id__in=ids, status='queued').update(status=status, locked_at=now)
+    return list(model.objects.filter(id__in=ids, status=status, locked_at=now))
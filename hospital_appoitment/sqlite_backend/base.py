@@ -0,0 +1,14 @@
+"""
+SQLite backend that takes the write lock when a transaction starts.
+
+Django 4.2 opens atomic() blocks with a deferred BEGIN. When two deferred
+transactions both read and then try to write, SQLite cannot wait for the
+busy timeout and one of them fails straight away with "database is locked".
+BEGIN IMMEDIATE queues writers on the busy timeout instead.
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN IMMEDIATE')
@@ -0,0 +1,42 @@
+"""
+Static files storage used outside DEBUG.
+
+collectstatic writes every file under a content-hashed name
+(css/styles.3f2a9c.css), records the mapping in staticfiles.json and writes
+.gz and .br copies next to each one. WhiteNoise serves the hashed names with
+``Cache-Control: max-age=315360000, public, immutable``, so browsers never
+revalidate them; a change to a file changes its URL.
+"""
+import hashlib
+
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+
+class DeduplicatedManifestStaticFilesStorage(CompressedManifestStaticFilesStorage):
+    """
+    Manifest storage that points identical files at a single URL.
+
+    The same image or stylesheet copied under several names (static/ and
+    theme/static/ used to hold copies) would otherwise be downloaded and cached
+    once per name. The duplicate files stay on disk, since processed CSS may
+    already refer to them; only the manifest changes.
+    """
+
+    def post_process(self, *args, **kwargs):
+        yield from super().post_process(*args, **kwargs)
+        if not kwargs.get('dry_run') and self.deduplicate():
+            self.save_manifest()
+
+    def deduplicate(self):
+        """Remap manifest entries with identical contents. Returns the number remapped."""
+        canonical = {}
+        remapped = 0
+        # Sorted so the same name wins on every deploy
+        for name, hashed_name in sorted(self.hashed_files.items()):
+            with self.open(hashed_name) as f:
+                digest = hashlib.sha256(f.read()).hexdigest()
+            first = canonical.setdefault(digest, hashed_name)
+            if first != hashed_name:
+                self.hashed_files[name] = first
+                remapped += 1
+        return remapped
@@ -15,6 +15,22 @@ document.addEventListener('DOMContentLoaded', function() {
     const DOCTORS_API = '/api/doctors/';
     const SERVICES_API = '/api/services/';
     const APPOINTMENTS_API = '/api/appointments/';
+    const SLOT_EVENTS_API = '/api/slot-events/';
+
+    // Default time slots
+    const ALL_TIME_SLOTS = [
+        '09:00', '09:30', '10:00', '10:30', '11:00', '11:30',
+        '14:00', '14:30', '15:00', '15:30', '16:00', '16:30'
+    ];
+
+    // Unavailable times of the selected doctor and date, kept current by the
+    // slot events stream while the form is open
+    let bookedTimes = new Set();
+    let slotEvents = null;
+
+    // Idempotency key of the booking being submitted; resubmitting the same
+    // details after a network error reuses it so the server cannot book twice
+    let pendingBooking = null;
 
     // Initialize the form
     initializeForm();
@@ -145,53 +161,20 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 
     async function loadAvailableTimes(doctorId, selectedDate) {
+        stopWatchingAvailableTimes();
+        // A time picked for another doctor or date does not carry over
+        timeSelect.innerHTML = '<option value="">Select a time</option>';
         try {
             // Get booked time slots for this doctor and date
             const response = await fetch(`/api/booked-times/?doctorId=${doctorId}&date=${selectedDate}`);
-            const bookedTimes = await response.json();
-
-            // Default time slots
-            const allTimeSlots = [
-                '09:00', '09:30', '10:00', '10:30', '11:00', '11:30',
-                '14:00', '14:30', '15:00', '15:30', '16:00', '16:30'
-            ];
-
-            // Filter out booked times
-            const availableSlots = allTimeSlots.filter(time => !bookedTimes.includes(time));
-
-            // Clear existing options
-            timeSelect.innerHTML = '<option value="">Select a time</option>';
-
-            if (availableSlots.length === 0) {
-                const option = document.createElement('option');
-                option.value = '';
-                option.textContent = 'No available times for this date';
-                option.disabled = true;
-                timeSelect.appendChild(option);
-                showError('No available time slots for the selected date. Please choose another date.');
-                return;
-            }
-
-            // Add available time slots to dropdown
-            availableSlots.forEach(time => {
-                const option = document.createElement('option');
-                option.value = time;
-                option.textContent = time;
-                timeSelect.appendChild(option);
-            });
-
-            // Enable submit button if all required fields are filled
-            checkFormValidity();
+            bookedTimes = new Set(await response.json());
+            renderAvailableTimes();
+            watchAvailableTimes(doctorId, selectedDate);
         } catch (error) {
             console.error('Error loading available times:', error);
             // Fallback to showing all time slots if API call fails
-            const allTimeSlots = [
-                '09:00', '09:30', '10:00', '10:30', '11:00', '11:30',
-                '14:00', '14:30', '15:00', '15:30', '16:00', '16:30'
-            ];
-
             timeSelect.innerHTML = '<option value="">Select a time</option>';
-            allTimeSlots.forEach(time => {
+            ALL_TIME_SLOTS.forEach(time => {
                 const option = document.createElement('option');
                 option.value = time;
                 option.textContent = time;
@@ -202,6 +185,72 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
 
+    function renderAvailableTimes() {
+        const selectedTime = timeSelect.value;
+
+        // Filter out booked times
+        const availableSlots = ALL_TIME_SLOTS.filter(time => !bookedTimes.has(time));
+
+        // Clear existing options
+        timeSelect.innerHTML = '<option value="">Select a time</option>';
+
+        if (availableSlots.length === 0) {
+            const option = document.createElement('option');
+            option.value = '';
+            option.textContent = 'No available times for this date';
+            option.disabled = true;
+            timeSelect.appendChild(option);
+            showError('No available time slots for the selected date. Please choose another date.');
+            checkFormValidity();
+            return;
+        }
+
+        // Add available time slots to dropdown
+        availableSlots.forEach(time => {
+            const option = document.createElement('option');
+            option.value = time;
+            option.textContent = time;
+            timeSelect.appendChild(option);
+        });
+
+        if (selectedTime && availableSlots.includes(selectedTime)) {
+            timeSelect.value = selectedTime;
+        } else if (selectedTime) {
+            showError(`${selectedTime} has just been booked. Please choose another time.`);
+        }
+
+        // Enable submit button if all required fields are filled
+        checkFormValidity();
+    }
+
+    function watchAvailableTimes(doctorId, selectedDate) {
+        // Older browsers keep the times loaded above
+        if (!window.EventSource) {
+            return;
+        }
+        slotEvents = new EventSource(`${SLOT_EVENTS_API}?doctorId=${doctorId}&date=${selectedDate}`);
+        // Sent on every (re)connect
+        slotEvents.addEventListener('slots', event => {
+            bookedTimes = new Set(JSON.parse(event.data).booked);
+            renderAvailableTimes();
+        });
+        slotEvents.addEventListener('taken', event => {
+            JSON.parse(event.data).times.forEach(time => bookedTimes.add(time));
+            renderAvailableTimes();
+        });
+        slotEvents.addEventListener('freed', event => {
+            JSON.parse(event.data).times.forEach(time => bookedTimes.delete(time));
+            renderAvailableTimes();
+        });
+    }
+
+    function stopWatchingAvailableTimes() {
+        if (slotEvents) {
+            slotEvents.close();
+            slotEvents = null;
+        }
+    }
+
     function checkFormValidity() {
         const requiredFields = [
             document.getElementById('fullName'),
@@ -240,6 +289,11 @@ document.addEventListener('DOMContentLoaded', function() {
             reason: document.getElementById('reason').value
         };
 
+        const body = JSON.stringify(formData);
+        if (!pendingBooking || pendingBooking.body !== body) {
+            pendingBooking = { body, key: newIdempotencyKey() };
+        }
+
         try {
             // Show loading state
             submitBtn.disabled = true;
@@ -249,14 +303,17 @@ document.addEventListener('DOMContentLoaded', function() {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
-                    'X-CSRFToken': getCSRFToken()
+                    'X-CSRFToken': getCSRFToken(),
+                    'Idempotency-Key': pendingBooking.key
                 },
-                body: JSON.stringify(formData)
+                body: body
             });
 
             const result = await response.json();
 
             if (result.success) {
+                pendingBooking = null;
+
                 // Show success message
                 showSuccess('Appointment booked successfully!');
 
@@ -294,6 +351,7 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 
     function resetDateTimeSelection() {
+        stopWatchingAvailableTimes();
         dateInput.value = '';
         dateInput.disabled = true;
         timeSelect.innerHTML = '<option value="">Select a time</option>';
@@ -308,6 +366,14 @@ document.addEventListener('DOMContentLoaded', function() {
         submitBtn.classList.add('opacity-50', 'cursor-not-allowed');
     }
 
+    function newIdempotencyKey() {
+        // crypto.randomUUID is only available on HTTPS and localhost
+        if (window.crypto && crypto.randomUUID) {
+            return crypto.randomUUID();
+        }
+        return `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+    }
+
     function getCSRFToken() {
         // Get CSRF token from cookie
         const name = 'csrftoken';
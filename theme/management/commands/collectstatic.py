@@ -0,0 +1,32 @@
+"""
+Rebuild the Tailwind stylesheet, then collect static files.
+
+Usage:
+    python manage.py collectstatic --noinput
+    python manage.py collectstatic --noinput --skip-tailwind   # keep dist/styles.css as is
+
+theme/static/css/dist/styles.css is build output: the purge in
+theme/static_src/tailwind.config.js only takes effect once it is rebuilt,
+so the deploy step builds it here instead of relying on a committed copy.
+Needs node and npm; the npm packages are installed on the first run.
+"""
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles.management.commands.collectstatic import Command as CollectStaticCommand
+from django.core.management import call_command
+
+from tailwind.utils import get_tailwind_src_path
+
+
+class Command(CollectStaticCommand):
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--skip-tailwind', action='store_true', help='Do not rebuild the Tailwind stylesheet first')
+
+    def handle(self, **options):
+        if not options['skip_tailwind']:
+            if not os.path.isdir(os.path.join(get_tailwind_src_path(settings.TAILWIND_APP_NAME), 'node_modules')):
+                call_command('tailwind', 'install')
+            call_command('tailwind', 'build')
+        return super().handle(**options)
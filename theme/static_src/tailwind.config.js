@@ -11,20 +11,18 @@ module.exports = {
          * HTML. Paths to Django template files that will contain Tailwind CSS classes.
          */
 
-        /*  Templates within theme app (<tailwind_app_name>/templates), e.g. base.html. */
-        '../templates/**/*.html',
-
         /*
-         * Main templates directory of the project (BASE_DIR/templates).
-         * Adjust the following line to match your project structure.
+         * Only the Django templates that are actually rendered. theme/templates holds the
+         * static HTML prototype and is never served, so it is left out of the purge scan;
+         * "base copy.html" is an unused draft.
          */
-        '../../templates/**/*.html',
+        '../../accounts/templates/**/*.html',
+        '../../dashboard/templates/**/*.html',
+        '../../appointment/templates/**/*.html',
+        '!../../appointment/templates/base copy.html',
 
-        /*
-         * Templates in other django apps (BASE_DIR/<any_app_name>/templates).
-         * Adjust the following line to match your project structure.
-         */
-        '../../**/templates/**/*.html',
+        /* static/script.js toggles classes on the booking form and toasts. */
+        '../../static/**/*.js',
 
         /**
          * JS: If you use Tailwind CSS in JavaScript, uncomment the following lines and make sure
@@ -0,0 +1,26 @@
+import tempfile
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+
+
+class CollectStaticTests(SimpleTestCase):
+    def collect(self, *args):
+        with tempfile.TemporaryDirectory() as static_root, override_settings(STATIC_ROOT=static_root):
+            with mock.patch('theme.management.commands.collectstatic.call_command') as tailwind:
+                call_command('collectstatic', '--noinput', *args, verbosity=0)
+        return tailwind
+
+    def test_stylesheet_is_rebuilt_before_collecting(self):
+        with mock.patch('theme.management.commands.collectstatic.os.path.isdir', return_value=True):
+            tailwind = self.collect()
+        self.assertEqual(tailwind.call_args_list, [mock.call('tailwind', 'build')])
+
+    def test_packages_are_installed_on_the_first_build(self):
+        with mock.patch('theme.management.commands.collectstatic.os.path.isdir', return_value=False):
+            tailwind = self.collect()
+        self.assertEqual(tailwind.call_args_list, [mock.call('tailwind', 'install'), mock.call('tailwind', 'build')])
+
+    def test_skip_tailwind(self):
+        self.assertFalse(self.collect('--skip-tailwind').called)